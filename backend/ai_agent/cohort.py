@@ -0,0 +1,193 @@
+"""
+Cohort analytics: quiz results for many students in one vectorised pass.
+
+`fetch_cohort` loads every attempt of the cohort (with its answer counts from
+quiz_answers) in one query per database, fanned out over the shards.
+`analyze_cohort` turns the rows into NumPy arrays and computes, without a
+per-student loop:
+
+- per topic: students, attempts, average, quartiles and a 10-bucket
+  histogram of the students' topic averages, answer accuracy, the mean
+  trend and how many students are at risk;
+- per (student, topic): average, last score and the least-squares slope of
+  the score over the attempt number (points per attempt), from bincount sums;
+- at-risk flags: a topic average below AT_RISK_SCORE, or a slope of
+  AT_RISK_SLOPE or worse over at least MIN_TREND_ATTEMPTS attempts.
+
+`cohort_report` caches each (cohort, window) report for COHORT_CACHE_TTL
+seconds. The endpoint is restricted to INSTRUCTOR_USERNAMES.
+"""
+
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence
+
+from db import fan_out_query, reads
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+INSTRUCTOR_USERNAMES = {u.strip() for u in os.environ.get("INSTRUCTOR_USERNAMES", "").split(",") if u.strip()}
+COHORT_CACHE = TTLCache(maxsize=64, ttl=float(os.environ.get("COHORT_CACHE_TTL", 300)))
+
+AT_RISK_SCORE = 60          # topic average below this is at risk
+AT_RISK_SLOPE = -5.0        # ... and so is losing this many points per attempt
+MIN_TREND_ATTEMPTS = 3      # attempts needed before a slope counts
+HISTOGRAM_BUCKETS = 10      # 0-9, 10-19, ... 90-100
+MAX_COHORT_USERS = 5000
+MAX_AT_RISK_LISTED = 200
+
+
+def is_instructor(username: Optional[str]) -> bool:
+    return bool(username) and username in INSTRUCTOR_USERNAMES
+
+
+def fetch_cohort(user_ids: Optional[Sequence[int]] = None, days: int = 90) -> List[Dict]:
+    """
+    Every attempt in the last `days` days for `user_ids` (all students when
+    None), each with its answer and correct-answer counts. Rows are ordered
+    by user and time within each database.
+    """
+    sql = """
+    SELECT a.user_id, a.username, a.topic, a.percentage,
+           COUNT(q.id) AS answers, COALESCE(SUM(q.is_correct), 0) AS correct
+    FROM quiz_attempts a LEFT JOIN quiz_answers q ON q.attempt_id = a.id
+    WHERE a.taken_at >= %s AND a.topic IS NOT NULL{users}
+    GROUP BY a.id
+    ORDER BY a.user_id, a.taken_at, a.id
+    """
+    params = [datetime.now() - timedelta(days=days)]
+    users = ""
+    if user_ids is not None:
+        if not user_ids:
+            return []
+        users = f" AND a.user_id IN ({', '.join(['%s'] * len(user_ids))})"
+        params += list(user_ids)
+    rows = []
+    for database_rows in fan_out_query(sql.format(users=users), tuple(params)):
+        rows.extend(database_rows)
+    return rows
+
+
+def analyze_cohort(rows: List[Dict]) -> Dict:
+    """Topic distributions, per-student trends and at-risk flags for the fetched attempts"""
+    import numpy as np
+
+    if not rows:
+        return {"students": 0, "attempts": 0, "atRiskCount": 0, "topics": [], "atRisk": []}
+
+    # Topics compare case-insensitively in the schema; report the first spelling seen
+    folded = np.array([r["topic"].lower() for r in rows])
+    topic_keys, first_seen, topic_idx = np.unique(folded, return_index=True, return_inverse=True)
+    topic_names = [rows[i]["topic"] for i in first_seen.tolist()]
+    users = np.array([r["user_id"] for r in rows], dtype=np.int64)
+    scores = np.array([r["percentage"] or 0 for r in rows], dtype=np.float64)
+    answers = np.array([r["answers"] or 0 for r in rows], dtype=np.float64)
+    correct = np.array([r["correct"] or 0 for r in rows], dtype=np.float64)
+    usernames = {r["user_id"]: r["username"] for r in rows}
+
+    # One contiguous run per (student, topic), attempts in time order (the
+    # fetch order, kept by the stable tie-break on the row position)
+    order = np.lexsort((np.arange(len(rows)), topic_idx, users))
+    users, topic_idx, scores = users[order], topic_idx[order], scores[order]
+    answers, correct = answers[order], correct[order]
+    new_run = np.concatenate(([True], (users[1:] != users[:-1]) | (topic_idx[1:] != topic_idx[:-1])))
+    run = np.cumsum(new_run) - 1
+    starts = np.flatnonzero(new_run)
+    run_user, run_topic = users[starts], topic_idx[starts]
+
+    # Least-squares slope per run from its sums: x is the attempt number
+    x = (np.arange(len(scores)) - starts[run]).astype(np.float64)
+    n = np.bincount(run).astype(np.float64)
+    sum_x, sum_y = np.bincount(run, x), np.bincount(run, scores)
+    sum_xx, sum_xy = np.bincount(run, x * x), np.bincount(run, x * scores)
+    denominator = n * sum_xx - sum_x * sum_x
+    slope = np.divide(n * sum_xy - sum_x * sum_y, denominator,
+                      out=np.zeros_like(denominator), where=denominator > 0)
+    run_mean = sum_y / n
+    last_score = scores[starts + n.astype(np.int64) - 1]
+    trending = n >= MIN_TREND_ATTEMPTS
+    at_risk = (run_mean < AT_RISK_SCORE) | (trending & (slope <= AT_RISK_SLOPE))
+
+    # Per-topic distribution of the students' topic averages
+    topics = len(topic_keys)
+    students = np.bincount(run_topic, minlength=topics)
+    attempts = np.bincount(topic_idx, minlength=topics)
+    average = np.bincount(topic_idx, scores, minlength=topics) / attempts
+    by_topic = run_mean[np.lexsort((run_mean, run_topic))]
+    offsets = np.concatenate(([0], np.cumsum(students)[:-1]))
+
+    def quantile(q):
+        return by_topic[offsets + np.floor(q * (students - 1)).astype(np.int64)]
+
+    bucket = np.minimum(run_mean // (100 / HISTOGRAM_BUCKETS), HISTOGRAM_BUCKETS - 1).astype(np.int64)
+    histogram = np.bincount(run_topic * HISTOGRAM_BUCKETS + bucket,
+                            minlength=topics * HISTOGRAM_BUCKETS).reshape(topics, HISTOGRAM_BUCKETS)
+    answered = np.bincount(topic_idx, answers, minlength=topics)
+    accuracy = np.divide(np.bincount(topic_idx, correct, minlength=topics) * 100, answered,
+                         out=np.full(topics, np.nan), where=answered > 0)
+    trend_runs = np.bincount(run_topic[trending], minlength=topics)
+    mean_slope = np.divide(np.bincount(run_topic[trending], slope[trending], minlength=topics), trend_runs,
+                           out=np.zeros(topics), where=trend_runs > 0)
+    risky = np.bincount(run_topic[at_risk], minlength=topics)
+    p25, median, p75 = quantile(0.25), quantile(0.5), quantile(0.75)
+
+    topic_report = [{
+        "topic": topic_names[t],
+        "students": int(students[t]),
+        "attempts": int(attempts[t]),
+        "averageScore": round(float(average[t]), 2),
+        "p25": round(float(p25[t]), 2),
+        "median": round(float(median[t]), 2),
+        "p75": round(float(p75[t]), 2),
+        "histogram": histogram[t].tolist(),
+        "answerAccuracy": None if np.isnan(accuracy[t]) else round(float(accuracy[t]), 2),
+        "meanSlope": round(float(mean_slope[t]), 2),
+        "atRiskStudents": int(risky[t]),
+    } for t in np.argsort(average, kind="stable").tolist()]
+
+    # Students with at least one at-risk topic, weakest overall average first
+    student_ids, student_idx = np.unique(run_user, return_inverse=True)
+    student_attempts = np.bincount(student_idx, n)
+    student_average = np.bincount(student_idx, sum_y) / student_attempts
+    flagged = {}
+    for r in np.flatnonzero(at_risk).tolist():
+        s = int(student_idx[r])
+        flagged.setdefault(s, []).append({
+            "topic": topic_names[run_topic[r]],
+            "averageScore": round(float(run_mean[r]), 2),
+            "attempts": int(n[r]),
+            "lastScore": int(last_score[r]),
+            "slope": round(float(slope[r]), 2),
+        })
+    at_risk_report = [{
+        "userId": int(student_ids[s]),
+        "username": usernames[int(student_ids[s])],
+        "averageScore": round(float(student_average[s]), 2),
+        "attempts": int(student_attempts[s]),
+        "topics": flagged[s],
+    } for s in sorted(flagged, key=lambda s: student_average[s])[:MAX_AT_RISK_LISTED]]
+
+    return {
+        "students": len(student_ids),
+        "attempts": len(rows),
+        "atRiskCount": len(flagged),
+        "topics": topic_report,
+        "atRisk": at_risk_report,
+    }
+
+
+@reads
+def cohort_report(user_ids: Optional[Sequence[int]] = None, days: int = 90) -> Dict:
+    """Cached analyze_cohort(fetch_cohort(...)) for one cohort and window"""
+    key = (tuple(sorted(set(user_ids))) if user_ids is not None else None, days)
+    cached = COHORT_CACHE.get(key)
+    if cached is not None:
+        return cached
+    report = analyze_cohort(fetch_cohort(key[0], days))
+    report.update(windowDays=days, generatedAt=datetime.now().isoformat(timespec="seconds"))
+    COHORT_CACHE.set(key, report)
+    logger.info("Cohort report: %d students, %d attempts over %d days",
+                report["students"], report["attempts"], days)
+    return report
@@ -0,0 +1,215 @@
+"""
+Incremental knowledge tracing per (user, topic).
+
+`topic_mastery` holds one row for every topic a user has been quizzed on:
+running totals (attempts, score sum, the last five percentages, the last
+attempt) and two mastery estimates folded forward one attempt at a time:
+
+- decayed_score: exponentially weighted average of the attempt percentages,
+  DECAY_ALPHA on the newest attempt, so old results fade out;
+- p_known: Bayesian Knowledge Tracing estimate that the topic is known,
+  updated once per saved quiz answer (guess / slip / learn model).
+
+`record_attempt_mastery` applies one attempt with a primary-key read and one
+upsert, so the performance analyzer reads one row per topic instead of
+aggregating the quiz history. `replay_history` folds the stored history with
+the same step: migration 13 and tools/recompute_mastery.py use it to
+(re)build the table, and `mastery_from_history` to serve a user who has no
+rows yet without writing.
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from db import get_db_connection, reads, writes
+
+logger = logging.getLogger(__name__)
+
+DECAY_ALPHA = 0.3           # weight of the newest attempt in decayed_score
+RECENT_SCORES = 5           # percentages kept for the trend
+BKT_P_INIT = 0.3            # P(known) before the first answer
+BKT_P_LEARN = 0.1           # P(unknown -> known) after each answer
+BKT_P_SLIP = 0.1            # P(wrong | known)
+BKT_P_GUESS = 0.25          # P(right | unknown): four-option MCQs
+
+
+class MasteryState(NamedTuple):
+    attempts: int
+    score_sum: float
+    decayed_score: float
+    p_known: float
+    recent_scores: Tuple[int, ...]      # newest first
+
+
+NEW_TOPIC = MasteryState(0, 0.0, 0.0, BKT_P_INIT, ())
+
+
+def trace(p_known: float, correct: bool) -> float:
+    """One BKT step: condition on the answer, then allow for learning"""
+    if correct:
+        evidence = p_known * (1 - BKT_P_SLIP)
+        posterior = evidence / (evidence + (1 - p_known) * BKT_P_GUESS)
+    else:
+        evidence = p_known * BKT_P_SLIP
+        posterior = evidence / (evidence + (1 - p_known) * (1 - BKT_P_GUESS))
+    return posterior + (1 - posterior) * BKT_P_LEARN
+
+
+def outcomes_from_score(score: int, total_questions: int) -> List[bool]:
+    """Answer outcomes for an attempt saved without its answers: the correct ones first"""
+    score = max(0, min(int(score or 0), int(total_questions or 0)))
+    return [True] * score + [False] * (int(total_questions or 0) - score)
+
+
+def observe(state: MasteryState, percentage, outcomes: Iterable[bool]) -> MasteryState:
+    """Fold one quiz attempt (its percentage and per-answer outcomes) into the state"""
+    p_known = state.p_known
+    for correct in outcomes:
+        p_known = trace(p_known, bool(correct))
+    if state.attempts:
+        decayed = DECAY_ALPHA * percentage + (1 - DECAY_ALPHA) * state.decayed_score
+    else:
+        decayed = float(percentage)
+    recent = ((int(percentage),) + state.recent_scores)[:RECENT_SCORES]
+    return MasteryState(state.attempts + 1, state.score_sum + percentage, decayed, p_known, recent)
+
+
+def encode_recent(scores: Tuple[int, ...]) -> str:
+    return ",".join(str(s) for s in scores)
+
+
+def decode_recent(value) -> List[int]:
+    return [int(s) for s in value.split(",")] if value else []
+
+
+UPSERT_SQL = """
+INSERT INTO topic_mastery
+(user_id, topic, attempts, score_sum, decayed_score, p_known, recent_scores, last_attempted)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+    attempts = VALUES(attempts),
+    score_sum = VALUES(score_sum),
+    decayed_score = VALUES(decayed_score),
+    p_known = VALUES(p_known),
+    recent_scores = VALUES(recent_scores),
+    last_attempted = VALUES(last_attempted)
+"""
+
+
+def upsert_row(user_id: int, topic: str, state: MasteryState, last_attempted) -> tuple:
+    """Parameters for UPSERT_SQL"""
+    return (user_id, topic, state.attempts, state.score_sum, state.decayed_score, state.p_known,
+            encode_recent(state.recent_scores), last_attempted)
+
+
+def replay_history(cur, first_user: int, last_user: int) -> List[tuple]:
+    """
+    Fold the quiz history of every user in [first_user, last_user] into
+    mastery states, one per (user, topic); returns UPSERT_SQL parameters.
+    `cur` must be a plain (tuple) cursor.
+    """
+    cur.execute("""
+    SELECT id, user_id, topic, score, total_questions, percentage, taken_at FROM quiz_attempts
+    WHERE user_id BETWEEN %s AND %s AND topic IS NOT NULL
+    ORDER BY user_id, topic, taken_at, id
+    """, (first_user, last_user))
+    attempts = cur.fetchall()
+    if not attempts:
+        return []
+
+    cur.execute("""
+    SELECT a.attempt_id, a.is_correct FROM quiz_answers a
+    JOIN quiz_attempts q ON q.id = a.attempt_id
+    WHERE q.user_id BETWEEN %s AND %s
+    ORDER BY a.attempt_id, a.id
+    """, (first_user, last_user))
+    answers = defaultdict(list)
+    for attempt_id, is_correct in cur.fetchall():
+        answers[attempt_id].append(bool(is_correct))
+
+    states = []
+    key, state, last = None, NEW_TOPIC, None
+    for attempt_id, user_id, topic, score, total, percentage, taken_at in attempts:
+        # Topics compare case-insensitively in the schema, so group on the folded name
+        if (user_id, topic.lower()) != key:
+            if key is not None:
+                states.append(upsert_row(last[0], last[1], state, last[2]))
+            key, state = (user_id, topic.lower()), NEW_TOPIC
+        state = observe(state, percentage or 0, answers.get(attempt_id) or outcomes_from_score(score, total))
+        last = (user_id, topic, taken_at)
+    states.append(upsert_row(last[0], last[1], state, last[2]))
+    return states
+
+
+def rebuild_mastery(cur, first_user: int, last_user: int) -> int:
+    """Recompute and store the mastery states of a user-id range; returns the number of topics"""
+    states = replay_history(cur, first_user, last_user)
+    if states:
+        cur.executemany(UPSERT_SQL, states)
+    return len(states)
+
+
+@writes
+def record_attempt_mastery(user_id: int, topic: str, percentage: int, outcomes: List[bool], taken_at) -> Dict:
+    """Advance the user's mastery state for `topic` with one saved quiz attempt"""
+    attempted_at = taken_at if isinstance(taken_at, datetime) else datetime.fromisoformat(str(taken_at))
+    conn = get_db_connection(user_id)
+    cur = conn.cursor(dictionary=True)
+    try:
+        cur.execute("""
+        SELECT attempts, score_sum, decayed_score, p_known, recent_scores FROM topic_mastery
+        WHERE user_id = %s AND topic = %s FOR UPDATE
+        """, (user_id, topic))
+        row = cur.fetchone()
+        previous = NEW_TOPIC if row is None else MasteryState(
+            row["attempts"], float(row["score_sum"]), float(row["decayed_score"]), float(row["p_known"]),
+            tuple(decode_recent(row["recent_scores"])))
+        state = observe(previous, percentage, outcomes)
+        cur.execute(UPSERT_SQL, upsert_row(user_id, topic, state, attempted_at))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    logger.debug("Mastery for user %s on %s: p_known %.2f, decayed %.1f",
+                 user_id, topic, state.p_known, state.decayed_score)
+    return {"topic": topic, "masteryProbability": round(state.p_known, 3),
+            "decayedScore": round(state.decayed_score, 2)}
+
+
+@reads
+def get_topic_mastery(user_id: int) -> List[Dict]:
+    """Every topic's stored mastery state for the user, lowest average first"""
+    conn = get_db_connection(user_id)
+    cur = conn.cursor(dictionary=True)
+    cur.execute("""
+    SELECT topic, attempts, score_sum, decayed_score, p_known, recent_scores, last_attempted
+    FROM topic_mastery WHERE user_id = %s AND attempts > 0
+    ORDER BY score_sum / attempts
+    """, (user_id,))
+    rows = cur.fetchall()
+    cur.close()
+    return rows
+
+
+@reads
+def mastery_from_history(user_id: int) -> List[Dict]:
+    """
+    get_topic_mastery rows computed from the quiz history without storing
+    them: the fallback for a user whose rows are missing
+    """
+    conn = get_db_connection(user_id)
+    cur = conn.cursor()
+    try:
+        states = replay_history(cur, user_id, user_id)
+    finally:
+        cur.close()
+    columns = ("user_id", "topic", "attempts", "score_sum", "decayed_score", "p_known",
+               "recent_scores", "last_attempted")
+    rows = [dict(zip(columns, state)) for state in states]
+    rows.sort(key=lambda r: r["score_sum"] / r["attempts"])
+    return rows
@@ -5,8 +5,12 @@ Performance Analyzer - Analyzes quiz attempts using RULE-BASED logic only
 Gemini AI insights DISABLED to avoid free tier rate limits
 """
 
-from db import get_db_connection
-from datetime import datetime
+import logging
+
+from ai_agent.mastery import decode_recent, get_topic_mastery, mastery_from_history
+from observability import NOISY
+
+logger = logging.getLogger(__name__)
 
 
 class PerformanceAnalyzer:
@@ -16,78 +20,37 @@ class PerformanceAnalyzer:
     def analyze_user_performance(user_id: int) -> dict:
         """
         Analyze user performance across all topics (NO GEMINI CALLS)
-        Returns: { topic: { averageScore, attempts, trend, masteryLevel, recentScores } }
+        Returns: { topic: { averageScore, attempts, trend, masteryLevel, recentScores,
+                            decayedScore, masteryProbability } }
+
+        Reads the incrementally maintained topic_mastery rows (one per topic);
+        masteryLevel follows the decayed score so recent attempts count most.
         """
         try:
-            print(f"[PerformanceAnalyzer] Analyzing performance for user: {user_id}")
-            conn = get_db_connection()
-            cur = conn.cursor(dictionary=True)
-
-            # Query: Get aggregate stats per topic
-            query = """
-            SELECT
-                topic,
-                AVG(percentage) as average_score,
-                COUNT(*) as attempts,
-                MAX(taken_at) as last_attempted
-            FROM quiz_attempts
-            WHERE user_id = %s
-            GROUP BY topic
-            ORDER BY average_score ASC
-            """
-
-            cur.execute(query, (user_id,))
-            results = cur.fetchall()
+            logger.info("Analyzing performance for user %s", user_id, extra=NOISY)
+            results = get_topic_mastery(user_id)
+            if not results:
+                # No stored state yet (e.g. its update failed): fold the history instead
+                results = mastery_from_history(user_id)
 
             if not results:
-                print("[PerformanceAnalyzer] No quiz attempts found")
-                cur.close()
+                logger.debug("No quiz attempts found for user %s", user_id)
                 return None
 
-            print(f"[PerformanceAnalyzer] Found {len(results)} topics")
+            logger.debug("Found %d topics", len(results))
             analysis = {}
 
-            # For each topic, get trend analysis
             for row in results:
                 topic = row['topic']
-                
-                # Get last 5 attempts to calculate trend
-                trend_query = """
-                SELECT percentage
-                FROM quiz_attempts
-                WHERE user_id = %s AND topic = %s
-                ORDER BY taken_at DESC
-                LIMIT 5
-                """
-
-                cur.execute(trend_query, (user_id, topic))
-                trend_results = cur.fetchall()
-                recent_scores = [r['percentage'] for r in trend_results]
-
-                # Calculate trend
-                trend = 'stable'
-                if len(recent_scores) >= 2:
-                    recent_avg = sum(recent_scores[:2]) / 2
-                    older_avg = sum(recent_scores[2:]) / len(recent_scores[2:]) if len(recent_scores) > 2 else recent_avg
-                    if recent_avg > older_avg + 5:
-                        trend = 'improving'
-                    elif recent_avg < older_avg - 5:
-                        trend = 'declining'
-
-                # Determine mastery level
-                avg_score = row['average_score']
-                if avg_score >= 80:
-                    mastery_level = 'expert'
-                elif avg_score >= 70:
-                    mastery_level = 'proficient'
-                elif avg_score >= 60:
-                    mastery_level = 'intermediate'
-                else:
-                    mastery_level = 'novice'
+                recent_scores = decode_recent(row['recent_scores'])
+                trend = PerformanceAnalyzer._calculate_trend(recent_scores)
+                avg_score = row['score_sum'] / row['attempts']
+                decayed_score = float(row['decayed_score'])
+                mastery_level = PerformanceAnalyzer._mastery_level(decayed_score)
 
                 # Simple rule-based insight (no Gemini call)
                 ai_insight = PerformanceAnalyzer._generate_rule_based_insight(
-                    topic, avg_score, trend, recent_scores
+                    topic, decayed_score, trend, recent_scores
                 )
 
                 analysis[topic] = {
@@ -97,17 +60,41 @@ class PerformanceAnalyzer:
                     'masteryLevel': mastery_level,
                     'lastAttempted': str(row['last_attempted']) if row['last_attempted'] else None,
                     'recentScores': recent_scores,
+                    'decayedScore': round(decayed_score, 2),
+                    'masteryProbability': round(float(row['p_known']), 3),
                     'aiInsight': ai_insight  # Rule-based, not Gemini
                 }
 
-            cur.close()
-            print("[PerformanceAnalyzer] ✅ Analysis complete")
+            logger.debug("Analysis complete for user %s", user_id)
             return analysis
 
-        except Exception as e:
-            print(f"[PerformanceAnalyzer] ❌ Error: {str(e)}")
+        except Exception:
+            logger.exception("Performance analysis failed for user %s", user_id)
             raise
 
+    @staticmethod
+    def _calculate_trend(recent_scores: list) -> str:
+        """Compare the two latest scores (newest first) with the older ones"""
+        if len(recent_scores) < 2:
+            return 'stable'
+        recent_avg = sum(recent_scores[:2]) / 2
+        older_avg = sum(recent_scores[2:]) / len(recent_scores[2:]) if len(recent_scores) > 2 else recent_avg
+        if recent_avg > older_avg + 5:
+            return 'improving'
+        if recent_avg < older_avg - 5:
+            return 'declining'
+        return 'stable'
+
+    @staticmethod
+    def _mastery_level(avg_score: float) -> str:
+        if avg_score >= 80:
+            return 'expert'
+        if avg_score >= 70:
+            return 'proficient'
+        if avg_score >= 60:
+            return 'intermediate'
+        return 'novice'
+
     @staticmethod
     def _generate_rule_based_insight(topic: str, avg_score: float, trend: str, recent_scores: list) -> str:
         """Generate insight using RULES only (no Gemini API call)"""
@@ -126,7 +113,7 @@ class PerformanceAnalyzer:
             else:
                 return "Excellent mastery - maintain at this level"
         except Exception as e:
-            print(f"[PerformanceAnalyzer] Error generating insight: {str(e)}")
+            logger.warning("Error generating insight: %s", e)
             return "Keep practicing to improve"
 
     @staticmethod
@@ -141,21 +128,21 @@ class PerformanceAnalyzer:
             weak_topics = [
                 {'topic': topic, **stats}
                 for topic, stats in analysis.items()
-                if stats['averageScore'] < 70 or stats['trend'] == 'declining'
+                if stats['decayedScore'] < 70 or stats['trend'] == 'declining'
             ]
             
-            weak_topics.sort(key=lambda x: x['averageScore'])
+            weak_topics.sort(key=lambda x: x['decayedScore'])
             
-            print(f"[PerformanceAnalyzer] Found {len(weak_topics)} weak topics")
+            logger.debug("Found %d weak topics", len(weak_topics))
             return weak_topics
 
-        except Exception as e:
-            print(f"[PerformanceAnalyzer] Error identifying weak topics: {str(e)}")
+        except Exception:
+            logger.exception("Error identifying weak topics")
             raise
 
     @staticmethod
     def identify_strong_topics(user_id: int) -> list:
-        """Identify strong topics (score >= 80)"""
+        """Identify strong topics (decayed score >= 80)"""
         try:
             analysis = PerformanceAnalyzer.analyze_user_performance(user_id)
             if not analysis:
@@ -164,12 +151,12 @@ class PerformanceAnalyzer:
             strong_topics = [
                 {'topic': topic, **stats}
                 for topic, stats in analysis.items()
-                if stats['averageScore'] >= 80
+                if stats['decayedScore'] >= 80
             ]
 
-            print(f"[PerformanceAnalyzer] Found {len(strong_topics)} strong topics")
+            logger.debug("Found %d strong topics", len(strong_topics))
             return strong_topics
 
-        except Exception as e:
-            print(f"[PerformanceAnalyzer] Error identifying strong topics: {str(e)}")
+        except Exception:
+            logger.exception("Error identifying strong topics")
             raise
\ No newline at end of file
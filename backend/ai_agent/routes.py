@@ -7,8 +7,12 @@ AI Agent API Routes - Gemini-powered analysis endpoints
 from flask import Blueprint, request, jsonify
 from .service import AIAgentService
 from .performance_analyzer import PerformanceAnalyzer
+from .cohort import MAX_COHORT_USERS, cohort_report, is_instructor
 from auth.routes import decode_auth_token
 from db import get_db_connection
+import logging
+
+logger = logging.getLogger(__name__)
 
 ai_agent_bp = Blueprint('ai_agent', __name__)
 
@@ -39,7 +43,7 @@ def get_performance_analysis():
         if not user or "id" not in user:
             return jsonify({"success": False, "error": "Authentication required"}), 401
 
-        print(f"[API] Fetching Gemini analysis for user: {user['id']}")
+        logger.info("Fetching Gemini analysis for user %s", user['id'])
         
         analysis = PerformanceAnalyzer.analyze_user_performance(user['id'])
         
@@ -53,7 +57,7 @@ def get_performance_analysis():
         return jsonify({"success": True, "data": analysis})
 
     except Exception as e:
-        print(f"[API] Error: {str(e)}")
+        logger.exception("AI agent request failed")
         return jsonify({"success": False, "error": str(e)}), 500
 
 
@@ -65,14 +69,45 @@ def get_weak_topics():
         if not user or "id" not in user:
             return jsonify({"success": False, "error": "Authentication required"}), 401
 
-        print(f"[API] Fetching AI-identified weak topics for user: {user['id']}")
+        logger.info("Fetching AI-identified weak topics for user %s", user['id'])
         
         weak_topics = PerformanceAnalyzer.identify_weak_topics(user['id'])
         
         return jsonify({"success": True, "data": weak_topics})
 
     except Exception as e:
-        print(f"[API] Error: {str(e)}")
+        logger.exception("AI agent request failed")
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@ai_agent_bp.route('/cohort', methods=['GET'])
+def get_cohort_analytics():
+    """
+    GET /api/ai-agent/cohort?user_ids=1,2,3&days=90 - Class-wide topic
+    distributions, trends and at-risk students (instructors only)
+    """
+    try:
+        user = get_user_from_token()
+        if not user or "id" not in user:
+            return jsonify({"success": False, "error": "Authentication required"}), 401
+        if not is_instructor(user.get("username")):
+            return jsonify({"success": False, "error": "Instructor access required"}), 403
+
+        try:
+            days = min(max(int(request.args.get("days", 90)), 1), 365)
+            raw_ids = request.args.get("user_ids", "").strip()
+            user_ids = [int(u) for u in raw_ids.split(",") if u.strip()] if raw_ids else None
+        except ValueError:
+            return jsonify({"success": False, "error": "user_ids and days must be integers"}), 400
+        if user_ids is not None and len(user_ids) > MAX_COHORT_USERS:
+            return jsonify({"success": False, "error": f"At most {MAX_COHORT_USERS} user_ids"}), 400
+
+        logger.info("Cohort analytics for %s students over %d days by user %s",
+                    "all" if user_ids is None else len(user_ids), days, user['id'])
+        return jsonify({"success": True, "data": cohort_report(user_ids, days)})
+
+    except Exception as e:
+        logger.exception("AI agent request failed")
         return jsonify({"success": False, "error": str(e)}), 500
 
 
@@ -84,14 +119,14 @@ def run_agent_cycle():
         if not user or "id" not in user:
             return jsonify({"success": False, "error": "Authentication required"}), 401
 
-        print(f"[API] Running Gemini-powered agent cycle for user: {user['id']}")
+        logger.info("Running Gemini-powered agent cycle for user %s", user['id'])
         
         result = AIAgentService.run_agent_cycle(user['id'])
         
         return jsonify({"success": True, "data": result})
 
     except Exception as e:
-        print(f"[API] Error: {str(e)}")
+        logger.exception("AI agent request failed")
         return jsonify({"success": False, "error": str(e)}), 500
 
 
@@ -103,9 +138,9 @@ def get_scheduled_tests():
         if not user or "id" not in user:
             return jsonify({"success": False, "error": "Authentication required"}), 401
 
-        print(f"[API] Fetching AI-scheduled tests for user: {user['id']}")
+        logger.info("Fetching AI-scheduled tests for user %s", user['id'])
         
-        conn = get_db_connection()
+        conn = get_db_connection(user['id'])
         cur = conn.cursor(dictionary=True)
 
         query = """
@@ -128,5 +163,5 @@ def get_scheduled_tests():
         return jsonify({"success": True, "data": results or []})
 
     except Exception as e:
-        print(f"[API] Error: {str(e)}")
+        logger.exception("AI agent request failed")
         return jsonify({"success": False, "error": str(e)}), 500
\ No newline at end of file
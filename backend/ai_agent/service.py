@@ -3,19 +3,14 @@
 AI Agent Service - AI-scheduled tests now integrated with Google Calendar
 """
 
-from db import get_db_connection
+from db import for_each_database, get_db_connection
 from .performance_analyzer import PerformanceAnalyzer
 from datetime import datetime, timedelta
 import json
-import os
-from google import genai
+import logging
+from utils.clients import get_gemini_client
 
-# Initialize Gemini client
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise RuntimeError("GEMINI_API_KEY is not set in environment variables")
-
-gemini_client = genai.Client(api_key=GEMINI_API_KEY)
+logger = logging.getLogger(__name__)
 
 
 class AIAgentService:
@@ -28,40 +23,35 @@ class AIAgentService:
         Everything else uses rule-based logic
         """
         try:
-            print(f"\n[🤖 AI Agent] ========== STARTING OPTIMIZED CYCLE FOR USER {user_id} ==========")
+            logger.info("Starting agent cycle for user %s", user_id)
 
             # Step 1: Analyze performance (rule-based, NO Gemini)
-            print("[🤖 AI Agent] Step 1: Analyzing performance...")
+            logger.debug("Step 1: analyzing performance")
             analysis = PerformanceAnalyzer.analyze_user_performance(user_id)
             
             if not analysis or len(analysis) == 0:
-                print("[🤖 AI Agent] ❌ No quiz history found")
+                logger.info("No quiz history for user %s", user_id)
                 return {
                     'status': 'no_data',
                     'message': 'No quiz attempts found'
                 }
 
-            print("[🤖 AI Agent] ✅ Performance analyzed")
-
             # Step 2: Identify weak and strong topics (rule-based, NO Gemini)
-            print("[🤖 AI Agent] Step 2: Identifying weak/strong topics...")
+            logger.debug("Step 2: identifying weak/strong topics")
             weak_topics = PerformanceAnalyzer.identify_weak_topics(user_id)
             strong_topics = PerformanceAnalyzer.identify_strong_topics(user_id)
-            print(f"[🤖 AI Agent] ✅ Found {len(weak_topics)} weak topics, {len(strong_topics)} strong topics")
+            logger.debug("Found %d weak topics, %d strong topics", len(weak_topics), len(strong_topics))
 
             # Step 3: Generate Gemini study plan (ONLY 1 API CALL)
-            print("[🤖 AI Agent] Step 3: Generating AI study plan...")
+            logger.debug("Step 3: generating study plan")
             recommendations = AIAgentService._generate_gemini_study_plan(
                 user_id, analysis, weak_topics, strong_topics
             )
-            print("[🤖 AI Agent] ✅ Study plan generated")
 
             # Step 4: Schedule adaptive tests (rule-based scheduling + GCal integration)
-            print("[🤖 AI Agent] Step 4: Scheduling adaptive tests...")
+            logger.debug("Step 4: scheduling adaptive tests")
             scheduled_tests = AIAgentService._schedule_adaptive_tests(user_id, recommendations)
-            print(f"[🤖 AI Agent] ✅ Scheduled {len(scheduled_tests)} tests")
-
-            print("[🤖 AI Agent] ========== CYCLE COMPLETE ==========\n")
+            logger.info("Agent cycle complete for user %s: %d tests scheduled", user_id, len(scheduled_tests))
 
             return {
                 'status': 'success',
@@ -72,8 +62,8 @@ class AIAgentService:
                 'scheduledTests': scheduled_tests
             }
 
-        except Exception as e:
-            print(f"[🤖 AI Agent] ❌ Error: {str(e)}")
+        except Exception:
+            logger.exception("Agent cycle failed for user %s", user_id)
             raise
 
     @staticmethod
@@ -83,16 +73,16 @@ class AIAgentService:
         Generate intelligent study plan using Gemini
         """
         try:
-            print("[AI Agent] Calling Gemini for study plan (1 API call)...")
+            logger.debug("Calling Gemini for study plan")
 
             # Build context for Gemini
             weak_topics_summary = "\n".join([
-                f"- {t['topic']}: {t['averageScore']}% ({t['masteryLevel']}, trend: {t['trend']})"
+                f"- {t['topic']}: {t['decayedScore']}% recent, {t['averageScore']}% overall ({t['masteryLevel']}, trend: {t['trend']})"
                 for t in weak_topics[:5]
             ])
 
             strong_topics_summary = "\n".join([
-                f"- {t['topic']}: {t['averageScore']}%"
+                f"- {t['topic']}: {t['decayedScore']}%"
                 for t in strong_topics[:3]
             ])
 
@@ -126,7 +116,7 @@ Generate a study plan with specific recommendations. Return ONLY this JSON (no m
   "overall_feedback": "1-2 sentence encouraging feedback with specific next steps"
 }}"""
 
-            response = gemini_client.models.generate_content(
+            response = get_gemini_client().models.generate_content(
                 model="gemini-2.5-flash",
                 contents=prompt,
                 config={"response_mime_type": "application/json"}
@@ -141,14 +131,14 @@ Generate a study plan with specific recommendations. Return ONLY this JSON (no m
             }
 
         except Exception as e:
-            print(f"[AI Agent] ⚠️ Gemini call failed, using rule-based fallback: {str(e)}")
+            logger.warning("Gemini call failed, using rule-based fallback: %s", e)
             # FALLBACK: Use simple rule-based recommendations
             return {
                 'priorityTopics': [
                     {
                         'topic': t['topic'],
-                        'reason': f"Below proficiency ({t['averageScore']:.0f}%)",
-                        'suggested_difficulty': 'easy' if t['averageScore'] < 50 else 'medium',
+                        'reason': f"Below proficiency ({t['decayedScore']:.0f}%)",
+                        'suggested_difficulty': 'easy' if t['decayedScore'] < 50 else 'medium',
                         'days_until_next_test': 2 if t['trend'] == 'declining' else 4,
                         'focus_area': 'Fundamentals'
                     }
@@ -166,99 +156,177 @@ Generate a study plan with specific recommendations. Return ONLY this JSON (no m
                 'generalAdvice': 'Focus on weak areas and maintain your strengths!'
             }
 
+    @staticmethod
+    def _plan_tests(recommendations: dict) -> list:
+        """Turn Gemini/rule-based recommendations into test rows to schedule"""
+        now = datetime.now()
+        planned = []
+
+        # Priority topics
+        for topic_data in recommendations.get('priorityTopics', []):
+            planned.append({
+                'topic': topic_data['topic'],
+                'date': now + timedelta(days=topic_data.get('days_until_next_test', 3)),
+                'type': 'priority',
+                'difficulty': topic_data.get('suggested_difficulty', 'medium'),
+                'reason': f"AI Priority: {topic_data.get('focus_area', 'Weak performance')}",
+            })
+
+        # Reinforcement topics
+        for topic_data in recommendations.get('reinforcementTopics', []):
+            planned.append({
+                'topic': topic_data['topic'],
+                'date': now + timedelta(days=topic_data.get('days_until_next_test', 7)),
+                'type': 'reinforcement',
+                'difficulty': topic_data.get('suggested_difficulty', 'hard'),
+                'reason': "AI Reinforcement: Maintain mastery",
+            })
+        return planned
+
     @staticmethod
     def _schedule_adaptive_tests(user_id: int, recommendations: dict) -> list:
-        """Schedule adaptive tests in database AND Google Calendar"""
+        """
+        Upsert adaptive tests in the database, then mirror them to Google
+        Calendar. Each (user, topic) has at most one pending test, so re-runs
+        reschedule existing rows instead of adding new ones. The DB
+        transaction commits before any calendar call.
+        """
         try:
-            conn = get_db_connection()
-            cur = conn.cursor()
+            # Keyed on the folded topic: uq_scheduled_tests_pending compares
+            # topics case-insensitively, so "Algebra" reschedules "algebra"
+            planned = {}
+            for test in AIAgentService._plan_tests(recommendations):
+                planned.setdefault(test['topic'].lower(), test)  # priority wins over reinforcement
+            tests = list(planned.values())
+            if not tests:
+                return []
+
+            conn = get_db_connection(user_id)
+            cur = conn.cursor(dictionary=True)
+
+            rows = ", ".join(["(%s, %s, %s, %s, %s, 'pending', 'ai_agent', NOW())"] * len(tests))
+            params = []
+            for t in tests:
+                params += [user_id, t['topic'], t['date'], t['difficulty'], t['reason']]
+
+            try:
+                cur.execute(f"""
+                INSERT INTO scheduled_tests
+                (user_id, topic, scheduled_date, difficulty_level, reason, status, created_by, created_at)
+                VALUES {rows}
+                ON DUPLICATE KEY UPDATE
+                    scheduled_date = VALUES(scheduled_date),
+                    difficulty_level = VALUES(difficulty_level),
+                    reason = VALUES(reason)
+                """, params)
+
+                placeholders = ", ".join(["%s"] * len(tests))
+                cur.execute(f"""
+                SELECT id, topic, calendar_event_id FROM scheduled_tests
+                WHERE user_id = %s AND status = 'pending' AND topic IN ({placeholders})
+                """, [user_id] + [t['topic'] for t in tests])
+                for row in cur.fetchall():
+                    test = planned.get(row['topic'].lower())
+                    if test is not None:
+                        test['id'] = row['id']
+                        test['calendar_event_id'] = row['calendar_event_id']
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cur.close()
+
+            for t in tests:
+                logger.debug("Scheduled %s test: %s on %s", t['type'], t['topic'], t['date'])
+
+            AIAgentService._sync_tests_to_calendar(user_id, [t for t in tests if 'id' in t])
+
+            return [
+                {
+                    'topic': t['topic'],
+                    'date': str(t['date']),
+                    'type': t['type'],
+                    'difficulty': t['difficulty']
+                }
+                for t in tests
+            ]
 
-            scheduled_tests = []
-            now = datetime.now()
-
-            insert_query = """
-            INSERT INTO scheduled_tests
-            (user_id, topic, scheduled_date, difficulty_level, reason, status, created_by, created_at)
-            VALUES (%s, %s, %s, %s, %s, 'pending', 'ai_agent', NOW())
-            """
-
-            # Schedule priority topics
-            for topic_data in recommendations.get('priorityTopics', []):
-                test_date = now + timedelta(days=topic_data.get('days_until_next_test', 3))
-                reason = f"AI Priority: {topic_data.get('focus_area', 'Weak performance')}"
-
-                try:
-                    cur.execute(insert_query, [
-                        user_id,
-                        topic_data['topic'],
-                        test_date,
-                        topic_data.get('suggested_difficulty', 'medium'),
-                        reason
-                    ])
-
-                    # CREATE GOOGLE CALENDAR EVENT (NEW)
-                    try:
-                        from calendar_app.routes import create_calendar_event_for_test
-                        create_calendar_event_for_test(
-                            user_id=user_id,
-                            topic=topic_data['topic'],
-                            scheduled_date=test_date,
-                            difficulty=topic_data.get('suggested_difficulty', 'medium')
-                        )
-                    except Exception as gcal_error:
-                        print(f"⚠️ GCal creation failed (test still scheduled): {gcal_error}")
-
-                    scheduled_tests.append({
-                        'topic': topic_data['topic'],
-                        'date': str(test_date),
-                        'type': 'priority',
-                        'difficulty': topic_data.get('suggested_difficulty', 'medium')
-                    })
-                    print(f"✅ Scheduled priority test: {topic_data['topic']} on {test_date}")
-                except Exception as e:
-                    print(f"❌ Error scheduling priority test for {topic_data['topic']}: {str(e)}")
-
-            # Schedule reinforcement topics
-            for topic_data in recommendations.get('reinforcementTopics', []):
-                test_date = now + timedelta(days=topic_data.get('days_until_next_test', 7))
-                reason = "AI Reinforcement: Maintain mastery"
-
-                try:
-                    cur.execute(insert_query, [
-                        user_id,
-                        topic_data['topic'],
-                        test_date,
-                        topic_data.get('suggested_difficulty', 'hard'),
-                        reason
-                    ])
-
-                    # CREATE GOOGLE CALENDAR EVENT (NEW)
-                    try:
-                        from calendar_app.routes import create_calendar_event_for_test
-                        create_calendar_event_for_test(
-                            user_id=user_id,
-                            topic=topic_data['topic'],
-                            scheduled_date=test_date,
-                            difficulty=topic_data.get('suggested_difficulty', 'hard')
-                        )
-                    except Exception as gcal_error:
-                        print(f"⚠️ GCal creation failed (test still scheduled): {gcal_error}")
-
-                    scheduled_tests.append({
-                        'topic': topic_data['topic'],
-                        'date': str(test_date),
-                        'type': 'reinforcement',
-                        'difficulty': topic_data.get('suggested_difficulty', 'hard')
-                    })
-                    print(f"✅ Scheduled reinforcement test: {topic_data['topic']} on {test_date}")
-                except Exception as e:
-                    print(f"❌ Error scheduling reinforcement test for {topic_data['topic']}: {str(e)}")
+        except Exception:
+            logger.exception("Error scheduling tests for user %s", user_id)
+            raise
 
+    @staticmethod
+    def _sync_tests_to_calendar(user_id: int, tests: list):
+        """Mirror tests to the calendar in one batch and store new event ids"""
+        if not tests:
+            return
+        try:
+            from calendar_app.routes import sync_test_events_batch
+            event_ids = sync_test_events_batch(user_id, tests)
+        except Exception as gcal_error:
+            logger.warning("GCal sync failed (tests still scheduled): %s", gcal_error)
+            return
+
+        known = {t['id']: t.get('calendar_event_id') for t in tests}
+        updates = [(event_id, test_id, user_id) for test_id, event_id in event_ids.items()
+                   if known.get(test_id) != event_id]
+        if not updates:
+            return
+
+        conn = get_db_connection(user_id)
+        cur = conn.cursor()
+        try:
+            cur.executemany(
+                "UPDATE scheduled_tests SET calendar_event_id = %s WHERE id = %s AND user_id = %s",
+                updates
+            )
             conn.commit()
+        finally:
             cur.close()
 
-            return scheduled_tests
+    @staticmethod
+    def compact_scheduled_tests(expire_after_days: int = 7, purge_after_days: int = 90,
+                                batch_size: int = 1000) -> dict:
+        """
+        Expire pending tests whose date passed more than `expire_after_days`
+        ago, and purge expired/superseded rows older than `purge_after_days`.
+        Works in small batches so it never holds long locks. Safe to run from
+        the cron thread (uses its own pool connection per database).
+        """
+        now = datetime.now()
 
-        except Exception as e:
-            print(f"[AI Agent] Error scheduling tests: {str(e)}")
-            raise
\ No newline at end of file
+        def compact(conn):
+            expired = purged = 0
+            cur = conn.cursor()
+            try:
+                while True:
+                    cur.execute("""
+                    UPDATE scheduled_tests SET status = 'expired'
+                    WHERE status = 'pending' AND scheduled_date < %s
+                    LIMIT %s
+                    """, (now - timedelta(days=expire_after_days), batch_size))
+                    conn.commit()
+                    expired += cur.rowcount
+                    if cur.rowcount < batch_size:
+                        break
+                while True:
+                    cur.execute("""
+                    DELETE FROM scheduled_tests
+                    WHERE status IN ('expired', 'superseded') AND scheduled_date < %s
+                    LIMIT %s
+                    """, (now - timedelta(days=purge_after_days), batch_size))
+                    conn.commit()
+                    purged += cur.rowcount
+                    if cur.rowcount < batch_size:
+                        break
+            finally:
+                cur.close()
+            return expired, purged
+
+        # Every database (global + shards) holds scheduled tests; compact them in parallel
+        results = for_each_database(compact)
+        expired = sum(r[0] for r in results)
+        purged = sum(r[1] for r in results)
+        logger.info("Compacted scheduled_tests: %d expired, %d purged", expired, purged)
+        return {'expired': expired, 'purged': purged}
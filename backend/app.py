@@ -11,11 +11,21 @@ if APP_DIR not in sys.path:
 
 from flask import Flask, jsonify, g, request
 from flask_cors import CORS
-from db import get_db_connection
 import mysql.connector.errors
 from jobs.cron_jobs import start_agent_cron_job
+from utils.json_provider import EdumateJSONProvider
+from observability import configure_logging, init_observability, init_request_ids
+import logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+# One JSON encoder for every blueprint: serializes DB row types natively
+app.json = EdumateJSONProvider(app)
+# Request latency / DB / LLM metrics on /metrics; registered before the DB hook below
+init_observability(app)
+init_request_ids(app)
 app.secret_key = os.environ.get("FLASK_SECRET_KEY", "407e6953e465af96b5924046abf3a16adfbae2cd20864d9eeb913e6b252221b3")
 app.config.update(
     SESSION_COOKIE_SAMESITE="None",
@@ -39,14 +49,17 @@ CORS(
     supports_credentials=True   # <-- For OAuth and cookie sessions, use True
 )
 
-@app.before_request
-def before_request():
-    if "db" not in g:
-        g.db = get_db_connection()
-
+# Connections are checked out lazily by get_db_connection: the primary on first
+# use, a replica for @reads functions, a shard per sharded user touched, so
+# requests only hold what they touch
 @app.teardown_appcontext
 def teardown_db(exception):
-    db = g.pop("db", None)
+    for key in ("db", "db_replica"):
+        _close_connection(g.pop(key, None))
+    for conn in g.pop("db_shards", {}).values():
+        _close_connection(conn)
+
+def _close_connection(db):
     if db is not None:
         try:
             db.close()
@@ -64,44 +77,51 @@ def teardown_db(exception):
             else:
                 raise e
 
-print("\n🔧 Registering blueprints...")
+logger.info("Registering blueprints")
 
 try:
     from auth.routes import auth_bp
     app.register_blueprint(auth_bp)
-    print("✅ Auth blueprint registered successfully")
+    logger.info("Auth blueprint registered")
 except Exception as e:
-    print(f"❌ Auth blueprint registration failed: {e}")
+    logger.exception("Auth blueprint registration failed")
 
 try:
     from quiz.routes import quiz_bp
     app.register_blueprint(quiz_bp, url_prefix="/quiz")
-    print("✅ Quiz blueprint registered successfully")
+    logger.info("Quiz blueprint registered")
 except Exception as e:
-    print(f"❌ Quiz blueprint registration failed: {e}")
+    logger.exception("Quiz blueprint registration failed")
 
 try:
     from chat.routes import chat_bp
     app.register_blueprint(chat_bp, url_prefix="/chat")
-    print("✅ Chat blueprint registered successfully")
+    logger.info("Chat blueprint registered")
+except Exception as e:
+    logger.exception("Chat blueprint registration failed")
+
+try:
+    # Chat messages a previous process could not write before it stopped
+    from chat.write_buffer import replay_spool
+    replay_spool()
 except Exception as e:
-    print(f"❌ Chat blueprint registration failed: {e}")
+    logger.exception("Chat spool replay failed")
 
 try:
     from study.routes import study_bp
     app.register_blueprint(study_bp, url_prefix="/study")
-    print("✅ Study blueprint registered successfully")
+    logger.info("Study blueprint registered")
 except Exception as e:
-    print(f"❌ Study blueprint registration failed: {e}")
+    logger.exception("Study blueprint registration failed")
 
 # ========== GOOGLE CALENDAR INTEGRATION BELOW ==========
 
 try:
     from calendar_app.routes import calendar_bp
     app.register_blueprint(calendar_bp, url_prefix="/calendar_app")
-    print("✅ Calendar blueprint registered successfully")
+    logger.info("Calendar blueprint registered")
 except Exception as e:
-    print(f"❌ Calendar blueprint registration failed: {e}")
+    logger.exception("Calendar blueprint registration failed")
 
 # ========== END CALENDAR INTEGRATION ADDITIONS ==========
 # Add after calendar_bp registration in app.py
@@ -109,18 +129,18 @@ except Exception as e:
 try:
     from ai_agent.routes import ai_agent_bp
     app.register_blueprint(ai_agent_bp, url_prefix="/ai-agent")
-    print("✅ AI Agent blueprint registered successfully")
+    logger.info("AI Agent blueprint registered")
 except Exception as e:
-    print(f"❌ AI Agent blueprint registration failed: {e}")
+    logger.exception("AI Agent blueprint registration failed")
 
 # ========== CODING ASSISTANT INTEGRATION BELOW ==========
 
 try:
     from coding_assistant.routes import coding_assistant_bp
     app.register_blueprint(coding_assistant_bp, url_prefix="/coding-assistant")
-    print("✅ Coding Assistant blueprint registered successfully")
+    logger.info("Coding Assistant blueprint registered")
 except Exception as e:
-    print(f"❌ Coding Assistant blueprint registration failed: {e}")
+    logger.exception("Coding Assistant blueprint registration failed")
 
 # ========== END CODING ASSISTANT INTEGRATION ==========
 
@@ -151,7 +171,7 @@ def not_found(e):
 
 @app.errorhandler(405)
 def method_not_allowed(e):
-    print(f"❌ 405 Error: {request.method} {request.path}")
+    logger.warning("405 %s %s", request.method, request.path)
     return jsonify({
         "success": False,
         "error": "Method not allowed",
@@ -161,7 +181,7 @@ def method_not_allowed(e):
 
 @app.errorhandler(500)
 def internal_error(e):
-    print(f"❌ 500 Error: {str(e)}")
+    logger.error("500 Internal server error: %s", e)
     return jsonify({"success": False, "error": "Internal server error"}), 500
 
 if __name__ == "__main__":
@@ -170,7 +190,7 @@ if __name__ == "__main__":
     print("=" * 60)
     # ✅ START CRON JOBS ON SERVER BOOT
     '''try:
-        start_agent_cron_job()
+        start_agent_cron_job(app)
         print("✅ AI Agent cron job started")
     except Exception as e:
         print(f"❌ Failed to start cron jobs: {e}")
@@ -3,7 +3,7 @@ from werkzeug.security import check_password_hash, generate_password_hash
 import jwt
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
-from db import get_db_connection
+from db import get_db_connection, place_new_user
 
 load_dotenv()
 
@@ -102,6 +102,7 @@ def signup():
         fetch_cur.execute('SELECT id, username FROM users WHERE username = %s', (username,))
         user = fetch_cur.fetchone()
         fetch_cur.close()
+        place_new_user(user["id"])
         user_data = {"id": user["id"], "username": user["username"]}
         token = create_auth_token(user_data)
 
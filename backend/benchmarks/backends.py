@@ -0,0 +1,127 @@
+"""
+MySQL vs SQLite on the hot queries.
+
+Each backend runs in its own subprocess (db.py picks the backend from
+DB_BACKEND at import): the worker seeds a synthetic dataset with
+tools.synthetic_data, then times the migrations.HOT_QUERIES statements and
+the db.py functions behind the dashboard, chat and quiz pages for the
+busiest seeded user. The parent prints the results side by side.
+
+SQLite runs against a fresh temporary file. MySQL uses the MYSQL_* env vars
+and adds rows on every run, so point it at a scratch database.
+
+Usage (from backend/):
+    python -m benchmarks.backends                          # sqlite only
+    python -m benchmarks.backends --backends sqlite,mysql --users 500
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+
+def _busiest_user(cur):
+    cur.execute("SELECT user_id FROM quiz_attempts GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1")
+    user_id = cur.fetchone()[0]
+    cur.execute("SELECT session_id FROM chats WHERE user_id = %s GROUP BY session_id "
+                "ORDER BY COUNT(*) DESC LIMIT 1", (user_id,))
+    return user_id, cur.fetchone()[0]
+
+
+def run_worker(args) -> dict:
+    from flask import Flask
+
+    import db
+    from benchmarks.micro import measure
+    from migrations import HOT_QUERIES
+    from tools.synthetic_data import BulkWriter, generate
+
+    db.init_db_pool()
+    conn = db.DB_POOL.get_connection()
+    try:
+        seed = argparse.Namespace(
+            users=args.users, attempts_per_user=30, answers_per_attempt=5, sessions_per_user=6,
+            messages_per_session=12, study_sessions_per_user=20, topics=60, zipf=1.1, days=365,
+            prefix="bench", seed=7, progress=0,
+        )
+        generate(BulkWriter(conn, "insert", 2000), conn, seed)
+        cur = conn.cursor()
+        user_id, session_id = _busiest_user(cur)
+        cur.close()
+    finally:
+        conn.close()
+
+    def query(conn, sql, params):
+        def run():
+            cur = conn.cursor()
+            cur.execute(sql, params)
+            cur.fetchall()
+            cur.close()
+        return run
+
+    def uncached_progress():
+        db.invalidate_progress(user_id)
+        db.compute_progress(user_id)
+
+    results = {}
+    app = Flask(__name__)
+    with app.app_context():
+        conn = db.get_db_connection()
+        cases = {}
+        for name, _table, _index, sql, params in HOT_QUERIES:
+            params = (session_id,) if name == "session transcript" else (user_id,) + tuple(params[1:])
+            cases[f"sql: {name}"] = query(conn, sql, params)
+        cases.update({
+            "db.get_quiz_history": lambda: db.get_quiz_history(user_id),
+            "db.get_quiz_stats": lambda: db.get_quiz_stats(user_id),
+            "db.get_chat_sessions": lambda: db.get_chat_sessions(user_id),
+            "db.get_chat_history[session]": lambda: db.get_chat_history(user_id, session_id=session_id),
+            "db.get_study_sessions": lambda: db.get_study_sessions(user_id),
+            "db.compute_progress[uncached]": uncached_progress,
+            "db.save_chat_message": lambda: db.save_chat_message(user_id, "user", "benchmark", session_id),
+        })
+        for name, fn in cases.items():
+            results[name] = measure(fn, args.repeat)
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="sqlite", help="comma-separated: sqlite,mysql")
+    parser.add_argument("--users", type=int, default=200, help="synthetic users to seed per backend")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        json.dump(run_worker(args), sys.stdout)
+        return 0
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in backends:
+            env = dict(os.environ, DB_BACKEND=backend, LOG_LEVEL="WARNING",
+                       SQLITE_PATH=os.path.join(tmp, "bench.sqlite3"))
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.backends", "--worker", backend,
+                 "--users", str(args.users), "--repeat", str(args.repeat)],
+                env=env, capture_output=True, text=True,
+            )
+            if out.returncode != 0:
+                print(f"{backend} worker failed:\n{out.stderr}", file=sys.stderr)
+                return 1
+            results[backend] = json.loads(out.stdout.strip().splitlines()[-1])
+
+    names = list(next(iter(results.values())))
+    print(f"{'case':<34}" + "".join(f"{b + ' us':>14}" for b in backends))
+    for name in names:
+        print(f"{name:<34}" + "".join(f"{results[b][name] * 1e6:>14.1f}" for b in backends))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+In-process stand-ins for MySQL and the LLM SDKs, for benchmarks that drive
+Flask routes through the test client without external services.
+
+    install_fakes()   route db connections and the Groq/Gemini getters here
+"""
+
+import random
+from types import SimpleNamespace
+
+TOPICS = [f"Topic {i}" for i in range(20)]
+
+
+class FakeCursor:
+    """Answers the handful of query shapes the benchmarked routes issue"""
+
+    def __init__(self, dictionary=False):
+        self.dictionary = dictionary
+        self.query = ""
+        self.lastrowid = 1
+        self.rowcount = 1
+        self._rnd = random.Random(7)
+
+    def execute(self, query, params=None):
+        self.query = query
+
+    def executemany(self, query, seq):
+        self.query = query
+        self.rowcount = len(seq)
+
+    def fetchone(self):
+        if "FROM users" in self.query:
+            return {"id": 1, "username": "bench", "email": "bench@example.com", "name": "Bench",
+                    "password_hash": "", "created_at": None}
+        return None
+
+    def fetchall(self):
+        if "GROUP BY topic" in self.query:
+            return [{"topic": t, "average_score": 40 + 3 * i, "attempts": 5, "last_attempted": None}
+                    for i, t in enumerate(TOPICS)]
+        if "SELECT percentage" in self.query:
+            return [{"percentage": self._rnd.randint(30, 100)} for _ in range(5)]
+        return []
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def cursor(self, dictionary=False, **kwargs):
+        return FakeCursor(dictionary)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeGroq:
+    """chat.completions.create(...) -> canned reply"""
+
+    def __init__(self, reply="Normalisation removes redundancy by splitting tables."):
+        message = SimpleNamespace(content=reply)
+        response = SimpleNamespace(choices=[SimpleNamespace(message=message)])
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=lambda **kwargs: response))
+
+
+class FakeGemini:
+    """models.generate_content(...) -> canned JSON text"""
+
+    def __init__(self, text='{"priority_topics": [], "reinforcement_topics": [], "overall_feedback": "ok"}'):
+        response = SimpleNamespace(text=text)
+        self.models = SimpleNamespace(generate_content=lambda **kwargs: response)
+
+
+def install_fakes():
+    import db
+    from utils import clients
+
+    db._acquire_connection = FakeConnection
+    clients._groq_client = FakeGroq()
+    clients._gemini_client = FakeGemini()
+
+
+def auth_header(user_id: int = 1, username: str = "bench") -> dict:
+    from auth.routes import create_auth_token
+    return {"Authorization": f"Bearer {create_auth_token({'id': user_id, 'username': username})}"}
@@ -0,0 +1,120 @@
+"""
+JSON serialization benchmark for DB rows.
+
+Serializes 10k study-session rows and 10k chat-message rows (the value types
+mysql-connector returns: Decimal, datetime, date, TIME as timedelta) through:
+
+  legacy   the old study.routes.clean_json walk + stdlib json.dumps
+  stdlib   utils.serialization.dumps with the stdlib encoder
+  orjson   utils.serialization.dumps with orjson (skipped if not installed)
+
+Usage (from backend/):
+    python -m benchmarks.json_serialization [--rows 10000] [--repeat 5]
+"""
+
+import argparse
+import json
+import random
+import sys
+import timeit
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from utils import serialization
+
+
+def _legacy_clean_json(obj):
+    # Verbatim copy of the removed study.routes.clean_json, kept as the baseline
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            obj[k] = _legacy_clean_json(v)
+        return obj
+    elif isinstance(obj, list):
+        return [_legacy_clean_json(x) for x in obj]
+    elif isinstance(obj, Decimal):
+        return float(obj)
+    elif isinstance(obj, (datetime,)):
+        return obj.isoformat()
+    elif isinstance(obj, (timedelta,)):
+        return obj.total_seconds()
+    else:
+        return obj
+
+
+def _legacy_dumps(rows):
+    # Flask's previous default: sorted keys, compact separators, date fallback
+    cleaned = _legacy_clean_json([dict(r) for r in rows])
+    return json.dumps(cleaned, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def make_study_sessions(n: int):
+    rnd = random.Random(1)
+    base = datetime(2025, 1, 1, 9, 0)
+    return [{
+        "id": i,
+        "user_id": rnd.randint(1, 500),
+        "title": f"Revise chapter {i % 40}",
+        "subject": rnd.choice(["Maths", "Physics", "DBMS", "OS", "Networks"]),
+        "duration": rnd.choice([30, 45, 60, 90]),
+        "date": (base + timedelta(days=i % 120)).date(),
+        "time": timedelta(hours=rnd.randint(6, 22), minutes=rnd.choice([0, 30])),
+        "type": "study",
+        "priority": rnd.choice(["low", "medium", "high"]),
+        "completed": rnd.randint(0, 1),
+        "notes": "",
+        "created_at": base + timedelta(minutes=i),
+        "calendar_event_id": None,
+        "hours": Decimal(rnd.randint(1, 300)) / 60,
+    } for i in range(n)]
+
+
+def make_chat_messages(n: int):
+    rnd = random.Random(2)
+    base = datetime(2025, 1, 1, 9, 0)
+    return [{
+        "id": i,
+        "role": "user" if i % 2 == 0 else "bot",
+        "message": "Explain normalisation in databases " * rnd.randint(1, 8),
+        "session_id": i // 20,
+        "created_at": base + timedelta(seconds=i * 7),
+    } for i in range(n)]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    datasets = {
+        "study_sessions": make_study_sessions(args.rows),
+        "chat_messages": make_chat_messages(args.rows),
+    }
+    fast = serialization.orjson
+
+    def stdlib_dumps(rows):
+        serialization.orjson = None
+        try:
+            return serialization.dumps(rows, sort_keys=True)
+        finally:
+            serialization.orjson = fast
+
+    paths = {
+        "legacy": _legacy_dumps,
+        "stdlib": stdlib_dumps,
+    }
+    if fast is not None:
+        paths["orjson"] = lambda rows: serialization.dumps(rows, sort_keys=True)
+
+    print(f"{'dataset':<16}{'path':<10}{'best ms':>10}{'speedup':>10}")
+    for name, rows in datasets.items():
+        legacy_best = None
+        for label, fn in paths.items():
+            best = min(timeit.repeat(lambda: fn(rows), number=1, repeat=args.repeat)) * 1000
+            legacy_best = legacy_best or best
+            print(f"{name:<16}{label:<10}{best:>10.1f}{legacy_best / best:>9.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Request throughput under the old print() diagnostics vs. structured logging.
+
+Drives POST /chat and GET /ai-agent/analysis through the Flask test client
+(MySQL and Groq/Gemini replaced by benchmarks.fakes) with three logging
+setups, each writing to the same sink:
+
+  print   legacy behaviour: every diagnostic formatted and written with a
+          flush on the request thread (module loggers swapped for a shim)
+  sync    logging with the JSON formatter, handler on the request thread
+  queue   observability.log.configure_logging(): QueueHandler + listener
+          thread, level filtering and NOISY sampling
+
+--sink-latency-us adds a delay to each sink write, emulating stdout piped to
+a slow log collector.
+
+Usage (from backend/):
+    python -m benchmarks.logging_throughput [--requests 2000] [--sink-latency-us 50]
+"""
+
+import argparse
+import io
+import logging
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("AUTO_MIGRATE", "0")
+os.environ.setdefault("CHAT_WRITE_BEHIND", "0")
+os.environ.setdefault("PROFILE_SAMPLE_RATE", "0")
+
+from benchmarks.fakes import auth_header, install_fakes
+
+# Modules whose loggers the benchmarked endpoints write to
+LOGGED_MODULES = [
+    "app", "db", "chat.routes", "chat.service", "chat.write_buffer",
+    "ai_agent.routes", "ai_agent.performance_analyzer", "observability.middleware",
+]
+
+
+class SlowSink(io.TextIOBase):
+    """File sink with an optional per-write delay"""
+
+    def __init__(self, path: str, latency: float):
+        self._file = open(path, "w", buffering=1)
+        self._latency = latency
+
+    def write(self, s):
+        n = self._file.write(s)
+        if self._latency:
+            time.sleep(self._latency)
+        return n
+
+    def flush(self):
+        self._file.flush()
+
+
+class PrintLogger:
+    """Stands in for a module logger with the old print() behaviour"""
+
+    def __init__(self, sink):
+        self._sink = sink
+
+    def _print(self, msg, *args, **kwargs):
+        print(msg % args if args else msg, file=self._sink, flush=True)
+
+    debug = info = warning = error = exception = _print
+
+
+def _run(client, requests: int, headers: dict) -> dict:
+    results = {}
+    for name, call in (
+        ("POST /chat", lambda: client.post("/chat", json={"message": "What is 3NF?", "session_id": 1})),
+        ("GET /ai-agent/analysis", lambda: client.get("/ai-agent/analysis", headers=headers)),
+    ):
+        for _ in range(20):  # warm up
+            call()
+        start = time.perf_counter()
+        for _ in range(requests):
+            call()
+        results[name] = requests / (time.perf_counter() - start)
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--sink-latency-us", type=float, default=0)
+    args = parser.parse_args(argv)
+
+    report = sys.stdout
+    sink = SlowSink(os.path.join(tempfile.mkdtemp(), "bench.log"), args.sink_latency_us / 1e6)
+    sys.stdout = sink  # configure_logging() binds its handler to sys.stdout
+
+    import app as app_module
+    from observability import log as obs_log
+    install_fakes()
+    client = app_module.app.test_client()
+    headers = auth_header()
+    modules = {name: sys.modules[name] for name in LOGGED_MODULES if name in sys.modules}
+    real_loggers = {name: module.logger for name, module in modules.items()}
+    root = logging.getLogger()
+
+    # The app configured the queue listener on import; stop it for the first two modes
+    obs_log.shutdown_logging()
+    root.handlers = []
+    results = {}
+
+    # print: every message written synchronously
+    for module in modules.values():
+        module.logger = PrintLogger(sink)
+    results["print"] = _run(client, args.requests, headers)
+    for name, module in modules.items():
+        module.logger = real_loggers[name]
+
+    # sync: logging, but the handler formats and writes on the request thread
+    handler = logging.StreamHandler(sink)
+    handler.setFormatter(obs_log.JSONFormatter())
+    handler.addFilter(obs_log.RequestIdFilter())
+    handler.addFilter(obs_log.SamplingFilter(float(os.environ.get("LOG_NOISY_SAMPLE_RATE", 0.01))))
+    root.handlers = [handler]
+    results["sync"] = _run(client, args.requests, headers)
+
+    # queue: the production setup
+    obs_log.configure_logging()
+    results["queue"] = _run(client, args.requests, headers)
+    obs_log.shutdown_logging()
+
+    sys.stdout = report
+    print(f"{'endpoint':<26}{'mode':<8}{'req/s':>10}{'vs print':>10}")
+    for endpoint in results["print"]:
+        baseline = results["print"][endpoint]
+        for mode, by_endpoint in results.items():
+            rate = by_endpoint[endpoint]
+            print(f"{endpoint:<26}{mode:<8}{rate:>10.0f}{rate / baseline:>9.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
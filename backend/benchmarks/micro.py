@@ -0,0 +1,196 @@
+"""
+Micro-benchmarks for the pure-Python hot functions.
+
+Each case times one call of a function on a fixed, realistic input and
+reports the best per-call time over several repeats. Results can be saved as
+a baseline and later runs compared against it; a case that got slower than
+baseline * (1 + threshold) fails the run (exit status 1).
+
+Usage (from backend/):
+    python -m benchmarks.micro                         # run, compare if a baseline exists
+    python -m benchmarks.micro --save                  # run and write the baseline
+    python -m benchmarks.micro --only mcq --threshold 0.2
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import sys
+import timeit
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "micro_baseline.json")
+
+NOTES = (
+    "A relation is in third normal form when every non-key attribute depends on the key, "
+    "the whole key and nothing but the key. Functional dependencies X -> Y hold when equal "
+    "X values imply equal Y values. "
+) * 60
+
+
+def _make_pdf(pages: int, text: str) -> bytes:
+    """Minimal text PDF (one Helvetica line per page) for read_pdf"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for i in range(pages):
+        stream = f"BT /F1 10 Tf 40 800 Td ({text} page {i + 1}) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        content_ref = len(objects)
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_ref} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {pages} >>"
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1"))
+    xref = out.tell()
+    out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+    for offset in offsets:
+        out.write(f"{offset:010d} 00000 n \n".encode())
+    out.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return out.getvalue()
+
+
+def _mcq_items(n: int):
+    return [{
+        "question": f"  Which normal form removes transitive dependency number {i}?  ",
+        "options": ["1NF", "2NF", "3NF", "BCNF", "4NF"][: 3 + i % 3],
+        "answer": "ABCD"[i % 4],
+        "explanation": "Third normal form removes transitive dependencies on the key.",
+        "difficulty": "medium",
+        "topic": "Databases",
+        "question_type": "conceptual",
+    } for i in range(n)]
+
+
+def _db_rows(n: int):
+    rnd = random.Random(3)
+    base = datetime(2025, 1, 1, 9, 0)
+    return [{
+        "id": i, "user_id": rnd.randint(1, 500), "title": f"Revise chapter {i % 40}",
+        "duration": 60, "date": (base + timedelta(days=i % 90)).date(),
+        "time": timedelta(hours=rnd.randint(6, 22)), "completed": i % 2,
+        "created_at": base + timedelta(minutes=i), "hours": Decimal(i % 300) / 60,
+    } for i in range(n)]
+
+
+def _chat_history(n: int):
+    rnd = random.Random(4)
+    return [{"role": "user" if i % 2 == 0 else "assistant",
+             "content": "Explain the difference between a process and a thread. " * rnd.randint(1, 40)}
+            for i in range(n)]
+
+
+def _cohort_rows(students: int, attempts_per_student: int):
+    rnd = random.Random(5)
+    return [{
+        "user_id": u, "username": f"student{u}", "topic": rnd.choice(["Databases", "Networks", "OS", "Algorithms"]),
+        "percentage": rnd.randint(0, 100), "answers": 10, "correct": rnd.randint(0, 10),
+    } for u in range(1, students + 1) for _ in range(attempts_per_student)]
+
+
+def build_cases():
+    """name -> zero-argument callable to time"""
+    from ai_agent.cohort import analyze_cohort
+    from ai_agent.performance_analyzer import PerformanceAnalyzer
+    from chat.service import MAX_HISTORY_ENTRIES, _sanitize_msgs
+    from coding_assistant.execution import run_python_code
+    from coding_assistant.service import CodingAssistantService
+    from mcq.parser import normalize_mcqs
+    from mcq.prompt import build_mcq_prompt
+    from utils import serialization
+    from utils.pdf import read_pdf
+    from utils.text import clamp
+
+    items = _mcq_items(20)
+    pdf_bytes = _make_pdf(20, "Normalisation and functional dependencies")
+    rows = _db_rows(1000)
+    history = _chat_history(60)
+    cohort = _cohort_rows(2000, 10)
+    score_sets = [[random.Random(i).randint(0, 100) for _ in range(5)] for i in range(200)]
+    problem = CodingAssistantService.get_problem_by_id("two-sum")
+    two_sum = (
+        "def twoSum(nums, target):\n"
+        "    seen = {}\n"
+        "    for i, n in enumerate(nums):\n"
+        "        if target - n in seen:\n"
+        "            return [seen[target - n], i]\n"
+        "        seen[n] = i\n"
+    )
+
+    def analyzer_logic():
+        for scores in score_sets:
+            PerformanceAnalyzer._calculate_trend(scores)
+            PerformanceAnalyzer._mastery_level(sum(scores) / len(scores))
+
+    return {
+        "mcq.normalize_mcqs[20]": lambda: normalize_mcqs(items),
+        "mcq.build_mcq_prompt": lambda: build_mcq_prompt(NOTES, num_q=10, difficulty="mixed"),
+        "utils.read_pdf[20 pages]": lambda: read_pdf(io.BytesIO(pdf_bytes)),
+        "utils.clamp[12k]": lambda: clamp(NOTES * 2, limit=12000),
+        # study.routes.clean_json was replaced by the app JSON provider
+        "serialization.dumps[1000 rows]": lambda: serialization.dumps(rows),
+        "chat._sanitize_msgs[history]": lambda: _sanitize_msgs(history[-MAX_HISTORY_ENTRIES:]),
+        "analyzer.trend+mastery[200]": analyzer_logic,
+        "cohort.analyze[2000x10]": lambda: analyze_cohort(cohort),
+        "execution.run_python_code[two-sum]": lambda: run_python_code(
+            two_sum, problem["function_name"], problem.get("test_cases", [])),
+    }
+
+
+def measure(fn, repeat: int) -> float:
+    """Best per-call seconds over `repeat` rounds of an auto-ranged loop"""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", default="", help="run cases whose name contains this string")
+    args = parser.parse_args(argv)
+
+    cases = {name: fn for name, fn in build_cases().items() if args.only in name}
+    baseline = {}
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f).get("results", {})
+
+    results, failures = {}, []
+    print(f"{'case':<38}{'us/call':>12}{'baseline':>12}{'change':>9}")
+    for name, fn in cases.items():
+        seconds = measure(fn, args.repeat)
+        results[name] = seconds
+        line = f"{name:<38}{seconds * 1e6:>12.1f}"
+        if name in baseline:
+            change = seconds / baseline[name] - 1
+            line += f"{baseline[name] * 1e6:>12.1f}{change:>+8.0%}"
+            if change > args.threshold:
+                failures.append(name)
+                line += "  REGRESSED"
+        print(line)
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump({"python": sys.version.split()[0], "saved": date.today().isoformat(),
+                       "results": results}, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+    if failures:
+        print(f"\n{len(failures)} case(s) slower than baseline by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Cold-start benchmark: import time of the app and of each blueprint.
+
+Every measurement runs in a fresh interpreter so one import cannot warm the
+module cache for the next. Shared dependencies (Flask and db) are imported
+first and reported as the base cost; the per-blueprint figure is what that
+blueprint adds on top of it.
+
+Usage (from backend/):
+    python -m benchmarks.startup [--runs 3] [--budget-ms 1500]
+
+Exits non-zero when importing `app` exceeds the cold-start budget.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BLUEPRINTS = [
+    "auth.routes",
+    "quiz.routes",
+    "chat.routes",
+    "study.routes",
+    "calendar_app.routes",
+    "ai_agent.routes",
+    "coding_assistant.routes",
+]
+
+_PROBE = """
+import importlib, json, sys, time
+t0 = time.perf_counter()
+import flask, db
+t1 = time.perf_counter()
+importlib.import_module({module!r})
+t2 = time.perf_counter()
+print("@@" + json.dumps({{"base": t1 - t0, "module": t2 - t1}}))
+"""
+
+
+def _measure(module: str) -> dict:
+    env = dict(os.environ, AUTO_MIGRATE="0", PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module)],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith("@@"):
+            return json.loads(line[2:])
+    raise RuntimeError(f"import of {module} failed:\n{proc.stderr.strip()}")
+
+
+def run(runs: int) -> dict:
+    results = {}
+    for module in BLUEPRINTS + ["app"]:
+        samples = []
+        for _ in range(runs):
+            try:
+                samples.append(_measure(module))
+            except RuntimeError as e:
+                results[module] = {"error": str(e)}
+                break
+        else:
+            results[module] = {
+                "base_ms": statistics.median(s["base"] for s in samples) * 1000,
+                "module_ms": statistics.median(s["module"] for s in samples) * 1000,
+            }
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("STARTUP_BUDGET_MS", 1500)))
+    args = parser.parse_args(argv)
+
+    results = run(args.runs)
+    print(f"{'module':<26}{'base ms':>10}{'import ms':>12}")
+    for module, r in results.items():
+        if "error" in r:
+            print(f"{module:<26}{'-':>10}{'failed':>12}")
+            print(f"    {r['error'].splitlines()[-1] if r['error'] else ''}")
+            continue
+        print(f"{module:<26}{r['base_ms']:>10.1f}{r['module_ms']:>12.1f}")
+
+    app = results.get("app", {})
+    if "error" in app:
+        return 1
+    total = app["base_ms"] + app["module_ms"]
+    status = "within" if total <= args.budget_ms else "OVER"
+    print(f"\nCold start: {total:.1f} ms ({status} budget of {args.budget_ms:.0f} ms)")
+    return 0 if total <= args.budget_ms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
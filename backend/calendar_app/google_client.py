@@ -0,0 +1,114 @@
+"""
+Google Calendar client construction and per-user credentials cache.
+
+Building a Calendar service needs the discovery document and the user's
+stored OAuth credentials. The discovery document is read once per process
+and the credentials are cached per user, refreshed in place (under the
+entry's lock) shortly before they expire. The service itself is built per
+call: a Resource owns an httplib2 transport, which is not thread-safe, so
+one must not be shared by request threads and the sync jobs.
+
+Set CALENDAR_API_ROOT (e.g. http://127.0.0.1:8089/) to point every call,
+including batch requests, at a local fake Calendar API.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from google.oauth2.credentials import Credentials
+from google.auth.transport.requests import Request as GoogleRequest
+
+from utils.cache import TTLCache
+
+CALENDAR_API_ROOT = os.environ.get("CALENDAR_API_ROOT")
+
+# Refresh access tokens this long before Google would reject them
+REFRESH_SKEW = timedelta(minutes=5)
+
+# user_id -> {"credentials": Credentials, "lock": Lock serializing its refreshes}
+CREDENTIALS_CACHE = TTLCache(maxsize=512, ttl=float(os.environ.get("CALENDAR_SERVICE_TTL", 1800)))
+
+_DISCOVERY_DOC = None
+_DISCOVERY_LOCK = threading.Lock()
+
+
+def _discovery_document() -> str:
+    """Calendar v3 discovery document, read once per process from the library's static copy"""
+    global _DISCOVERY_DOC
+    if _DISCOVERY_DOC is None:
+        with _DISCOVERY_LOCK:
+            if _DISCOVERY_DOC is None:
+                from googleapiclient.discovery_cache import get_static_doc
+                doc = get_static_doc("calendar", "v3")
+                if CALENDAR_API_ROOT:
+                    parsed = json.loads(doc)
+                    parsed["rootUrl"] = CALENDAR_API_ROOT.rstrip("/") + "/"
+                    doc = json.dumps(parsed)
+                _DISCOVERY_DOC = doc
+    return _DISCOVERY_DOC
+
+
+def build_calendar_service(credentials: Credentials):
+    """Build a Calendar v3 service (with its own transport) from the cached discovery document"""
+    from googleapiclient.discovery import build_from_document
+    return build_from_document(_discovery_document(), credentials=credentials)
+
+
+def credentials_to_dict(credentials: Credentials) -> Dict:
+    return {
+        'token': credentials.token,
+        'refresh_token': credentials.refresh_token,
+        'token_uri': credentials.token_uri,
+        'client_id': credentials.client_id,
+        'client_secret': credentials.client_secret,
+        'scopes': credentials.scopes,
+        'expiry': credentials.expiry.isoformat() if credentials.expiry else None,
+    }
+
+
+def credentials_from_dict(data: Dict) -> Credentials:
+    credentials = Credentials(
+        token=data['token'],
+        refresh_token=data.get('refresh_token'),
+        token_uri=data['token_uri'],
+        client_id=data['client_id'],
+        client_secret=data['client_secret'],
+        scopes=data['scopes']
+    )
+    # google-auth compares expiry against naive UTC datetimes
+    if data.get('expiry'):
+        credentials.expiry = datetime.fromisoformat(data['expiry']).replace(tzinfo=None)
+    return credentials
+
+
+def needs_refresh(credentials: Credentials) -> bool:
+    """True when the access token is missing or expires within REFRESH_SKEW"""
+    if not credentials.refresh_token:
+        return False
+    if not credentials.token:
+        return True
+    if credentials.expiry is None:
+        return False
+    return credentials.expiry - REFRESH_SKEW <= datetime.utcnow()
+
+
+def refresh_credentials(credentials: Credentials):
+    credentials.refresh(GoogleRequest())
+
+
+def get_cached_credentials(user_id) -> Optional[Dict]:
+    return CREDENTIALS_CACHE.get(int(user_id))
+
+
+def cache_credentials(user_id, credentials: Credentials) -> Dict:
+    entry = {"credentials": credentials, "lock": threading.Lock()}
+    CREDENTIALS_CACHE.set(int(user_id), entry)
+    return entry
+
+
+def invalidate_calendar_service(user_id):
+    """Drop a user's cached credentials (disconnect, new OAuth tokens)"""
+    CREDENTIALS_CACHE.invalidate(int(user_id))
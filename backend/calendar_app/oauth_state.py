@@ -0,0 +1,89 @@
+"""
+OAuth `state` store for the Google Calendar connect flow.
+
+States live in the `oauth_states` table so the callback can land on any
+worker or node; a small in-process LRU in front saves the lookup when it
+lands on the worker that started the flow. Each state is single-use: it is
+claimed with a DELETE, so only one callback can redeem it. Expired rows are
+swept by the cron job and, opportunistically, while new states are saved.
+"""
+
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from db import get_db_connection, pooled_connection
+from utils.cache import TTLCache
+
+STATE_TTL = int(os.environ.get("OAUTH_STATE_TTL", 600))
+
+# Chance that saving a state also sweeps expired rows
+SWEEP_PROBABILITY = 0.02
+
+# state -> {"user_id", "user_email", "code_verifier"}
+STATE_CACHE = TTLCache(maxsize=1024, ttl=STATE_TTL)
+
+
+def _now() -> str:
+    return datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+
+def save_state(state: str, user_id: int, user_email: Optional[str], code_verifier: Optional[str] = None):
+    """Remember an issued OAuth state until it is redeemed or expires"""
+    expires_at = (datetime.now() + timedelta(seconds=STATE_TTL)).strftime('%Y-%m-%d %H:%M:%S')
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute('''
+        INSERT INTO oauth_states (state, user_id, user_email, code_verifier, expires_at)
+        VALUES (%s, %s, %s, %s, %s)
+        ''', (state, user_id, user_email, code_verifier, expires_at))
+        conn.commit()
+    finally:
+        cur.close()
+    STATE_CACHE.set(state, {'user_id': int(user_id), 'user_email': user_email, 'code_verifier': code_verifier})
+
+    if random.random() < SWEEP_PROBABILITY:
+        purge_expired_states()
+
+
+def consume_state(state: str) -> Optional[Dict]:
+    """Redeem a state once; None when it is unknown, expired or already used"""
+    if not state:
+        return None
+    entry = STATE_CACHE.pop(state)
+    conn = get_db_connection()
+    cur = conn.cursor(dictionary=True)
+    try:
+        if entry is None:
+            cur.execute('''
+            SELECT user_id, user_email, code_verifier FROM oauth_states
+            WHERE state = %s AND expires_at > %s
+            ''', (state, _now()))
+            entry = cur.fetchone()
+            if entry is None:
+                return None
+        # The DELETE is the claim: a concurrent callback with the same state gets rowcount 0
+        cur.execute('DELETE FROM oauth_states WHERE state = %s AND expires_at > %s', (state, _now()))
+        conn.commit()
+        return entry if cur.rowcount == 1 else None
+    finally:
+        cur.close()
+
+
+def purge_expired_states(batch_size: int = 1000) -> int:
+    """Delete expired states in small batches; safe to call from the cron thread"""
+    purged = 0
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            while True:
+                cur.execute('DELETE FROM oauth_states WHERE expires_at <= %s LIMIT %s', (_now(), batch_size))
+                conn.commit()
+                purged += cur.rowcount
+                if cur.rowcount < batch_size:
+                    break
+        finally:
+            cur.close()
+    return purged
@@ -4,15 +4,26 @@ Handles OAuth flow and calendar operations with MySQL backend
 """
 import requests
 from db import get_user_email_by_id, get_db_connection
-from flask import Blueprint, request, jsonify, redirect, session
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import Flow
-from googleapiclient.discovery import build
-from google.auth.transport.requests import Request as GoogleRequest
+from flask import Blueprint, request, jsonify, redirect
+from calendar_app.google_client import (
+    build_calendar_service,
+    cache_credentials,
+    credentials_from_dict,
+    credentials_to_dict,
+    get_cached_credentials,
+    invalidate_calendar_service,
+    needs_refresh,
+    refresh_credentials,
+)
+from calendar_app.oauth_state import consume_state, save_state
+from calendar_app.sync import build_event_patch, sync_user_calendar
 from datetime import datetime, timedelta
 import json
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 calendar_bp = Blueprint('calendar', __name__, url_prefix='/calendar_app')
 
 # OAuth Configuration
@@ -32,7 +43,7 @@ try:
     with open(CLIENT_SECRETS_FILE) as f:
         secret = json.load(f)
 except Exception as e:
-    print(f"⚠️ Warning: perform_calendar_init failed: {e}")
+    logger.warning("Calendar client secrets unavailable, Google Calendar disabled: %s", e)
     secret = None
 
 REDIRECT_URI = os.environ.get('REDIRECT_URI', 'https://edumate-2026.vercel.app/calendar_app/oauth2callback')
@@ -49,54 +60,51 @@ def connect_calendar():
         if not user_email:
             return jsonify({'success': False, 'error': 'Email not found for user'}), 404
 
+        # Imported on use: the OAuth and discovery clients are slow to import
+        from google_auth_oauthlib.flow import Flow
         flow = Flow.from_client_secrets_file(
             CLIENT_SECRETS_FILE,
             scopes=SCOPES,
             redirect_uri=REDIRECT_URI
         )
-        session['user_id'] = user_id
-        session['user_email'] = user_email
         authorization_url, state = flow.authorization_url(
             access_type='offline',
             include_granted_scopes='true',
             prompt='consent',
             login_hint=user_email
         )
-        session['state'] = state
+        # Kept server-side so the callback can be served by any worker
+        save_state(state, int(user_id), user_email, flow.code_verifier)
         return jsonify({'success': True, 'authUrl': authorization_url})
     except Exception as e:
-        print(f"Error in connect_calendar: {e}")
+        logger.exception("Error in connect_calendar")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @calendar_bp.route('/oauth2callback')
 def oauth2callback():
-    state = session.get('state')
-    user_id = session.get('user_id')
-    user_email = session.get('user_email')
+    state = request.args.get('state')
+    pending = consume_state(state)
     
-    if not state or not user_id:
+    if not pending:
         return '<h1>Error: Invalid session</h1><p>Please try connecting again.</p>', 400
 
     try:
+        from google_auth_oauthlib.flow import Flow
         flow = Flow.from_client_secrets_file(
             CLIENT_SECRETS_FILE,
             scopes=SCOPES,
             state=state,
             redirect_uri=REDIRECT_URI
         )
+        flow.code_verifier = pending['code_verifier']
+        user_id = pending['user_id']
+        user_email = pending['user_email']
         flow.fetch_token(authorization_response=request.url)
         credentials = flow.credentials
 
-        db = get_db_connection()
+        db = get_db_connection(user_id)
         cur = db.cursor()
-        credentials_data = {
-            'token': credentials.token,
-            'refresh_token': credentials.refresh_token,
-            'token_uri': credentials.token_uri,
-            'client_id': credentials.client_id,
-            'client_secret': credentials.client_secret,
-            'scopes': credentials.scopes
-        }
+        credentials_data = credentials_to_dict(credentials)
         now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
         cur.execute(
@@ -110,10 +118,7 @@ def oauth2callback():
         )
         db.commit()
         cur.close()
-
-        session.pop('state', None)
-        session.pop('user_id', None)
-        session.pop('user_email', None)
+        invalidate_calendar_service(user_id)
 
         return '''<html><head><title>Calendar Connected</title><style>
                     body {font-family:Arial;display:flex;justify-content:center;align-items:center;
@@ -126,13 +131,47 @@ def oauth2callback():
                     <p style="font-size:14px;">Redirecting...</p></div>
                     <script>setTimeout(() => {window.close();}, 2000);</script></body></html>'''
     except Exception as e:
-        print(f"Error in oauth2callback: {e}")
+        logger.exception("Error in oauth2callback")
         return f'<html><head><title>Connection Failed</title><style>body{{font-family:Arial;display:flex;justify-content:center;align-items:center;height:100vh;margin:0;background:#1a1a1a;color:white;}}.container{{text-align:center;padding:40px;background:rgba(255,0,0,0.1);border-radius:20px;}}</style></head><body><div class="container"><h1>❌ Connection Failed</h1><p>Error: {str(e)}</p><p>Please try again from the application.</p></div></body></html>', 500
 
 # ===== CALENDAR OPERATIONS =====
 
+def _store_credentials(user_id, credentials):
+    db = get_db_connection(user_id)
+    cur = db.cursor()
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    cur.execute(
+        'UPDATE calendar_tokens SET credentials = %s, updated_at = %s WHERE user_id = %s',
+        (json.dumps(credentials_to_dict(credentials)), now, user_id)
+    )
+    db.commit()
+    cur.close()
+
+def _refresh_and_store(user_id, credentials) -> bool:
+    try:
+        refresh_credentials(credentials)
+        _store_credentials(user_id, credentials)
+        return True
+    except Exception as e:
+        logger.warning("Token refresh failed for user %s: %s", user_id, e)
+        return False
+
 def get_calendar_service(user_id):
-    db = get_db_connection()
+    """
+    A new Calendar service for the caller (services are not thread-safe),
+    built on the user's cached credentials when possible
+    """
+    cached = get_cached_credentials(user_id)
+    if cached:
+        credentials = cached['credentials']
+        with cached['lock']:
+            # Re-checked under the lock: another thread may have just refreshed
+            if needs_refresh(credentials) and not _refresh_and_store(user_id, credentials):
+                invalidate_calendar_service(user_id)
+                return None
+        return build_calendar_service(credentials)
+
+    db = get_db_connection(user_id)
     cur = db.cursor(dictionary=True)
     cur.execute('SELECT credentials FROM calendar_tokens WHERE user_id = %s', (user_id,))
     row = cur.fetchone()
@@ -141,34 +180,12 @@ def get_calendar_service(user_id):
     if not row:
         return None
     
-    credentials_data = json.loads(row['credentials'])
-    credentials = Credentials(
-        token=credentials_data['token'],
-        refresh_token=credentials_data.get('refresh_token'),
-        token_uri=credentials_data['token_uri'],
-        client_id=credentials_data['client_id'],
-        client_secret=credentials_data['client_secret'],
-        scopes=credentials_data['scopes']
-    )
-    
-    if credentials.expired and credentials.refresh_token:
-        try:
-            credentials.refresh(GoogleRequest())
-            credentials_data['token'] = credentials.token
-            db = get_db_connection()
-            cur = db.cursor()
-            now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            cur.execute(
-                'UPDATE calendar_tokens SET credentials = %s, updated_at = %s WHERE user_id = %s',
-                (json.dumps(credentials_data), now, user_id)
-            )
-            db.commit()
-            cur.close()
-        except Exception as e:
-            print(f"Token refresh failed: {e}")
-            return None
+    credentials = credentials_from_dict(json.loads(row['credentials']))
+    if needs_refresh(credentials) and not _refresh_and_store(user_id, credentials):
+        return None
     
-    return build('calendar', 'v3', credentials=credentials)
+    cache_credentials(user_id, credentials)
+    return build_calendar_service(credentials)
 
 @calendar_bp.route('/check-connection', methods=['GET'])
 def check_connection():
@@ -176,7 +193,7 @@ def check_connection():
     if not user_id:
         return jsonify({'success': False, 'error': 'User ID required'}), 400
     
-    db = get_db_connection()
+    db = get_db_connection(user_id)
     cur = db.cursor(dictionary=True)
     cur.execute('SELECT email, created_at FROM calendar_tokens WHERE user_id = %s', (user_id,))
     row = cur.fetchone()
@@ -240,7 +257,7 @@ def create_event():
             body=event
         ).execute()
         
-        db = get_db_connection()
+        db = get_db_connection(user_id)
         cur = db.cursor()
         now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
@@ -260,7 +277,7 @@ def create_event():
         })
         
     except Exception as e:
-        print(f"Error creating calendar event: {e}")
+        logger.exception("Error creating calendar event")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @calendar_bp.route('/update-event', methods=['PUT'])
@@ -277,36 +294,39 @@ def update_event():
         return jsonify({'success': False, 'error': 'Calendar not connected'}), 400
     
     try:
-        event = service.events().get(calendarId='primary', eventId=event_id).execute()
-        
-        if 'title' in data:
-            event['summary'] = data['title']
-        if 'description' in data:
-            event['description'] = data['description']
-        if 'date' in data and 'time' in data:
-            start_datetime = datetime.strptime(f"{data['date']} {data['time']}", '%Y-%m-%d %H:%M')
-            duration = data.get('duration', 60)
-            end_datetime = start_datetime + timedelta(minutes=duration)
-            
-            event['start'] = {
-                'dateTime': start_datetime.isoformat(),
-                'timeZone': 'Asia/Kolkata',
-            }
-            event['end'] = {
-                'dateTime': end_datetime.isoformat(),
-                'timeZone': 'Asia/Kolkata',
-            }
-        
-        updated_event = service.events().update(
+        # Send only the changed fields; no read-modify-write round trip
+        patch = build_event_patch(data)
+        if not patch:
+            return jsonify({'success': True, 'eventId': event_id})
+
+        updated_event = service.events().patch(
             calendarId='primary',
             eventId=event_id,
-            body=event
+            body=patch
         ).execute()
         
         return jsonify({'success': True, 'eventId': updated_event['id']})
         
     except Exception as e:
-        print(f"Error updating calendar event: {e}")
+        logger.exception("Error updating calendar event")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@calendar_bp.route('/sync', methods=['POST'])
+def sync_calendar():
+    data = request.get_json() or {}
+    user_id = data.get('userId')
+    
+    if not user_id:
+        return jsonify({'success': False, 'error': 'User ID required'}), 400
+    
+    try:
+        result = sync_user_calendar(int(user_id))
+        if result['status'] == 'not_connected':
+            return jsonify({'success': False, 'error': 'Calendar not connected'}), 400
+        return jsonify({'success': True, **result})
+        
+    except Exception as e:
+        logger.exception("Error syncing calendar")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @calendar_bp.route('/delete-event', methods=['DELETE'])
@@ -324,7 +344,7 @@ def delete_event():
     try:
         service.events().delete(calendarId='primary', eventId=event_id).execute()
         
-        db = get_db_connection()
+        db = get_db_connection(user_id)
         cur = db.cursor()
         cur.execute('DELETE FROM calendar_events WHERE user_id = %s AND event_id = %s', 
                   (user_id, event_id))
@@ -334,7 +354,7 @@ def delete_event():
         return jsonify({'success': True})
         
     except Exception as e:
-        print(f"Error deleting calendar event: {e}")
+        logger.exception("Error deleting calendar event")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @calendar_bp.route('/disconnect', methods=['POST'])
@@ -345,65 +365,131 @@ def disconnect_calendar():
     if not user_id:
         return jsonify({'success': False, 'error': 'User ID required'}), 400
     
-    db = get_db_connection()
+    db = get_db_connection(user_id)
     cur = db.cursor()
     cur.execute('DELETE FROM calendar_tokens WHERE user_id = %s', (user_id,))
     cur.execute('DELETE FROM calendar_events WHERE user_id = %s', (user_id,))
     db.commit()
     cur.close()
+    invalidate_calendar_service(user_id)
     
     return jsonify({'success': True})
 
 
+# Google batch requests accept at most 50 calls each
+CALENDAR_BATCH_LIMIT = 50
+
+
+def _test_event_id(test_id: int) -> str:
+    """Deterministic event id (base32hex alphabet) so re-runs cannot duplicate an event"""
+    return f"edumatetest{int(test_id)}"
+
+
+def _test_event_body(topic: str, scheduled_date, difficulty: str, event_id: str = None) -> dict:
+    # Format the scheduled_date
+    if isinstance(scheduled_date, str):
+        test_date = datetime.fromisoformat(scheduled_date.replace('Z', '+00:00'))
+    else:
+        test_date = scheduled_date
+    
+    # Create event with test duration of 60 minutes
+    start_datetime = test_date.replace(hour=10, minute=0, second=0, microsecond=0)  # Default to 10 AM
+    end_datetime = start_datetime + timedelta(minutes=60)
+    
+    event = {
+        'summary': f'📝 {topic} ({difficulty.capitalize()} Test)',
+        'description': f'AI-Scheduled {difficulty.capitalize()} Difficulty Test\nTopic: {topic}',
+        'start': {
+            'dateTime': start_datetime.isoformat(),
+            'timeZone': 'Asia/Kolkata',
+        },
+        'end': {
+            'dateTime': end_datetime.isoformat(),
+            'timeZone': 'Asia/Kolkata',
+        },
+        'reminders': {
+            'useDefault': False,
+            'overrides': [
+                {'method': 'popup', 'minutes': 30},
+                {'method': 'email', 'minutes': 24 * 60},
+            ],
+        },
+    }
+    if event_id:
+        event['id'] = event_id
+    return event
+
+
 def create_calendar_event_for_test(user_id: int, topic: str, scheduled_date, difficulty: str):
     """
     Helper function to create a Google Calendar event for an AI-scheduled test.
-    Called from ai_agent.service during test scheduling.
     """
     try:
         service = get_calendar_service(user_id)
         if not service:
-            print(f"⚠️ Calendar not connected for user {user_id}, skipping GCal event")
+            logger.info("Calendar not connected for user %s, skipping GCal event", user_id)
             return False
         
-        # Format the scheduled_date
-        if isinstance(scheduled_date, str):
-            test_date = datetime.fromisoformat(scheduled_date.replace('Z', '+00:00'))
-        else:
-            test_date = scheduled_date
-        
-        # Create event with test duration of 60 minutes
-        start_datetime = test_date.replace(hour=10, minute=0, second=0)  # Default to 10 AM
-        end_datetime = start_datetime + timedelta(minutes=60)
-        
-        event = {
-            'summary': f'📝 {topic} ({difficulty.capitalize()} Test)',
-            'description': f'AI-Scheduled {difficulty.capitalize()} Difficulty Test\nTopic: {topic}',
-            'start': {
-                'dateTime': start_datetime.isoformat(),
-                'timeZone': 'Asia/Kolkata',
-            },
-            'end': {
-                'dateTime': end_datetime.isoformat(),
-                'timeZone': 'Asia/Kolkata',
-            },
-            'reminders': {
-                'useDefault': False,
-                'overrides': [
-                    {'method': 'popup', 'minutes': 30},
-                    {'method': 'email', 'minutes': 24 * 60},
-                ],
-            },
-        }
-        
         created_event = service.events().insert(
             calendarId='primary',
-            body=event
+            body=_test_event_body(topic, scheduled_date, difficulty)
         ).execute()
         
-        print(f"✅ Created Google Calendar event for {topic}: {created_event['id']}")
+        logger.info("Created Google Calendar event for %s: %s", topic, created_event['id'])
         return True
         
     except Exception as e:
-        print(f"⚠️ Failed to create calendar event for {topic}: {str(e)}")
+        logger.warning("Failed to create calendar event for %s: %s", topic, e)
         return False
+
+
+def sync_test_events_batch(user_id: int, tests: list) -> dict:
+    """
+    Mirror AI-scheduled tests to Google Calendar using Calendar batch
+    requests (one HTTP round-trip per 50 calls).
+
+    `tests` are dicts with id, topic, date, difficulty and an optional
+    calendar_event_id. Tests without an event get one inserted; tests that
+    already have one get their time patched. Returns {test_id: event_id} for
+    every event that now exists, including ones a previous run already
+    created (HTTP 409 on the deterministic id).
+    """
+    if not tests:
+        return {}
+    service = get_calendar_service(user_id)
+    if not service:
+        logger.info("Calendar not connected for user %s, skipping GCal events", user_id)
+        return {}
+
+    synced = {}
+
+    def _on_response(request_id, response, exception):
+        test_id = int(request_id)
+        if exception is None:
+            synced[test_id] = response['id']
+        elif getattr(getattr(exception, 'resp', None), 'status', None) == 409:
+            synced[test_id] = _test_event_id(test_id)
+        else:
+            logger.warning("Failed to sync calendar event for test %s: %s", test_id, exception)
+
+    for start in range(0, len(tests), CALENDAR_BATCH_LIMIT):
+        batch = service.new_batch_http_request(callback=_on_response)
+        for test in tests[start:start + CALENDAR_BATCH_LIMIT]:
+            event_id = test.get('calendar_event_id')
+            if event_id:
+                body = _test_event_body(test['topic'], test['date'], test['difficulty'])
+                request_ = service.events().patch(
+                    calendarId='primary', eventId=event_id,
+                    body={k: body[k] for k in ('summary', 'description', 'start', 'end')}
+                )
+            else:
+                body = _test_event_body(test['topic'], test['date'], test['difficulty'], _test_event_id(test['id']))
+                request_ = service.events().insert(calendarId='primary', body=body)
+            batch.add(request_, request_id=str(test['id']))
+        try:
+            batch.execute()
+        except Exception as e:
+            logger.warning("Calendar batch request failed for user %s: %s", user_id, e)
+
+    logger.info("Synced %d/%d Google Calendar events for user %s", len(synced), len(tests), user_id)
+    return synced
@@ -0,0 +1,175 @@
+"""
+Incremental two-way sync between Google Calendar and study sessions.
+
+Google -> EduMate: events are listed with the per-user `syncToken` stored in
+`calendar_sync_state`, so each run only transfers events changed since the
+last one. Changed events are reconciled with `study_sessions` rows linked by
+`calendar_event_id`: reschedules and renames are copied over, and cancelled
+events unlink the session. A 410 Gone (expired token) triggers a full resync.
+
+EduMate -> Google: `build_event_patch` produces a body with only the changed
+fields, sent with `events().patch` (see the /update-event route).
+"""
+
+from datetime import datetime, timedelta, timezone
+import logging
+from typing import Dict, Optional, Tuple
+
+from db import fan_out_query, get_db_connection, invalidate_progress
+
+logger = logging.getLogger(__name__)
+
+IST = timezone(timedelta(hours=5, minutes=30))
+LIST_PAGE_SIZE = 250
+
+
+def build_event_patch(data: Dict) -> Dict:
+    """Calendar event fields to patch from an update payload (title/description/date+time/duration)"""
+    patch = {}
+    if 'title' in data:
+        patch['summary'] = data['title']
+    if 'description' in data:
+        patch['description'] = data['description']
+    if 'date' in data and 'time' in data:
+        start_datetime = datetime.strptime(f"{data['date']} {data['time']}", '%Y-%m-%d %H:%M')
+        end_datetime = start_datetime + timedelta(minutes=int(data.get('duration', 60)))
+        patch['start'] = {'dateTime': start_datetime.isoformat(), 'timeZone': 'Asia/Kolkata'}
+        patch['end'] = {'dateTime': end_datetime.isoformat(), 'timeZone': 'Asia/Kolkata'}
+    return patch
+
+
+def _load_sync_token(cur, user_id: int) -> Optional[str]:
+    cur.execute('SELECT sync_token FROM calendar_sync_state WHERE user_id = %s', (user_id,))
+    row = cur.fetchone()
+    return row['sync_token'] if row else None
+
+
+def _save_sync_token(cur, user_id: int, token: Optional[str]):
+    cur.execute('''
+    INSERT INTO calendar_sync_state (user_id, sync_token, last_synced_at) VALUES (%s, %s, %s)
+    ON DUPLICATE KEY UPDATE sync_token = VALUES(sync_token), last_synced_at = VALUES(last_synced_at)
+    ''', (user_id, token, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+
+
+def _collect_changes(service, sync_token: Optional[str]) -> Tuple[Dict[str, Dict], Optional[str]]:
+    """Page through the change feed; returns (event id -> event, next sync token)"""
+    changed = {}
+    page_token = None
+    while True:
+        params = {'calendarId': 'primary', 'maxResults': LIST_PAGE_SIZE, 'showDeleted': True}
+        if sync_token:
+            params['syncToken'] = sync_token
+        if page_token:
+            params['pageToken'] = page_token
+        response = service.events().list(**params).execute()
+        for event in response.get('items', []):
+            changed[event['id']] = event
+        page_token = response.get('nextPageToken')
+        if not page_token:
+            return changed, response.get('nextSyncToken')
+
+
+def _event_schedule(event: Dict) -> Optional[Dict]:
+    """Local (IST) date, time and duration of a timed event"""
+    start = (event.get('start') or {}).get('dateTime')
+    end = (event.get('end') or {}).get('dateTime')
+    if not start:
+        return None
+    start_dt = datetime.fromisoformat(start.replace('Z', '+00:00'))
+    start_local = start_dt.astimezone(IST) if start_dt.tzinfo else start_dt
+    schedule = {'date': start_local.date(), 'time': start_local.time().replace(microsecond=0)}
+    if end:
+        end_dt = datetime.fromisoformat(end.replace('Z', '+00:00'))
+        schedule['duration'] = max(int((end_dt - start_dt).total_seconds() // 60), 1)
+    return schedule
+
+
+def _reconcile(cur, user_id: int, changed: Dict[str, Dict]) -> Dict[str, int]:
+    stats = {'updated': 0, 'unlinked': 0}
+    event_ids = list(changed)
+    for start in range(0, len(event_ids), 500):
+        chunk = event_ids[start:start + 500]
+        placeholders = ','.join(['%s'] * len(chunk))
+        cur.execute(f'''
+        SELECT id, title, date, time, duration, calendar_event_id FROM study_sessions
+        WHERE user_id = %s AND calendar_event_id IN ({placeholders})
+        ''', [user_id] + chunk)
+        for row in cur.fetchall():
+            event = changed[row['calendar_event_id']]
+            if event.get('status') == 'cancelled':
+                cur.execute('UPDATE study_sessions SET calendar_event_id = NULL WHERE id = %s', (row['id'],))
+                cur.execute('DELETE FROM calendar_events WHERE user_id = %s AND event_id = %s',
+                            (user_id, row['calendar_event_id']))
+                stats['unlinked'] += 1
+                continue
+
+            fields = {}
+            if event.get('summary') and event['summary'] != row['title']:
+                fields['title'] = event['summary']
+            schedule = _event_schedule(event) or {}
+            if 'date' in schedule and schedule['date'] != row['date']:
+                fields['date'] = schedule['date']
+            # TIME columns come back as timedelta
+            row_time = row['time']
+            if isinstance(row_time, timedelta):
+                row_time = (datetime.min + row_time).time()
+            if 'time' in schedule and schedule['time'] != row_time:
+                fields['time'] = schedule['time']
+            if 'duration' in schedule and schedule['duration'] != row['duration']:
+                fields['duration'] = schedule['duration']
+            if fields:
+                assignments = ', '.join(f'{column} = %s' for column in fields)
+                cur.execute(f'UPDATE study_sessions SET {assignments} WHERE id = %s',
+                            list(fields.values()) + [row['id']])
+                stats['updated'] += 1
+    return stats
+
+
+def sync_user_calendar(user_id: int, service=None) -> Dict:
+    """Pull calendar changes since the user's last sync and apply them to study sessions"""
+    from googleapiclient.errors import HttpError
+    from calendar_app.routes import get_calendar_service
+
+    service = service or get_calendar_service(user_id)
+    if not service:
+        return {'status': 'not_connected'}
+
+    conn = get_db_connection(user_id)
+    cur = conn.cursor(dictionary=True)
+    try:
+        sync_token = _load_sync_token(cur, user_id)
+        full = sync_token is None
+        try:
+            changed, next_token = _collect_changes(service, sync_token)
+        except HttpError as e:
+            if e.resp.status != 410:
+                raise
+            # Sync token expired: start over with a full listing
+            full = True
+            changed, next_token = _collect_changes(service, None)
+
+        stats = _reconcile(cur, user_id, changed)
+        _save_sync_token(cur, user_id, next_token)
+        conn.commit()
+    finally:
+        cur.close()
+    if stats['updated']:
+        # Rescheduled durations change the /study/progress totals
+        invalidate_progress(user_id)
+
+    return {'status': 'ok', 'full': full, 'changed': len(changed), **stats}
+
+
+def sync_all_calendars() -> Dict:
+    """Background job: incremental sync for every user with a connected calendar"""
+    # Tokens live with each user's data: read them from every database
+    user_ids = [row['user_id'] for rows in fan_out_query('SELECT user_id FROM calendar_tokens') for row in rows]
+
+    summary = {'users': len(user_ids), 'failed': 0}
+    for user_id in user_ids:
+        try:
+            sync_user_calendar(user_id)
+        except Exception as e:
+            summary['failed'] += 1
+            logger.warning("Calendar sync failed for user %s: %s", user_id, e)
+    return summary
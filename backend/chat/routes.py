@@ -1,7 +1,6 @@
 
 from flask import Blueprint, request, jsonify, Response, stream_with_context
 import os
-import requests
 from db import (
     get_db_connection,
     get_chat_history,
@@ -12,20 +11,31 @@ from db import (
     create_chat_session,
     delete_chat_session,
     rename_chat_session,
-    save_chat_message,
 )
 from auth.routes import decode_auth_token
+from utils.compression import compressed_jsonify
 from chat.service import get_chat_response
 from chat.service import get_groq_response
+from chat.write_buffer import await_committed, persist_chat_message, wait_for_session, wait_for_user
+from chat.youtube import YouTubeAPIError, search_videos
+from observability import NOISY
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 # Define blueprint without url_prefix — the prefix is applied when registering in app.py
 chat_bp = Blueprint("chat", __name__)
 
+# Page sizes for keyset-paginated listings
+SESSIONS_PAGE_SIZE = 50
+HISTORY_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
 @chat_bp.route("", methods=["POST"])
 @chat_bp.route("/", methods=["POST"])
 def chat():
-    print("chat route called")  # Debug print for route hit
+    logger.info("chat route called", extra=NOISY)
     
     token = request.headers.get("Authorization", "").replace("Bearer ", "")
     data = request.get_json()
@@ -60,7 +70,7 @@ def chat():
         try:
             session_id = create_chat_session(user_id, "New Chat")
         except Exception as e:
-            print("Warning: failed to create chat session:", e)
+            logger.warning("Failed to create chat session: %s", e)
 
     # Get response using Groq (pass session_id so DB messages are grouped)
     bot_reply = get_chat_response(combined_message, user_id, session_id)
@@ -100,13 +110,13 @@ def chat_stream():
         try:
             session_id = create_chat_session(user_id, "New Chat")
         except Exception as e:
-            print("Warning: failed to create chat session:", e)
+            logger.warning("Failed to create chat session: %s", e)
 
-    # Save user message (non-blocking for stream)
+    # Queue user message (written behind the request)
     try:
-        save_chat_message(user_id, "user", combined_message, session_id)
+        persist_chat_message(user_id, "user", combined_message, session_id)
     except Exception as e:
-        print("Warning: failed to save user message (stream):", e)
+        logger.warning("Failed to save user message (stream): %s", e)
 
     def generate():
         # Generate full reply (optimized by service)
@@ -127,11 +137,13 @@ def chat_stream():
 
                 time.sleep(0.04)
         finally:
-            # After streaming completes, save bot reply to DB
+            # After streaming completes, queue bot reply for the DB and hold the
+            # stream open until it is committed (read-your-writes on any worker)
             try:
-                save_chat_message(user_id, "bot", bot_reply, session_id)
+                persist_chat_message(user_id, "bot", bot_reply, session_id)
+                await_committed(user_id, session_id)
             except Exception as e:
-                print("Warning: failed to save bot message (stream):", e)
+                logger.warning("Failed to save bot message (stream): %s", e)
 
     return Response(stream_with_context(generate()), mimetype="text/event-stream")
 
@@ -151,36 +163,11 @@ def youtube_search():
     if not api_key:
         return jsonify({"success": False, "error": "YOUTUBE_API_KEY not configured on server"}), 500
 
-    url = "https://www.googleapis.com/youtube/v3/search"
-    params = {
-        "part": "snippet",
-        "q": query,
-        "type": "video",
-        "maxResults": max_results,
-        "key": api_key,
-    }
-
     try:
-        resp = requests.get(url, params=params, timeout=8)
-        if resp.status_code != 200:
-            return jsonify({"success": False, "error": "YouTube API error", "details": resp.text}), resp.status_code
-        body = resp.json()
-        videos = []
-        for item in body.get("items", []):
-            vid = item.get("id", {}).get("videoId")
-            snip = item.get("snippet", {})
-            if not vid:
-                continue
-            videos.append({
-                "videoId": vid,
-                "title": snip.get("title"),
-                "description": snip.get("description"),
-                "channelTitle": snip.get("channelTitle"),
-                "thumbnail": (snip.get("thumbnails") or {}).get("high", {}).get("url") or (snip.get("thumbnails") or {}).get("default", {}).get("url"),
-                "publishTime": snip.get("publishTime"),
-            })
-
+        videos = search_videos(query, max_results, api_key)
         return jsonify({"success": True, "videos": videos})
+    except YouTubeAPIError as e:
+        return jsonify({"success": False, "error": "YouTube API error", "details": e.details}), e.status_code
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -196,24 +183,44 @@ def chat_history():
     
     user_id = user["id"] if user else None
 
-    limit = int(request.args.get("limit", 50))
     session_id = request.args.get("session_id")
     session_id = int(session_id) if session_id else None
 
     # If session_id provided, allow fetching history by session even for anonymous users
-    try:
-        if session_id is not None:
-            history = get_chat_history(user_id, limit, session_id)
-            return jsonify({"success": True, "history": history})
+    if session_id is None and not user_id:
+        return jsonify({"success": True, "history": []})
 
-        if not user_id:
-            return jsonify({"success": True, "history": []})
+    # Read-your-writes: let this process's queued messages for the session/user land first
+    if session_id is not None:
+        settled = wait_for_session(session_id)
+    else:
+        settled = wait_for_user(user_id)
+    if not settled:
+        logger.warning("Chat history read before queued messages were committed (session %s)", session_id)
 
-        history = get_chat_history(user_id, limit, None)
-        return jsonify({"success": True, "history": history})
+    try:
+        limit = max(1, min(int(request.args.get("limit", HISTORY_PAGE_SIZE)), MAX_PAGE_SIZE))
+        page = get_chat_history(
+            user_id, limit, session_id,
+            before=request.args.get("before"),
+            after=request.args.get("after"),
+        )
+    except ValueError:
+        return jsonify({"success": False, "history": [], "error": "Invalid limit or cursor"}), 400
     except Exception as e:
         return jsonify({"success": False, "history": [], "error": str(e)}), 500
 
+    # Long transcripts are gzip-encoded when the client accepts it
+    return compressed_jsonify({
+        "success": True,
+        "history": page["messages"],
+        "has_older": page["has_older"],
+        "pending_writes": not settled,
+        "has_newer": page["has_newer"],
+        "before_cursor": page["before_cursor"],
+        "after_cursor": page["after_cursor"],
+    })
+
 
 @chat_bp.route("/sessions", methods=["GET", "POST"])
 def chat_sessions():
@@ -235,16 +242,25 @@ def chat_sessions():
         if ids_param:
             try:
                 ids = [int(x) for x in ids_param.split(",") if x.strip()]
+                settled = all([wait_for_session(sid) for sid in ids])
                 sessions = get_chat_sessions_by_ids(ids)
-                return jsonify({"success": True, "sessions": sessions})
+                return jsonify({"success": True, "sessions": sessions, "pending_writes": not settled})
             except Exception:
                 return jsonify({"success": False, "sessions": [], "error": "Invalid ids parameter"}), 400
 
         # If no ids param provided, require authentication to list user sessions
         if not user_id:
-            return jsonify({"success": True, "sessions": []})
-        sessions = get_chat_sessions(user_id)
-        return jsonify({"success": True, "sessions": sessions})
+            return jsonify({"success": True, "sessions": [], "next_cursor": None})
+
+        # Keyset pagination: pass back next_cursor to load older sessions
+        settled = wait_for_user(user_id)
+        try:
+            limit = max(1, min(int(request.args.get("limit", SESSIONS_PAGE_SIZE)), MAX_PAGE_SIZE))
+            sessions, next_cursor = get_chat_sessions(user_id, limit, request.args.get("cursor"))
+        except ValueError:
+            return jsonify({"success": False, "sessions": [], "error": "Invalid limit or cursor"}), 400
+        return jsonify({"success": True, "sessions": sessions, "next_cursor": next_cursor,
+                        "pending_writes": not settled})
 
     # POST -> create new session
     data = request.get_json() or {}
@@ -0,0 +1,298 @@
+"""
+Write-behind buffer for chat message persistence.
+
+Chat endpoints enqueue messages instead of committing them on the request
+thread. A background writer drains the queue and persists each batch with
+`db.save_chat_messages_batch` (one multi-row INSERT per transaction), so
+concurrent requests share commits. A batch collects messages for up to
+FLUSH_INTERVAL, but is written at once when a caller blocks on it (see
+`_wait`), so a waiting request pays for the commit, not the window.
+
+Messages are never dropped: a failed batch is retried with backoff until it
+is written, and while the writer is failing (or the queue is longer than
+CHAT_WRITE_BEHIND_MAX_QUEUE) new messages are written synchronously on the
+request connection, so a database error reaches the client. Messages still
+unwritten at shutdown are appended to CHAT_SPOOL_PATH; app startup replays
+them with `replay_spool`.
+
+Read-your-writes: the queue and its pending counts are per process. The chat
+endpoints therefore call `await_committed` before their response completes,
+which waits for the request's messages to be committed (the batch they
+joined), so a read served by any worker sees them. `wait_for_session` /
+`wait_for_user` additionally cover reads that race a write in the same
+process; both return False on timeout for the caller to report.
+Set CHAT_WRITE_BEHIND=0 to write synchronously on the request connection.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from db import _now_ist_iso, get_db_connection, pooled_connection, save_chat_messages_batch, shard_for
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = 0.05    # seconds to wait for more messages before writing a batch
+MAX_BATCH = 200          # messages per transaction
+RETRY_DELAY = 0.1        # first backoff after a failed batch, doubled up to MAX_RETRY_DELAY
+MAX_RETRY_DELAY = 2.0
+MAX_QUEUED = int(os.environ.get("CHAT_WRITE_BEHIND_MAX_QUEUE", 1000))
+SPOOL_PATH = os.environ.get("CHAT_SPOOL_PATH",
+                            os.path.join(os.path.dirname(os.path.dirname(__file__)), "chat_spool.jsonl"))
+
+_FLUSH = object()        # queue marker: a caller is waiting, write the batch now
+
+
+class ChatWriteBuffer:
+    """Queue of pending chat messages drained by one background writer thread"""
+
+    def __init__(self, flush_interval: float = FLUSH_INTERVAL, max_batch: int = MAX_BATCH):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Optional[Dict]]" = queue.Queue()
+        self._pending = Counter()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._healthy = True
+
+    def _start(self):
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="chat-write-behind", daemon=True)
+                self._thread.start()
+
+    def accepting(self) -> bool:
+        """False while the writer is failing or backed up: callers write synchronously instead"""
+        return self._healthy and self._queue.qsize() < MAX_QUEUED
+
+    def enqueue(self, message: Dict):
+        """Queue a message dict (see db.save_chat_messages_batch) for persistence"""
+        with self._cond:
+            self._track(message, 1)
+        self._queue.put(message)
+        if self._thread is None or not self._thread.is_alive():
+            self._start()
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            if first is _FLUSH:
+                continue  # its messages went out with an earlier batch
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=max(remaining, 0)) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                if item is _FLUSH:
+                    break
+                batch.append(item)
+            self._write_until_done(batch)
+            if stop:
+                return
+
+    def _write_until_done(self, batch: List[Dict]):
+        """Write a batch, retrying failed parts with backoff; spool them if the process is stopping"""
+        failed = self._write(batch)
+        delay = RETRY_DELAY
+        while failed:
+            self._healthy = False
+            if self._stopping:
+                self._spool(failed)
+                return
+            logger.warning("Chat write failed for %d messages, retrying in %.1fs", len(failed), delay)
+            time.sleep(delay)
+            delay = min(delay * 2, MAX_RETRY_DELAY)
+            failed = self._write(failed)
+        self._healthy = True
+
+    def _write(self, batch: List[Dict]) -> List[Dict]:
+        """One attempt per database; returns the messages that were not written"""
+        failed, written = [], []
+        for messages in self._by_database(batch):
+            try:
+                with pooled_connection(messages[0]["user_id"]) as conn:
+                    save_chat_messages_batch(conn, messages)
+                written += messages
+            except Exception:
+                logger.exception("Chat batch of %d messages failed", len(messages))
+                failed += messages
+        self._settle(written)
+        return failed
+
+    def _track(self, message: Dict, delta: int):
+        self._pending[("session", message["session_id"])] += delta
+        self._pending[("user", message["user_id"])] += delta
+
+    def _settle(self, messages: List[Dict]):
+        """Messages are committed (or spooled): release the barriers waiting on them"""
+        if not messages:
+            return
+        with self._cond:
+            for m in messages:
+                self._track(m, -1)
+            self._pending += Counter()  # drop zero counts
+            self._cond.notify_all()
+
+    def _spool(self, messages: List[Dict]):
+        """Append unwritten messages to the spool file for the next process to replay"""
+        try:
+            with open(SPOOL_PATH, "a", encoding="utf-8") as f:
+                for m in messages:
+                    f.write(json.dumps(m) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            logger.error("Spooled %d unwritten chat messages to %s", len(messages), SPOOL_PATH)
+        except OSError:
+            logger.exception("Could not spool %d chat messages; they are lost", len(messages))
+        self._settle(messages)
+
+    def replay_spool(self) -> int:
+        """Queue messages a previous process spooled; the file is claimed by renaming it"""
+        claimed = f"{SPOOL_PATH}.{os.getpid()}"
+        try:
+            os.replace(SPOOL_PATH, claimed)
+        except FileNotFoundError:
+            return 0
+        with open(claimed, encoding="utf-8") as f:
+            messages = [json.loads(line) for line in f if line.strip()]
+        for m in messages:
+            self.enqueue(m)
+        os.remove(claimed)
+        logger.warning("Replaying %d spooled chat messages", len(messages))
+        return len(messages)
+
+    @staticmethod
+    def _by_database(batch: List[Dict]) -> List[List[Dict]]:
+        """Split a batch by the database (global or shard) its users live on: one transaction each"""
+        groups: Dict = {}
+        for m in batch:
+            try:
+                key = shard_for(m["user_id"])
+            except Exception:
+                key = ("user", m["user_id"])  # directory unreachable: pooled_connection retries the lookup
+            groups.setdefault(key, []).append(m)
+        return list(groups.values())
+
+    def _wait(self, key, timeout: float) -> bool:
+        with self._cond:
+            if self._pending[key] <= 0:
+                return True
+        # Someone is blocked on the open batch: cut its collection window short
+        self._queue.put(_FLUSH)
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending[key] <= 0, timeout)
+
+    def wait_for_session(self, session_id: int, timeout: float = 2.0) -> bool:
+        """Block until every queued message for this session is committed"""
+        return self._wait(("session", session_id), timeout)
+
+    def wait_for_user(self, user_id: int, timeout: float = 2.0) -> bool:
+        """Block until every queued message for this user is committed"""
+        return self._wait(("user", user_id), timeout)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until the queue is fully persisted"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending, timeout)
+
+    def shutdown(self, timeout: float = 5.0):
+        """Drain outstanding messages and stop the writer thread; spool what could not be written"""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(None)
+        thread.join(timeout)
+        self._stopping = True
+        thread.join(MAX_RETRY_DELAY)
+        left = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and item is not _FLUSH:
+                left.append(item)
+        if left:
+            self._spool(left)
+
+
+chat_write_buffer = ChatWriteBuffer()
+atexit.register(chat_write_buffer.shutdown)
+
+
+def _write_behind_enabled() -> bool:
+    return os.environ.get("CHAT_WRITE_BEHIND", "1") != "0"
+
+
+def replay_spool() -> int:
+    """Re-queue chat messages spooled by a previous process; run once at app startup"""
+    return chat_write_buffer.replay_spool()
+
+
+def persist_chat_message(user_id: Optional[int], role: str, message: str,
+                         session_id: Optional[int] = None, title: Optional[str] = None):
+    """
+    Record a chat message. `title` renames the session if it is still 'New Chat'.
+    Written behind the request unless CHAT_WRITE_BEHIND=0.
+    """
+    entry = {
+        "user_id": user_id,
+        "role": role,
+        "message": message,
+        "session_id": session_id,
+        "created_at": _now_ist_iso(),
+        "title": title,
+    }
+    if _write_behind_enabled() and chat_write_buffer.accepting():
+        chat_write_buffer.enqueue(entry)
+    else:
+        # Write-behind off, failing or backed up: commit on the request so errors surface
+        save_chat_messages_batch(get_db_connection(user_id), [entry])
+
+
+def wait_for_session(session_id: Optional[int], timeout: float = 2.0) -> bool:
+    """Read-your-writes barrier before reading a session's messages"""
+    if session_id is None:
+        return True
+    return chat_write_buffer.wait_for_session(session_id, timeout)
+
+
+def wait_for_user(user_id: Optional[int], timeout: float = 2.0) -> bool:
+    """Read-your-writes barrier before listing a user's sessions or history"""
+    if user_id is None:
+        return True
+    return chat_write_buffer.wait_for_user(user_id, timeout)
+
+
+def await_committed(user_id: Optional[int], session_id: Optional[int], timeout: float = 5.0) -> bool:
+    """
+    Barrier a writing request runs before its response completes: wait until
+    the messages it queued are committed, so any worker's reads see them.
+    Returns False (and logs) on timeout.
+    """
+    if session_id is not None:
+        done = chat_write_buffer.wait_for_session(session_id, timeout)
+    elif user_id is not None:
+        done = chat_write_buffer.wait_for_user(user_id, timeout)
+    else:
+        return True
+    if not done:
+        logger.warning("Chat messages for session %s not committed after %.1fs", session_id, timeout)
+    return done
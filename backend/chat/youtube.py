@@ -0,0 +1,186 @@
+"""
+YouTube search client for the chat "related videos" panel.
+
+Requests go through one shared `requests.Session`, so connections to the
+API are kept alive and reused across requests instead of paying a TLS
+handshake per search. Results are cached by normalised query + maxResults
+in a per-process TTL/LRU, backed by the `youtube_search_cache` table so
+popular lecture topics survive restarts and are shared between workers.
+
+Set YOUTUBE_API_URL (e.g. http://127.0.0.1:8090/youtube/v3/search) to
+point searches at a local mock server.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from db import pooled_connection
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+YOUTUBE_API_URL = os.getenv("YOUTUBE_API_URL", "https://www.googleapis.com/youtube/v3/search")
+YOUTUBE_CACHE_TTL = int(os.getenv("YOUTUBE_CACHE_TTL", 6 * 3600))
+# Set to 0 to keep the cache in-process only
+YOUTUBE_PERSISTENT_CACHE = os.getenv("YOUTUBE_PERSISTENT_CACHE", "1") != "0"
+REQUEST_TIMEOUT = 8
+MAX_RESULTS_LIMIT = 50  # API maximum
+
+# (normalised query, maxResults) -> list of videos
+SEARCH_CACHE = TTLCache(maxsize=2048, ttl=YOUTUBE_CACHE_TTL)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class YouTubeAPIError(Exception):
+    """Non-200 response from the YouTube Data API"""
+
+    def __init__(self, status_code: int, details: str):
+        super().__init__(f"YouTube API error {status_code}")
+        self.status_code = status_code
+        self.details = details
+
+
+def get_http_session():
+    """Shared keep-alive session, created on first use"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+                from urllib3.util.retry import Retry
+
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=4,
+                    pool_maxsize=int(os.getenv("YOUTUBE_POOL_SIZE", 20)),
+                    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=(502, 503, 504),
+                                      allowed_methods=frozenset(["GET"])),
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+
+def normalize_query(query: str) -> str:
+    """Case- and whitespace-insensitive form used as the cache key"""
+    return " ".join(query.casefold().split())
+
+
+def _persistent_key(query: str, max_results: int) -> str:
+    return hashlib.sha256(f"{max_results}:{query}".encode("utf-8")).hexdigest()
+
+
+def _load_persistent(query: str, max_results: int) -> Optional[List[Dict]]:
+    fresh_after = (datetime.now() - timedelta(seconds=YOUTUBE_CACHE_TTL)).strftime('%Y-%m-%d %H:%M:%S')
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute('''
+            SELECT videos FROM youtube_search_cache
+            WHERE cache_key = %s AND fetched_at > %s
+            ''', (_persistent_key(query, max_results), fresh_after))
+            row = cur.fetchone()
+        finally:
+            cur.close()
+    return json.loads(row[0]) if row else None
+
+
+def _store_persistent(query: str, max_results: int, videos: List[Dict]):
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute('''
+            INSERT INTO youtube_search_cache (cache_key, query, max_results, videos, fetched_at)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE videos = VALUES(videos), fetched_at = VALUES(fetched_at)
+            ''', (_persistent_key(query, max_results), query[:512], max_results,
+                  json.dumps(videos), datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+            conn.commit()
+        finally:
+            cur.close()
+
+
+def _fetch(query: str, max_results: int, api_key: str) -> List[Dict]:
+    params = {
+        "part": "snippet",
+        "q": query,
+        "type": "video",
+        "maxResults": max_results,
+        "key": api_key,
+    }
+    resp = get_http_session().get(YOUTUBE_API_URL, params=params, timeout=REQUEST_TIMEOUT)
+    if resp.status_code != 200:
+        raise YouTubeAPIError(resp.status_code, resp.text)
+
+    videos = []
+    for item in resp.json().get("items", []):
+        vid = item.get("id", {}).get("videoId")
+        snip = item.get("snippet", {})
+        if not vid:
+            continue
+        thumbnails = snip.get("thumbnails") or {}
+        videos.append({
+            "videoId": vid,
+            "title": snip.get("title"),
+            "description": snip.get("description"),
+            "channelTitle": snip.get("channelTitle"),
+            "thumbnail": thumbnails.get("high", {}).get("url") or thumbnails.get("default", {}).get("url"),
+            "publishTime": snip.get("publishTime"),
+        })
+    return videos
+
+
+def search_videos(query: str, max_results: int, api_key: str) -> List[Dict]:
+    """Top videos for a query: in-process cache, then the persistent tier, then the API"""
+    max_results = max(1, min(int(max_results), MAX_RESULTS_LIMIT))
+    normalized = normalize_query(query)
+    key = (normalized, max_results)
+
+    videos = SEARCH_CACHE.get(key)
+    if videos is not None:
+        return videos
+
+    if YOUTUBE_PERSISTENT_CACHE:
+        try:
+            videos = _load_persistent(normalized, max_results)
+        except Exception as e:
+            logger.warning("YouTube cache read failed: %s", e)
+        if videos is not None:
+            SEARCH_CACHE.set(key, videos)
+            return videos
+
+    videos = _fetch(query, max_results, api_key)
+    SEARCH_CACHE.set(key, videos)
+    if YOUTUBE_PERSISTENT_CACHE:
+        try:
+            _store_persistent(normalized, max_results, videos)
+        except Exception as e:
+            logger.warning("YouTube cache write failed: %s", e)
+    return videos
+
+
+def purge_youtube_cache(batch_size: int = 1000) -> int:
+    """Delete persistent cache rows older than the TTL; safe to call from the cron thread"""
+    cutoff = (datetime.now() - timedelta(seconds=YOUTUBE_CACHE_TTL)).strftime('%Y-%m-%d %H:%M:%S')
+    purged = 0
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            while True:
+                cur.execute('DELETE FROM youtube_search_cache WHERE fetched_at <= %s LIMIT %s', (cutoff, batch_size))
+                conn.commit()
+                purged += cur.rowcount
+                if cur.rowcount < batch_size:
+                    break
+        finally:
+            cur.close()
+    return purged
@@ -1,7 +1,4 @@
-import os
-from google import genai
-
-client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+from utils.clients import get_gemini_client
 
 def analyze_execution(problem, code, execution_result):
     prompt = f"""
@@ -28,7 +25,7 @@ Explain clearly:
 Keep response professional and concise.
 """
 
-    response = client.models.generate_content(
+    response = get_gemini_client().models.generate_content(
         model="gemini-2.5-flash",
         contents=prompt
     )
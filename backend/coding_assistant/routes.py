@@ -186,12 +186,6 @@ def get_user_history(user_id):
 
         for item in history:
             item["problem_title"] = prob_map.get(item["problem_id"], item["problem_id"])
-            if "created_at" in item and item["created_at"]:
-                # Convert datetime to string for JSON serialization
-                if hasattr(item["created_at"], "isoformat"):
-                    item["created_at"] = item["created_at"].isoformat()
-                else:
-                    item["created_at"] = str(item["created_at"])
 
         return jsonify({"success": True, "history": history})
 
@@ -1,22 +1,16 @@
 import os
 import json
-from google import genai
 
 from .prompts import build_prompt
 from .language_handlers.python import python_rules
 from .language_handlers.cpp import cpp_rules
 from .language_handlers.javascript import js_rules
+from utils.clients import get_gemini_client
 
 # ======================================================
 # GEMINI SETUP (for Explain Code / Debug Code)
 # ======================================================
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise RuntimeError("GEMINI_API_KEY not set")
-
-gemini_client = genai.Client(api_key=GEMINI_API_KEY)
-
 LANGUAGE_RULES = {
     "python": python_rules,
     "cpp": cpp_rules,
@@ -48,7 +42,7 @@ def process_code_query(language: str, question: str, code: str, task: str):
     )
 
     try:
-        response = gemini_client.models.generate_content(
+        response = get_gemini_client().models.generate_content(
             model="gemini-2.5-flash",
             contents=prompt
         )
@@ -147,7 +141,7 @@ Output Format (JSON):
   "message": "Start with 'You can optimize your code by thinking a bit more' if not optimized. Otherwise praise."
 }}
 """
-            response = gemini_client.models.generate_content(
+            response = get_gemini_client().models.generate_content(
                 model="gemini-2.5-flash",
                 contents=prompt,
                 config={'response_mime_type': 'application/json'}
@@ -180,7 +174,7 @@ Error: {first_fail.get('error')}
 Task:
 Explain the logical error or syntax error clearly. Give a small hint.
 """
-            response = gemini_client.models.generate_content(
+            response = get_gemini_client().models.generate_content(
                 model="gemini-2.5-flash",
                 contents=prompt
             )
@@ -236,7 +230,7 @@ Output JSON Structure:
   ]
 }}
 """
-        response = gemini_client.models.generate_content(
+        response = get_gemini_client().models.generate_content(
             model="gemini-2.5-flash",
             contents=prompt,
             config={'response_mime_type': 'application/json'}
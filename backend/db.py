@@ -1,83 +1,375 @@
 import mysql.connector
+import base64
+import functools
+import itertools
 import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from mysql.connector import pooling, errors
 import os
 from datetime import datetime, timedelta, timezone
 from werkzeug.security import generate_password_hash, check_password_hash
-from typing import Optional, Dict, List, Any
-from flask import g
-from decimal import Decimal
+from typing import Optional, Dict, List, Any, Tuple
+from flask import g, has_app_context
+import logging
+from db_shards import SHARD_SPECS, ShardRouter, fan_out
+from db_sqlite import SQLITE_PATH, SQLitePool
+from migrations import apply_migrations
+from observability import instrument_connection
+from utils.cache import TTLCache
 
-# MySQL connection pool variable
+logger = logging.getLogger(__name__)
+
+# Storage backend: "mysql" (default) or "sqlite" for single-node and test deployments
+DB_BACKEND = os.environ.get("DB_BACKEND", "mysql").lower()
+
+# Connection pool (MySQLConnectionPool, or SQLitePool in sqlite mode)
 DB_POOL = None
 POOL_LOCK = threading.Lock()
+POOL_SIZE = int(os.environ.get("MYSQL_POOL_SIZE", 2))
+
+# Read replicas: MYSQL_REPLICA_HOSTS="replica1,replica2:3307" (same user, password
+# and database as the primary). Functions declared @reads may be served by a
+# replica; everything else, and every read after a request writes, uses the primary.
+REPLICA_HOSTS = [h.strip() for h in os.environ.get("MYSQL_REPLICA_HOSTS", "").split(",") if h.strip()]
+REPLICA_POOL_SIZE = int(os.environ.get("MYSQL_REPLICA_POOL_SIZE", 4))
+REPLICA_POOLS = []
+_REPLICA_CYCLE = None
+
+# User-id shards for the per-user tables (DB_SHARDS, see db_shards.py); None
+# when unsharded. Functions given a user_id run on that user's shard.
+SHARDS: Optional[ShardRouter] = None
+
+# "replica" inside @reads, "primary" inside @writes, None when undeclared (primary)
+_ROUTE: ContextVar[Optional[str]] = ContextVar("db_route", default=None)
+
+# Schema bootstrap state. Set AUTO_MIGRATE=0 in production and run
+# `python migrations.py migrate` once per deploy instead of on every worker.
+SCHEMA_READY = False
+SCHEMA_LOCK = threading.Lock()
+
+# Per-user progress summaries; invalidated on writes, TTL bounds staleness across workers
+PROGRESS_CACHE = TTLCache(maxsize=4096, ttl=float(os.environ.get("PROGRESS_CACHE_TTL", 30)))
 
 # IST time helper (India Standard Time, UTC+05:30)
 def _now_ist_iso():
     ist = timezone(timedelta(hours=5, minutes=30))
     return datetime.now(ist).isoformat()
 
+# Keyset pagination cursors: opaque token for a (created_at, id) position
+def encode_cursor(created_at, row_id: int) -> str:
+    ts = created_at if isinstance(created_at, str) else created_at.isoformat()
+    return base64.urlsafe_b64encode(f"{ts}|{row_id}".encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor from encode_cursor; raises ValueError if malformed"""
+    try:
+        ts, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return datetime.fromisoformat(ts), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
 # Helper to show current DB env vars (for debugging)
-def _print_db_env_vars():
-    print("Using DB config:")
-    print(f" MYSQL_HOST = {os.environ.get('MYSQL_HOST', 'localhost')}")
-    print(f" MYSQL_USER = {os.environ.get('MYSQL_USER', 'root')}")
-    print(f" MYSQL_PASSWORD = {'' if not os.environ.get('MYSQL_PASSWORD') else '***'}")
-    print(f" MYSQL_DB = {os.environ.get('MYSQL_DB', 'edumate')}")
+def _log_db_env_vars():
+    logger.debug(
+        "Using DB config: MYSQL_HOST=%s MYSQL_USER=%s MYSQL_PASSWORD=%s MYSQL_DB=%s",
+        os.environ.get('MYSQL_HOST', 'localhost'),
+        os.environ.get('MYSQL_USER', 'root'),
+        '' if not os.environ.get('MYSQL_PASSWORD') else '***',
+        os.environ.get('MYSQL_DB', 'edumate'),
+    )
 
 # ===== CONNECTION HANDLING =====
 
-def init_db_pool():
-    """Initialize MySQL connection pool safely"""
-    global DB_POOL
+def _auto_migrate_enabled() -> bool:
+    return os.environ.get("AUTO_MIGRATE", "1") != "0"
+
+def init_db_pool(bootstrap: bool = True):
+    """Initialize the connection pool for the configured backend safely"""
+    global DB_POOL, SHARDS
     
     with POOL_LOCK:
         if DB_POOL:
             return
 
-        host = os.environ.get("MYSQL_HOST", "localhost")
-        user = os.environ.get("MYSQL_USER", "root")
-        password = os.environ.get("MYSQL_PASSWORD", "")
-        database = os.environ.get("MYSQL_DB", "edumate")
+        if DB_BACKEND == "sqlite":
+            DB_POOL = SQLitePool(SQLITE_PATH)
+            logger.info("SQLite backend initialized: %s", SQLITE_PATH)
+            if SHARD_SPECS:
+                SHARDS = ShardRouter(SHARD_SPECS, DB_BACKEND)
+        else:
+            host = os.environ.get("MYSQL_HOST", "localhost")
+            user = os.environ.get("MYSQL_USER", "root")
+            password = os.environ.get("MYSQL_PASSWORD", "")
+            database = os.environ.get("MYSQL_DB", "edumate")
+
+            _log_db_env_vars()
 
-        _print_db_env_vars()
+            try:
+                DB_POOL = pooling.MySQLConnectionPool(
+                    pool_name="edumate_pool",
+                    pool_size=POOL_SIZE,
+                    pool_reset_session=True,
+                    host=host,
+                    user=user,
+                    password=password,
+                    database=database,
+                    auth_plugin="mysql_native_password"
+                )
+                logger.info("MySQL pool initialized: %s@%s (%s)", user, host, database)
+            except errors.Error as e:
+                logger.error("Database connection error: %s", e)
+                raise
+            _init_replica_pools(user, password, database)
+            if SHARD_SPECS:
+                SHARDS = ShardRouter(SHARD_SPECS, DB_BACKEND, user, password)
+
+    # First pool use in this process bootstraps the schema (dev default); a
+    # failure propagates and the next caller retries
+    if bootstrap and _auto_migrate_enabled():
+        ensure_schema()
 
+def _ensure_ready():
+    """
+    Create the pool on first use and, with AUTO_MIGRATE, hold every caller
+    until the schema bootstrap has finished: ensure_schema serialises on
+    SCHEMA_LOCK, so no thread queries a half-migrated database.
+    """
+    if DB_POOL is None:
+        init_db_pool(bootstrap=False)
+    if not SCHEMA_READY and _auto_migrate_enabled():
+        ensure_schema()
+
+def _init_replica_pools(user: str, password: str, database: str):
+    """One pool per replica; a replica that is down is logged and left out"""
+    global _REPLICA_CYCLE
+    for i, spec in enumerate(REPLICA_HOSTS):
+        host, _, port = spec.partition(":")
         try:
-            DB_POOL = pooling.MySQLConnectionPool(
-                pool_name="edumate_pool",
-                pool_size=2,
+            REPLICA_POOLS.append(pooling.MySQLConnectionPool(
+                pool_name=f"edumate_replica_{i}",
+                pool_size=REPLICA_POOL_SIZE,
                 pool_reset_session=True,
                 host=host,
+                port=int(port or 3306),
                 user=user,
                 password=password,
                 database=database,
                 auth_plugin="mysql_native_password"
-            )
-            print(f"✅ MySQL Pool Initialized → {user}@{host} ({database})")
+            ))
+            logger.info("MySQL replica pool initialized: %s", spec)
+        except errors.Error as e:
+            logger.error("Replica %s unavailable, reads stay on the primary: %s", spec, e)
+    if REPLICA_POOLS:
+        _REPLICA_CYCLE = itertools.cycle(REPLICA_POOLS)
+
+def _acquire_connection():
+    """Borrow a connection from the pool, retrying while it is exhausted"""
+    _ensure_ready()
+    return _borrow(DB_POOL.get_connection)
+
+def _acquire_shard_connection(shard: int):
+    _ensure_ready()
+    return _borrow(lambda: SHARDS.connection(shard))
+
+def _borrow(get_connection):
+    # Retry logic for connection pool exhaustion
+    retries = 20
+    for i in range(retries):
+        try:
+            return get_connection()
+        except errors.PoolError:
+            if i == retries - 1:
+                logger.error("DB pool exhausted after %d retries", retries)
+                raise
+            time.sleep(0.2 * (i + 1)) # Linear backoff
+
+def _acquire_replica_connection():
+    """Borrow from the next replica pool; None when every replica is exhausted or down"""
+    for _ in range(len(REPLICA_POOLS)):
+        try:
+            return next(_REPLICA_CYCLE).get_connection()
         except errors.Error as e:
-            print(f"❌ Database connection error: {e}")
-            raise
+            logger.warning("Replica checkout failed, trying the next one: %s", e)
+    return None
+
+class _PinningConnection:
+    """Primary connection proxy: once the request commits, its reads stay on the primary"""
 
-def get_db_connection():
-    """Get database connection with proper Flask context handling"""
+    def __init__(self, conn):
+        self._conn = conn
+
+    def commit(self):
+        self._conn.commit()
+        g.db_pinned = True
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+def reads(fn):
+    """Declare fn read-only: its queries may be served by a read replica"""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        # A read nested in a write keeps the write's primary connection
+        if _ROUTE.get() == "primary":
+            return fn(*args, **kwargs)
+        token = _ROUTE.set("replica")
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _ROUTE.reset(token)
+    return wrapper
+
+def reads_primary(fn):
+    """
+    Declare fn read-only but bound to the primary, without pinning the
+    request: for reads whose result outlives the request (cache fills), where
+    replica lag would be served for the whole TTL
+    """
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = _ROUTE.set("primary")
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _ROUTE.reset(token)
+    return wrapper
+
+def writes(fn):
+    """Declare fn as writing: it uses the primary and pins the request's later reads there"""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if has_app_context():
+            g.db_pinned = True
+        token = _ROUTE.set("primary")
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _ROUTE.reset(token)
+    return wrapper
+
+def get_db_connection(user_id: Optional[int] = None):
+    """
+    Get database connection with proper Flask context handling.
+    Pass user_id when querying per-user tables so sharded users reach their shard.
+    """
+    shard = shard_for(user_id)
+    if shard is not None:
+        if 'db_shards' not in g:
+            g.db_shards = {}
+        if shard not in g.db_shards:
+            g.db_shards[shard] = instrument_connection(_acquire_shard_connection(shard))
+        return g.db_shards[shard]
+    if REPLICA_POOLS and _ROUTE.get() == "replica" and not g.get("db_pinned"):
+        if 'db_replica' not in g:
+            _ensure_ready()
+            conn = _acquire_replica_connection()
+            if conn is not None:
+                g.db_replica = instrument_connection(conn)
+        if 'db_replica' in g:
+            return g.db_replica
     if 'db' not in g:
-        if DB_POOL is None:
-            init_db_pool()
-        
-        # Retry logic for connection pool exhaustion
-        retries = 20
-        for i in range(retries):
-            try:
-                g.db = DB_POOL.get_connection()
-                return g.db
-            except errors.PoolError:
-                if i == retries - 1:
-                    print("❌ DB Pool Exhausted after retries")
-                    raise
-                import time
-                time.sleep(0.2 * (i + 1)) # Linear backoff
+        # Cursors are timed for the request profiling middleware
+        conn = instrument_connection(_acquire_connection())
+        g.db = _PinningConnection(conn) if REPLICA_POOLS else conn
     return g.db
 
+@contextmanager
+def pooled_connection(user_id: Optional[int] = None):
+    """Borrow a pool connection outside a Flask request (background threads, jobs)"""
+    shard = shard_for(user_id)
+    conn = _acquire_connection() if shard is None else _acquire_shard_connection(shard)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+# ===== SHARD ROUTING =====
+
+def shard_for(user_id: Optional[int]) -> Optional[int]:
+    """Shard holding the user's rows; None for the global database (unsharded, anonymous or unmoved users)"""
+    if user_id is None or not SHARD_SPECS:
+        return None
+    if DB_POOL is None:
+        init_db_pool()
+    if has_app_context():
+        return SHARDS.lookup(get_db_connection(), int(user_id))
+    conn = _acquire_connection()
+    try:
+        return SHARDS.lookup(conn, int(user_id))
+    finally:
+        conn.close()
+
+def _database_acquirers() -> List:
+    """Connection factories for the global database followed by every shard"""
+    acquirers = [_acquire_connection]
+    if SHARDS is not None:
+        acquirers += [functools.partial(_acquire_shard_connection, i) for i in range(len(SHARDS))]
+    return acquirers
+
+def for_each_database(fn) -> list:
+    """
+    Run fn(conn) on the global database and on every shard in parallel, each
+    on its own pool connection. Returns the results, global database first.
+    """
+    if SHARD_SPECS and DB_POOL is None:
+        init_db_pool()
+    return fan_out(_database_acquirers(), fn)
+
+def fan_out_query(sql: str, params: tuple = ()) -> List[List[Dict]]:
+    """
+    Run one read on the global database and every shard; returns each
+    database's rows (dicts) in for_each_database order for the caller to merge.
+    """
+    def run(conn):
+        cur = conn.cursor(dictionary=True)
+        try:
+            cur.execute(sql, params)
+            return cur.fetchall()
+        finally:
+            cur.close()
+    if not SHARD_SPECS and has_app_context():
+        # Unsharded: the request connection, so @reads can still use a replica
+        return [run(get_db_connection())]
+    return for_each_database(run)
+
+def place_new_user(user_id: int):
+    """
+    Give a just-created user a home shard: record it in the directory and
+    mirror the users row there, which the shard's foreign keys reference.
+    No-op when unsharded.
+    """
+    if not SHARD_SPECS:
+        return
+    if DB_POOL is None:
+        init_db_pool()
+    shard = SHARDS.home_shard(user_id)
+    SHARDS.forget(user_id)
+    with pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT username, email, name, created_at FROM users WHERE id = %s", (user_id,))
+            username, email, name, created_at = cur.fetchone()
+            cur.execute("INSERT IGNORE INTO user_shards (user_id, shard) VALUES (%s, %s)", (user_id, shard))
+            conn.commit()
+        finally:
+            cur.close()
+    with pooled_connection(user_id) as conn:
+        mirror_user_row(conn, user_id, username, email, name, created_at)
+        conn.commit()
+
+def mirror_user_row(conn, user_id: int, username: str, email: str, name: str, created_at):
+    """Stub users row on a shard (no password: authentication reads the global table)"""
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+        INSERT IGNORE INTO users (id, username, email, name, password_hash, created_at)
+        VALUES (%s, %s, %s, %s, '', %s)
+        """, (user_id, username, email, name, created_at))
+    finally:
+        cur.close()
+
 # ===== TABLE CREATION =====
 
 def _ensure_tables(conn):
@@ -163,12 +455,6 @@ def _ensure_tables(conn):
     )
     """)
     
-    # Allow NULL user_id for anonymous sessions
-    try:
-        cur.execute("ALTER TABLE sessions MODIFY COLUMN user_id INT NULL")
-    except Exception:
-        pass
-    
     # Chat messages
     cur.execute("""
     CREATE TABLE IF NOT EXISTS chats (
@@ -242,12 +528,6 @@ def _ensure_tables(conn):
     )
     """)
     
-    # Add calendar_event_id to study_sessions (if not exists)
-    try:
-        cur.execute("ALTER TABLE study_sessions ADD COLUMN calendar_event_id VARCHAR(255) DEFAULT NULL")
-    except Exception:
-        pass  # Column already exists
-    
     # AI-scheduled tests
     cur.execute("""
     CREATE TABLE IF NOT EXISTS scheduled_tests (
@@ -300,16 +580,44 @@ def _ensure_tables(conn):
     conn.commit()
     cur.close()
 
+    # Column changes and indexes are versioned in migrations.py
+    apply_migrations(conn)
+
 def init_db():
-    """Initialize database tables"""
+    """Initialize database tables and apply pending migrations"""
+    global SCHEMA_READY
     if DB_POOL is None:
-        init_db_pool()
+        init_db_pool(bootstrap=False)
     conn = DB_POOL.get_connection()
-    _ensure_tables(conn)
-    conn.close()
+    try:
+        _ensure_tables(conn)
+    finally:
+        conn.close()
+    # Every shard carries the full schema; only the per-user tables get rows
+    for shard in range(len(SHARDS) if SHARDS else 0):
+        conn = SHARDS.connection(shard)
+        try:
+            _ensure_tables(conn)
+        finally:
+            conn.close()
+    SCHEMA_READY = True
+
+def ensure_schema():
+    """Run init_db at most once per process"""
+    if SCHEMA_READY:
+        return
+    with SCHEMA_LOCK:
+        if not SCHEMA_READY:
+            try:
+                init_db()
+            except Exception:
+                # SCHEMA_READY stays False: the next caller runs the bootstrap again
+                logger.exception("Database initialization error")
+                raise
 
 # ===== USER FUNCTIONS =====
 
+@writes
 def create_user(username: str, email: str, password_hash: str) -> int:
     """Create a new user and initialize progress record"""
     conn = get_db_connection()
@@ -322,7 +630,12 @@ def create_user(username: str, email: str, password_hash: str) -> int:
     """, (username, email, password_hash, created_at))
     
     user_id = cur.lastrowid
+    conn.commit()
+    cur.close()
+    place_new_user(user_id)
     
+    conn = get_db_connection(user_id)
+    cur = conn.cursor()
     cur.execute("""
     INSERT IGNORE INTO progress (user_id, tasks_completed, sessions_completed, tests_taken, total_hours)
     VALUES (%s, 0, 0, 0, 0)
@@ -378,21 +691,39 @@ def verify_user(username: str, password_plain: str) -> Dict:
 
 # ===== CHAT FUNCTIONS =====
 
-def get_chat_sessions(user_id: int) -> List[Dict]:
-    """Fetch chat sessions for a user"""
-    conn = get_db_connection()
+@reads
+def get_chat_sessions(user_id: int, limit: int = 50,
+                      cursor: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+    """
+    Fetch one page of chat sessions for a user, newest first.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    conn = get_db_connection(user_id)
     cur = conn.cursor(dictionary=True)
     
-    cur.execute("""
-    SELECT s.id, s.title, s.created_at,
-    (SELECT COUNT(*) FROM chats WHERE session_id = s.id) AS message_count
-    FROM sessions s WHERE s.user_id = %s ORDER BY s.created_at DESC
-    """, (user_id,))
-    
+    query = """
+    SELECT s.id, s.title, s.created_at, s.message_count, s.last_message_at
+    FROM sessions s WHERE s.user_id = %s
+    """
+    params = [user_id]
+    if cursor:
+        created_at, last_id = decode_cursor(cursor)
+        query += " AND (s.created_at < %s OR (s.created_at = %s AND s.id < %s))"
+        params += [created_at, created_at, last_id]
+    query += " ORDER BY s.created_at DESC, s.id DESC LIMIT %s"
+    params.append(limit + 1)
+    
+    cur.execute(query, tuple(params))
     rows = cur.fetchall()
     cur.close()
-    return rows
+    
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return rows, next_cursor
 
+@reads
 def get_chat_sessions_by_ids(ids: List[int]) -> List[Dict]:
     """Fetch session rows for given IDs (supports anonymous users)"""
     if not ids:
@@ -403,8 +734,7 @@ def get_chat_sessions_by_ids(ids: List[int]) -> List[Dict]:
     
     placeholders = ",".join(["%s"] * len(ids))
     query = f"""
-    SELECT s.id, s.title, s.created_at,
-    (SELECT COUNT(*) FROM chats WHERE session_id = s.id) AS message_count
+    SELECT s.id, s.title, s.created_at, s.message_count, s.last_message_at
     FROM sessions s WHERE s.id IN ({placeholders}) ORDER BY s.created_at DESC
     """
     
@@ -413,9 +743,10 @@ def get_chat_sessions_by_ids(ids: List[int]) -> List[Dict]:
     cur.close()
     return rows
 
+@writes
 def create_chat_session(user_id: Optional[int], title: str = "New Chat") -> int:
     """Create a new chat session"""
-    conn = get_db_connection()
+    conn = get_db_connection(user_id)
     cur = conn.cursor()
     
     cur.execute("INSERT INTO sessions (user_id, title) VALUES (%s, %s)", (user_id, title))
@@ -425,9 +756,10 @@ def create_chat_session(user_id: Optional[int], title: str = "New Chat") -> int:
     cur.close()
     return session_id
 
+@writes
 def delete_chat_session(session_id: int, user_id: int) -> bool:
     """Delete a session and its chats for the given user"""
-    conn = get_db_connection()
+    conn = get_db_connection(user_id)
     cur = conn.cursor()
     
     cur.execute("DELETE FROM chats WHERE session_id = %s AND user_id = %s", (session_id, user_id))
@@ -439,6 +771,7 @@ def delete_chat_session(session_id: int, user_id: int) -> bool:
     
     return affected_rows > 0
 
+@writes
 def delete_chat_session_anonymous(session_id: int) -> bool:
     """Delete an anonymous session and its chats"""
     conn = get_db_connection()
@@ -453,9 +786,10 @@ def delete_chat_session_anonymous(session_id: int) -> bool:
     
     return affected_rows > 0
 
+@writes
 def rename_chat_session(session_id: int, new_title: str, user_id: int) -> bool:
     """Rename a chat session"""
-    conn = get_db_connection()
+    conn = get_db_connection(user_id)
     cur = conn.cursor()
     
     cur.execute("UPDATE sessions SET title = %s WHERE id = %s AND user_id = %s",
@@ -467,10 +801,11 @@ def rename_chat_session(session_id: int, new_title: str, user_id: int) -> bool:
     
     return affected_rows > 0
 
+@writes
 def save_chat_message(user_id: Optional[int], role: str, message: str, session_id: int = None):
-    """Save a chat message"""
+    """Save a chat message and bump the session's message counters"""
     now = _now_ist_iso()
-    conn = get_db_connection()
+    conn = get_db_connection(user_id)
     cur = conn.cursor()
     
     cur.execute("""
@@ -478,12 +813,64 @@ def save_chat_message(user_id: Optional[int], role: str, message: str, session_i
     VALUES (%s, %s, %s, %s, %s)
     """, (user_id, role, message, session_id, now))
     
+    if session_id is not None:
+        cur.execute("""
+        UPDATE sessions SET message_count = message_count + 1, last_message_at = %s
+        WHERE id = %s
+        """, (now, session_id))
+    
     conn.commit()
     cur.close()
 
-def get_session_by_id(session_id: int) -> Optional[Dict]:
-    """Fetch a session by ID"""
-    conn = get_db_connection()
+def save_chat_messages_batch(conn, messages: List[Dict]):
+    """
+    Persist several chat messages in one transaction on `conn`.
+
+    Each message is a dict with user_id, role, message, session_id, created_at
+    and an optional `title`, applied only while the session is still titled
+    'New Chat'. Rows go in as one multi-row INSERT; session counters get one
+    UPDATE per session in the batch.
+    """
+    if not messages:
+        return
+    cur = conn.cursor()
+    try:
+        placeholders = ",".join(["(%s, %s, %s, %s, %s)"] * len(messages))
+        params = []
+        for m in messages:
+            params += [m["user_id"], m["role"], m["message"], m["session_id"], m["created_at"]]
+        cur.execute(f"""
+        INSERT INTO chats (user_id, role, message, session_id, created_at)
+        VALUES {placeholders}
+        """, tuple(params))
+
+        counters: Dict[int, List] = {}
+        for m in messages:
+            if m["session_id"] is None:
+                continue
+            entry = counters.setdefault(m["session_id"], [0, m["created_at"], None])
+            entry[0] += 1
+            entry[1] = max(entry[1], m["created_at"])
+            entry[2] = entry[2] or m.get("title")
+
+        for session_id, (count, last_at, title) in counters.items():
+            cur.execute("""
+            UPDATE sessions SET message_count = message_count + %s, last_message_at = %s
+            WHERE id = %s
+            """, (count, last_at, session_id))
+            if title:
+                cur.execute("UPDATE sessions SET title = %s WHERE id = %s AND title = 'New Chat'",
+                            (title, session_id))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+def get_session_by_id(session_id: int, user_id: Optional[int] = None) -> Optional[Dict]:
+    """Fetch a session by ID (pass the owner's user_id when sharded; session ids are per shard)"""
+    conn = get_db_connection(user_id)
     cur = conn.cursor(dictionary=True)
     
     cur.execute("SELECT id, user_id, title, created_at FROM sessions WHERE id = %s", (session_id,))
@@ -492,9 +879,10 @@ def get_session_by_id(session_id: int) -> Optional[Dict]:
     
     return row
 
-def set_session_title(session_id: int, title: str) -> bool:
+@writes
+def set_session_title(session_id: int, title: str, user_id: Optional[int] = None) -> bool:
     """Update session title"""
-    conn = get_db_connection()
+    conn = get_db_connection(user_id)
     cur = conn.cursor()
     
     cur.execute("UPDATE sessions SET title = %s WHERE id = %s", (title, session_id))
@@ -505,43 +893,80 @@ def set_session_title(session_id: int, title: str) -> bool:
     
     return affected > 0
 
-def get_chat_history(user_id: Optional[int], limit: int = 50, session_id: int = None) -> List[Dict]:
-    """Fetch chat history for a user/session"""
-    conn = get_db_connection()
-    cur = conn.cursor(dictionary=True)
-    
+def get_chat_history(user_id: Optional[int], limit: int = 50, session_id: int = None,
+                     before: Optional[str] = None, after: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Fetch one page of chat history for a user/session in chronological order.
+
+    Keyset-paginated on (created_at, id): with no cursor the latest `limit`
+    messages are returned; `before` pages back towards older messages and
+    `after` pages forward towards newer ones. The returned cursors mark the
+    first and last message of the page.
+    """
+    page = {"messages": [], "has_older": False, "has_newer": False,
+            "before_cursor": None, "after_cursor": None}
+
     if session_id:
+        where, params = "session_id = %s", [session_id]
         if user_id is not None:
-            cur.execute("""
-            SELECT * FROM chats WHERE user_id = %s AND session_id = %s
-            ORDER BY created_at ASC LIMIT %s
-            """, (user_id, session_id, limit))
-        else:
-            cur.execute("""
-            SELECT * FROM chats WHERE session_id = %s
-            ORDER BY created_at ASC LIMIT %s
-            """, (session_id, limit))
+            where, params = "user_id = %s AND session_id = %s", [user_id, session_id]
+    elif user_id is not None:
+        where, params = "user_id = %s", [user_id]
     else:
-        if user_id is not None:
-            cur.execute("""
-            SELECT * FROM chats WHERE user_id = %s
-            ORDER BY created_at DESC LIMIT %s
-            """, (user_id, limit))
-        else:
-            cur.close()
-            return []
-    
+        return page
+
+    scope, scope_params = where, list(params)
+    forward = after is not None
+    if forward:
+        created_at, row_id = decode_cursor(after)
+        where += " AND (created_at > %s OR (created_at = %s AND id > %s))"
+        params += [created_at, created_at, row_id]
+    elif before is not None:
+        created_at, row_id = decode_cursor(before)
+        where += " AND (created_at < %s OR (created_at = %s AND id < %s))"
+        params += [created_at, created_at, row_id]
+    order = "ASC" if forward else "DESC"
+
+    conn = get_db_connection(user_id)
+    cur = conn.cursor(dictionary=True)
+    cur.execute(f"""
+    SELECT id, role, message, session_id, created_at FROM chats
+    WHERE {where}
+    ORDER BY created_at {order}, id {order} LIMIT %s
+    """, tuple(params + [limit + 1]))
     rows = cur.fetchall()
+
+    more = len(rows) > limit
+    rows = rows[:limit]
+    if not forward:
+        rows.reverse()
+        has_older = more
+    else:
+        # Paging forward says nothing about what precedes the window: probe
+        # for a message before its first row (or before the cursor when empty)
+        first_at, first_id = (rows[0]["created_at"], rows[0]["id"]) if rows else decode_cursor(after)
+        cur.execute(f"""
+        SELECT 1 FROM chats WHERE {scope} AND (created_at < %s OR (created_at = %s AND id < %s)) LIMIT 1
+        """, tuple(scope_params + [first_at, first_at, first_id]))
+        has_older = cur.fetchone() is not None
     cur.close()
-    return rows
+
+    page["messages"] = rows
+    page["has_older"] = has_older
+    page["has_newer"] = more if forward else before is not None
+    if rows:
+        page["before_cursor"] = encode_cursor(rows[0]["created_at"], rows[0]["id"])
+        page["after_cursor"] = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return page
 
 # ===== QUIZ FUNCTIONS =====
 
+@writes
 def save_quiz_attempt(user_id: int, topic: str, difficulty: str, score: int,
                       total_questions: int, time_taken: int, username: str = None) -> int:
     """Save a quiz attempt"""
     percentage = int((score / total_questions) * 100) if total_questions > 0 else 0
-    conn = get_db_connection()
+    conn = get_db_connection(user_id)
     cur = conn.cursor()
     
     cur.execute("""
@@ -552,12 +977,13 @@ def save_quiz_attempt(user_id: int, topic: str, difficulty: str, score: int,
     attempt_id = cur.lastrowid
     conn.commit()
     cur.close()
+    invalidate_progress(user_id)
     
     return attempt_id
 
 def get_quiz_history(user_id: int, limit: int = 50) -> List[Dict]:
     """Fetch quiz history for a user"""
-    conn = get_db_connection()
+    conn = get_db_connection(user_id)
     cur = conn.cursor(dictionary=True)
     
     cur.execute("""
@@ -569,9 +995,10 @@ def get_quiz_history(user_id: int, limit: int = 50) -> List[Dict]:
     cur.close()
     return rows
 
+@reads
 def get_quiz_stats(user_id: int) -> Dict:
     """Fetch quiz statistics for a user"""
-    conn = get_db_connection()
+    conn = get_db_connection(user_id)
     cur = conn.cursor(dictionary=True)
     
     cur.execute("""
@@ -595,10 +1022,11 @@ def get_quiz_stats(user_id: int) -> Dict:
 
 # ===== STUDY SESSION FUNCTIONS =====
 
+@writes
 def add_study_session(user_id: int, title: str, subject: str, duration: int, date: str,
                       time: str, type_: str, priority: str, notes: Optional[str] = None) -> Dict:
     """Add a new study session"""
-    conn = get_db_connection()
+    conn = get_db_connection(user_id)
     cur = conn.cursor(dictionary=True)
     created_at = _now_ist_iso()
     
@@ -608,6 +1036,7 @@ def add_study_session(user_id: int, title: str, subject: str, duration: int, dat
     """, (user_id, title, subject, duration, date, time, type_, priority, notes, created_at))
     
     conn.commit()
+    invalidate_progress(user_id)
     
     cur.execute("SELECT * FROM study_sessions WHERE id = %s", (cur.lastrowid,))
     row = cur.fetchone()
@@ -617,7 +1046,7 @@ def add_study_session(user_id: int, title: str, subject: str, duration: int, dat
 
 def get_study_sessions(user_id: int) -> List[Dict]:
     """Fetch all study sessions for a user"""
-    conn = get_db_connection()
+    conn = get_db_connection(user_id)
     cur = conn.cursor(dictionary=True)
     
     cur.execute("SELECT * FROM study_sessions WHERE user_id = %s ORDER BY date, time", (user_id,))
@@ -626,22 +1055,25 @@ def get_study_sessions(user_id: int) -> List[Dict]:
     
     return rows
 
+@writes
 def delete_study_session(session_id: int, user_id: int) -> bool:
     """Delete a study session"""
-    conn = get_db_connection()
+    conn = get_db_connection(user_id)
     cur = conn.cursor()
     
     cur.execute("DELETE FROM study_sessions WHERE id = %s AND user_id = %s", (session_id, user_id))
     conn.commit()
+    invalidate_progress(user_id)
     
     affected = cur.rowcount
     cur.close()
     
     return affected > 0
 
+@writes
 def toggle_study_completion(session_id: int, user_id: int, force_completed: bool = None) -> Optional[Dict]:
     """Toggle or force study session completion status"""
-    conn = get_db_connection()
+    conn = get_db_connection(user_id)
     cur = conn.cursor(dictionary=True)
     
     cur.execute("SELECT completed FROM study_sessions WHERE id = %s AND user_id = %s", (session_id, user_id))
@@ -660,6 +1092,7 @@ def toggle_study_completion(session_id: int, user_id: int, force_completed: bool
     cur.execute("UPDATE study_sessions SET completed = %s WHERE id = %s AND user_id = %s", 
                 (newval, session_id, user_id))
     conn.commit()
+    invalidate_progress(user_id)
     
     cur.execute("SELECT * FROM study_sessions WHERE id = %s", (session_id,))
     outrow = cur.fetchone()
@@ -667,51 +1100,62 @@ def toggle_study_completion(session_id: int, user_id: int, force_completed: bool
     
     return outrow
 
+def invalidate_progress(user_id: int):
+    """Drop the cached progress summary after a study session or quiz change"""
+    PROGRESS_CACHE.invalidate(int(user_id))
+
+@reads_primary
 def compute_progress(user_id: int) -> Dict[str, Any]:
-    """Compute user progress statistics"""
-    conn = get_db_connection()
+    """
+    Compute user progress statistics (one query, cached briefly per user).
+    Read from the primary: a lagging replica's totals would stay cached for
+    the whole PROGRESS_CACHE_TTL after a study or quiz write invalidated them.
+    """
+    cached = PROGRESS_CACHE.get(int(user_id))
+    if cached is not None:
+        return dict(cached)
+
+    conn = get_db_connection(user_id)
     cur = conn.cursor(dictionary=True)
     
     try:
-        cur.execute("SELECT COUNT(*) AS c FROM study_sessions WHERE user_id = %s", (user_id,))
-        total_sessions = cur.fetchone()["c"]
-        
-        cur.execute("SELECT COUNT(*) AS c FROM study_sessions WHERE user_id = %s AND completed = 1", (user_id,))
-        completed_sessions = cur.fetchone()["c"]
-        
-        cur.execute("SELECT COALESCE(SUM(duration), 0) AS s FROM study_sessions WHERE user_id = %s", (user_id,))
-        total_minutes = cur.fetchone()["s"]
-        
-        cur.execute("SELECT COALESCE(SUM(duration), 0) AS s FROM study_sessions WHERE user_id = %s AND completed = 1", (user_id,))
-        completed_minutes = cur.fetchone()["s"]
-        
-        cur.execute("SELECT COUNT(*) AS c FROM quiz_attempts WHERE user_id = %s", (user_id,))
-        tests_taken = cur.fetchone()["c"]
-        
+        cur.execute("""
+        SELECT
+            COUNT(*) AS total_sessions,
+            COALESCE(SUM(completed = 1), 0) AS completed_sessions,
+            COALESCE(SUM(duration), 0) AS total_minutes,
+            COALESCE(SUM(CASE WHEN completed = 1 THEN duration ELSE 0 END), 0) AS completed_minutes,
+            (SELECT COUNT(*) FROM quiz_attempts WHERE user_id = %s) AS tests_taken
+        FROM study_sessions WHERE user_id = %s
+        """, (user_id, user_id))
+        row = cur.fetchone()
     finally:
         cur.close()
     
     # Convert Decimal to float for JSON compatibility
-    if isinstance(total_minutes, Decimal):
-        total_minutes = float(total_minutes)
-    if isinstance(completed_minutes, Decimal):
-        completed_minutes = float(completed_minutes)
-    
-    total_hours = (total_minutes or 0) / 60.0
-    completed_hours = (completed_minutes or 0) / 60.0
-    completion_rate = (int(completed_sessions) / int(total_sessions) * 100) if total_sessions > 0 else 0
-    
-    return {
-        "totalSessions": int(total_sessions),
-        "completedSessions": int(completed_sessions),
+    total_sessions = int(row["total_sessions"] or 0)
+    completed_sessions = int(row["completed_sessions"] or 0)
+    total_minutes = float(row["total_minutes"] or 0)
+    completed_minutes = float(row["completed_minutes"] or 0)
+    
+    total_hours = total_minutes / 60.0
+    completed_hours = completed_minutes / 60.0
+    completion_rate = (completed_sessions / total_sessions * 100) if total_sessions > 0 else 0
+    
+    progress = {
+        "totalSessions": total_sessions,
+        "completedSessions": completed_sessions,
         "totalHours": total_hours,
         "completedHours": completed_hours,
-        "testsTaken": int(tests_taken),
+        "testsTaken": int(row["tests_taken"] or 0),
         "completionRate": int(round(completion_rate))
     }
+    PROGRESS_CACHE.set(int(user_id), progress)
+    return dict(progress)
 
 # ===== LOGIN SESSION =====
 
+@writes
 def log_login(user_id: int) -> int:
     """Log user login"""
     conn = get_db_connection()
@@ -726,6 +1170,7 @@ def log_login(user_id: int) -> int:
     
     return session_id
 
+@writes
 def log_logout(session_id: int):
     """Log user logout"""
     conn = get_db_connection()
@@ -750,44 +1195,13 @@ def log_logout(session_id: int):
     conn.commit()
     cur.close()
 
-# ===== QUIZ RETAKE SCHEDULING =====
-
-def schedule_quiz_retake_if_needed(user_id: int, subject: str, taken_at: str, score: int, total_questions: int):
-    """Schedule quiz retake if score is low"""
-    if total_questions == 0 or score > total_questions // 2:
-        return
-    
-    conn = get_db_connection()
-    cur = conn.cursor(dictionary=True)
-    
-    taken_date = datetime.fromisoformat(taken_at)
-    retake_date_str = (taken_date + timedelta(days=2)).date().isoformat()
-    
-    cur.execute("SELECT id FROM study_sessions WHERE user_id = %s AND subject = %s AND date = %s AND completed = 0",
-                (user_id, subject, retake_date_str))
-    
-    if cur.fetchone():
-        cur.close()
-        return
-    
-    title = f"Retake Quiz: {subject}"
-    
-    cur.execute("""
-    INSERT INTO study_sessions (user_id, title, subject, duration, date, type, priority, completed, notes, created_at)
-    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-    """, (user_id, title, subject, 60, retake_date_str, 'quiz_retake', 'high', 0,
-          'You scored less than half. Prepare well for retake.', _now_ist_iso()))
-    
-    conn.commit()
-    cur.close()
-
-
 # ===== CODING ASSISTANT FUNCTIONS =====
 
+@writes
 def save_coding_attempt(user_id: int, problem_id: str, score: int, status: str, 
                         is_optimized: bool, language: str, code: str) -> int:
     """Save a coding attempt"""
-    conn = get_db_connection()
+    conn = get_db_connection(user_id)
     cur = conn.cursor()
     
     cur.execute("""
@@ -802,7 +1216,7 @@ def save_coding_attempt(user_id: int, problem_id: str, score: int, status: str,
 
 def get_coding_history(user_id: int, limit: int = 5) -> List[Dict]:
     """Fetch recent coding attempts"""
-    conn = get_db_connection()
+    conn = get_db_connection(user_id)
     cur = conn.cursor(dictionary=True)
     
     cur.execute("""
@@ -817,9 +1231,10 @@ def get_coding_history(user_id: int, limit: int = 5) -> List[Dict]:
     cur.close()
     return rows
 
+@reads
 def get_coding_stats(user_id: int):
     """Get aggregated coding statistics for a user"""
-    conn = get_db_connection()
+    conn = get_db_connection(user_id)
     cur = conn.cursor(dictionary=True)
     
     # Count distinct solved problems
@@ -837,10 +1252,3 @@ def get_coding_stats(user_id: int):
         "solved_count": result["solved_count"] if result else 0,
         "total_points": int(result["total_points"]) if result else 0
     }
-
-# ===== INITIALIZE DATABASE =====
-
-try:
-    init_db()
-except Exception as e:
-    print(f"Database initialization error: {e}")
\ No newline at end of file
@@ -0,0 +1,130 @@
+"""
+User-id sharding for the per-user tables (DB_SHARDS).
+
+The main database (MYSQL_* / SQLITE_PATH) stays the global database: users,
+login sessions, OAuth states, caches and the `user_shards` directory. Every
+per-user table (USER_TABLES) lives on the shard the directory assigns to the
+user; a user with no directory row still lives on the global database, which
+is how an unsharded deployment starts. New users are assigned
+`user_id % len(shards)` and a stub of their users row is mirrored onto the
+shard so the foreign keys hold. tools/rebalance_shards.py moves users.
+
+    DB_SHARDS="db1:3306/edumate_s0,db2/edumate_s1"   # MySQL: host[:port]/database
+    DB_SHARDS="data/s0.sqlite3,data/s1.sqlite3"       # DB_BACKEND=sqlite: file paths
+
+Shards use the same MYSQL_USER / MYSQL_PASSWORD as the global database.
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
+
+from mysql.connector import pooling
+
+from db_sqlite import SQLitePool
+from utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+SHARD_SPECS = [s.strip() for s in os.environ.get("DB_SHARDS", "").split(",") if s.strip()]
+SHARD_POOL_SIZE = int(os.environ.get("DB_SHARD_POOL_SIZE", 4))
+# Directory entries are cached per process; the rebalancer's moves reach other
+# workers after at most this long
+DIRECTORY_TTL = float(os.environ.get("SHARD_DIRECTORY_TTL", 60))
+
+# Per-user tables in copy order (parents before children):
+# (table, WHERE selecting one user's rows, {fk column: parent table whose ids get remapped})
+USER_TABLES = [
+    ("progress", "user_id = %s", {}),
+    ("tests", "user_id = %s", {}),
+    ("sessions", "user_id = %s", {}),
+    ("chats", "user_id = %s", {"session_id": "sessions"}),
+    ("quiz_attempts", "user_id = %s", {}),
+    ("quiz_answers", "attempt_id IN (SELECT id FROM quiz_attempts WHERE user_id = %s)",
+     {"attempt_id": "quiz_attempts"}),
+    ("study_sessions", "user_id = %s", {}),
+    ("calendar_events", "user_id = %s", {"session_id": "study_sessions"}),
+    ("coding_attempts", "user_id = %s", {}),
+    ("scheduled_tests", "user_id = %s", {}),
+    ("calendar_tokens", "user_id = %s", {}),
+    ("calendar_sync_state", "user_id = %s", {}),
+    ("review_state", "user_id = %s", {}),
+    ("topic_mastery", "user_id = %s", {}),
+]
+
+
+def _mysql_pool(index: int, spec: str, user: str, password: str):
+    address, _, database = spec.partition("/")
+    host, _, port = address.partition(":")
+    return pooling.MySQLConnectionPool(
+        pool_name=f"edumate_shard_{index}",
+        pool_size=SHARD_POOL_SIZE,
+        pool_reset_session=True,
+        host=host,
+        port=int(port or 3306),
+        user=user,
+        password=password,
+        database=database or os.environ.get("MYSQL_DB", "edumate"),
+        auth_plugin="mysql_native_password"
+    )
+
+
+class ShardRouter:
+    """Maps user ids to shard pools through the user_shards directory"""
+
+    def __init__(self, specs: List[str], backend: str, user: str = "", password: str = ""):
+        self.specs = specs
+        if backend == "sqlite":
+            self.pools = [SQLitePool(path) for path in specs]
+        else:
+            self.pools = [_mysql_pool(i, spec, user, password) for i, spec in enumerate(specs)]
+        self.directory = TTLCache(maxsize=100_000, ttl=DIRECTORY_TTL)
+        logger.info("Shard router initialized with %d shards", len(self.pools))
+
+    def __len__(self) -> int:
+        return len(self.pools)
+
+    def home_shard(self, user_id: int) -> int:
+        """Shard a new user is placed on"""
+        return user_id % len(self.pools)
+
+    def lookup(self, global_conn, user_id: int) -> Optional[int]:
+        """Directory lookup (cached); None means the user's rows are on the global database"""
+        cached = self.directory.get(user_id)
+        if cached is not None:
+            return cached[0]
+        cur = global_conn.cursor()
+        try:
+            cur.execute("SELECT shard FROM user_shards WHERE user_id = %s", (user_id,))
+            row = cur.fetchone()
+        finally:
+            cur.close()
+        shard = row[0] if row else None
+        # Wrapped so "on the global database" (None) is cached as well
+        self.directory.set(user_id, (shard,))
+        return shard
+
+    def forget(self, user_id: int):
+        self.directory.pop(user_id)
+
+    def connection(self, shard: int):
+        return self.pools[shard].get_connection()
+
+
+def fan_out(acquirers: List[Callable], fn: Callable) -> list:
+    """
+    Run fn(conn) once per database in parallel, each on its own borrowed
+    connection; returns the results in the order of `acquirers`.
+    """
+    def run(acquire):
+        conn = acquire()
+        try:
+            return fn(conn)
+        finally:
+            conn.close()
+
+    if len(acquirers) == 1:
+        return [run(acquirers[0])]
+    with ThreadPoolExecutor(max_workers=len(acquirers), thread_name_prefix="shard-fanout") as pool:
+        return list(pool.map(run, acquirers))
@@ -0,0 +1,303 @@
+"""
+SQLite storage backend for db.py (DB_BACKEND=sqlite).
+
+Lets single-node and test deployments run without a MySQL server. The
+connection wrapper implements the part of the mysql-connector API the app
+uses (`cursor(dictionary=True)`, `%s` placeholders, lastrowid/rowcount,
+commit/rollback, mysql.connector error classes) and rewrites the MySQL-only
+SQL found in the codebase:
+
+    %s                              -> ?
+    INSERT IGNORE                   -> INSERT OR IGNORE
+    ON DUPLICATE KEY UPDATE c = VALUES(c)
+                                    -> ON CONFLICT DO UPDATE SET c = excluded.c
+    NOW(), DEFAULT CURRENT_TIMESTAMP -> local time (MySQL's session time zone)
+    TIMESTAMPDIFF(SECOND, a, b)     -> julianday arithmetic
+    UPDATE/DELETE ... LIMIT n       -> rowid IN (SELECT ... LIMIT n)
+    SELECT ... FOR UPDATE           -> SELECT (the write lock serialises writers)
+    CREATE TABLE DDL                -> INTEGER PRIMARY KEY AUTOINCREMENT,
+                                       inline INDEX split into CREATE INDEX,
+                                       VARCHAR compared case-insensitively
+
+Each thread keeps one cached connection in WAL mode, so readers never block
+the writer and pool checkout is free. Nested borrows on one thread share the
+connection; only the outermost close() rolls back unfinished work.
+
+Requires SQLite >= 3.35 (upsert without a conflict target, UPDATE ... FROM).
+"""
+
+import logging
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from functools import lru_cache
+
+from mysql.connector import errors
+
+logger = logging.getLogger(__name__)
+
+SQLITE_PATH = os.environ.get(
+    "SQLITE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "app.sqlite3")
+)
+BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",     # WAL stays consistent; only the last commits can be lost on power loss
+    "PRAGMA foreign_keys = ON",
+    f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}",
+    "PRAGMA cache_size = -65536",      # 64 MiB page cache per connection
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA mmap_size = 268435456",
+)
+
+LOCAL_NOW = "datetime('now', 'localtime')"
+
+
+# ===== TYPE CONVERSION =====
+# Values come back with the Python types mysql-connector returns (datetime,
+# date, timedelta for TIME) so callers see no difference between backends.
+
+def _to_datetime(raw: bytes):
+    text = raw.decode()
+    try:
+        return datetime.fromisoformat(text).replace(tzinfo=None)
+    except ValueError:
+        return text
+
+
+def _to_date(raw: bytes):
+    text = raw.decode()
+    try:
+        return date.fromisoformat(text[:10])
+    except ValueError:
+        return text
+
+
+def _to_timedelta(raw: bytes):
+    text = raw.decode()
+    try:
+        parsed = time.fromisoformat(text)
+    except ValueError:
+        return text
+    return timedelta(hours=parsed.hour, minutes=parsed.minute, seconds=parsed.second)
+
+
+def _timedelta_text(value: timedelta) -> str:
+    seconds = int(value.total_seconds())
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+sqlite3.register_converter("DATETIME", _to_datetime)
+sqlite3.register_converter("TIMESTAMP", _to_datetime)
+sqlite3.register_converter("DATE", _to_date)
+sqlite3.register_converter("TIME", _to_timedelta)
+sqlite3.register_adapter(datetime, lambda v: v.strftime("%Y-%m-%d %H:%M:%S"))
+sqlite3.register_adapter(date, lambda v: v.isoformat())
+sqlite3.register_adapter(time, lambda v: v.strftime("%H:%M:%S"))
+sqlite3.register_adapter(timedelta, _timedelta_text)
+sqlite3.register_adapter(Decimal, float)
+
+# ISO-8601 strings (e.g. db._now_ist_iso) are stored the way MySQL stores them
+# in a DATETIME column, so text comparison and ordering stay chronological
+_ISO_DATETIME = re.compile(r"^(\d{4}-\d{2}-\d{2})T(\d{2}:\d{2}:\d{2})(\.\d+)?(Z|[+-]\d{2}:\d{2})?$")
+
+
+def _param(value):
+    if isinstance(value, str) and len(value) >= 19 and value[10] == "T":
+        match = _ISO_DATETIME.match(value)
+        if match:
+            return f"{match.group(1)} {match.group(2)}"
+    return value
+
+
+# ===== SQL TRANSLATION =====
+
+_DUPLICATE_KEY = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.I)
+_VALUES_REF = re.compile(r"\bVALUES\((\w+)\)", re.I)
+_TIMESTAMPDIFF = re.compile(r"TIMESTAMPDIFF\(\s*SECOND\s*,\s*([^,()]+?)\s*,\s*([^,()]+?)\s*\)", re.I)
+_LIMITED_WRITE = re.compile(
+    r"^\s*(?P<head>UPDATE\s+(?P<utable>\w+)\s+SET\s.*?|DELETE\s+FROM\s+(?P<dtable>\w+))"
+    r"\s+WHERE\s+(?P<where>.*?)(?P<order>\s+ORDER\s+BY\s.*?)?\s+LIMIT\s+(?P<limit>\S+)\s*$",
+    re.I | re.S,
+)
+_AUTO_PK = re.compile(r"\bINT\s+(?:AUTO_INCREMENT\s+PRIMARY\s+KEY|PRIMARY\s+KEY\s+AUTO_INCREMENT)\b", re.I)
+_INLINE_INDEX = re.compile(r",\s*(?:INDEX|KEY)\s+(\w+)\s*\(([^)]*)\)", re.I)
+_CREATE_TABLE = re.compile(r"^\s*CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)", re.I)
+_VARCHAR = re.compile(r"\bVARCHAR\(\d+\)", re.I)
+
+
+@lru_cache(maxsize=1024)
+def translate(sql: str) -> tuple:
+    """MySQL statement -> tuple of equivalent SQLite statements"""
+    sql = sql.replace("%s", "?").replace("%%", "%")
+
+    if re.match(r"^\s*(CREATE\s+TABLE|ALTER\s+TABLE)", sql, re.I):
+        sql = _AUTO_PK.sub("INTEGER PRIMARY KEY AUTOINCREMENT", sql)
+        sql = re.sub(r"\bDEFAULT\s+CURRENT_TIMESTAMP\b", f"DEFAULT ({LOCAL_NOW})", sql, flags=re.I)
+        sql = _VARCHAR.sub(lambda m: m.group(0) + " COLLATE NOCASE", sql)
+        table = _CREATE_TABLE.match(sql)
+        if table:
+            indexes = _INLINE_INDEX.findall(sql)
+            sql = _INLINE_INDEX.sub("", sql)
+            return (sql,) + tuple(
+                f"CREATE INDEX IF NOT EXISTS {name} ON {table.group(1)} ({columns})" for name, columns in indexes
+            )
+        return (sql,)
+
+    sql = re.sub(r"\bINSERT\s+IGNORE\b", "INSERT OR IGNORE", sql, flags=re.I)
+    sql = re.sub(r"\s+FOR\s+UPDATE\s*$", "", sql, flags=re.I)
+    sql = re.sub(r"\bNOW\(\)", LOCAL_NOW, sql, flags=re.I)
+    sql = _TIMESTAMPDIFF.sub(r"CAST(ROUND((julianday(\2) - julianday(\1)) * 86400) AS INTEGER)", sql)
+
+    upsert = _DUPLICATE_KEY.search(sql)
+    if upsert:
+        tail = _VALUES_REF.sub(r"excluded.\1", sql[upsert.end():])
+        sql = sql[:upsert.start()] + "ON CONFLICT DO UPDATE SET" + tail
+
+    limited = _LIMITED_WRITE.match(sql)
+    if limited:
+        table = limited.group("utable") or limited.group("dtable")
+        sql = (f"{limited.group('head')} WHERE rowid IN (SELECT rowid FROM {table} "
+               f"WHERE {limited.group('where')}{limited.group('order') or ''} LIMIT {limited.group('limit')})")
+    return (sql,)
+
+
+def _mysql_error(e: sqlite3.Error) -> errors.Error:
+    """Re-raise SQLite failures as the mysql.connector classes callers catch"""
+    if isinstance(e, sqlite3.IntegrityError):
+        return errors.IntegrityError(msg=str(e))
+    if isinstance(e, sqlite3.OperationalError):
+        return errors.OperationalError(msg=str(e))
+    if isinstance(e, sqlite3.ProgrammingError):
+        return errors.ProgrammingError(msg=str(e))
+    return errors.DatabaseError(msg=str(e))
+
+
+# ===== CONNECTION WRAPPERS =====
+
+class SQLiteCursor:
+    """mysql-connector style cursor over a sqlite3 cursor"""
+
+    dialect = "sqlite"
+
+    def __init__(self, conn: sqlite3.Connection, dictionary: bool = False):
+        self._cursor = conn.cursor()
+        self._dictionary = dictionary
+
+    def execute(self, operation: str, params=()):
+        params = tuple(_param(v) for v in params) if params else ()
+        statement, *extra = translate(operation)
+        try:
+            self._cursor.execute(statement, params)
+            for index_ddl in extra:
+                self._cursor.execute(index_ddl)
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+
+    def executemany(self, operation: str, seq_params):
+        statements = translate(operation)
+        try:
+            self._cursor.executemany(statements[0], [tuple(_param(v) for v in p) for p in seq_params])
+        except sqlite3.Error as e:
+            raise _mysql_error(e) from e
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return dict(zip(self.column_names, row))
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size: int = 1):
+        return [self._row(r) for r in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        if not self._dictionary:
+            return rows
+        names = self.column_names
+        return [dict(zip(names, r)) for r in rows]
+
+    @property
+    def column_names(self):
+        return tuple(d[0] for d in self._cursor.description or ())
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def close(self):
+        self._cursor.close()
+
+    def __iter__(self):
+        return (self._row(r) for r in self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SQLiteConnection:
+    """Thread-cached connection; close() hands it back like a pooled one"""
+
+    dialect = "sqlite"
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+        self._borrowers = 0
+
+    def cursor(self, dictionary: bool = False, **kwargs) -> SQLiteCursor:
+        return SQLiteCursor(self._conn, dictionary)
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def is_connected(self) -> bool:
+        return True
+
+    def close(self):
+        self._borrowers = max(0, self._borrowers - 1)
+        if self._borrowers == 0 and self._conn.in_transaction:
+            # Same as pool_reset_session: nothing uncommitted leaks to the next borrower
+            self._conn.rollback()
+
+
+class SQLitePool:
+    """Stand-in for MySQLConnectionPool: one cached connection per thread"""
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        self._local = threading.local()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, detect_types=sqlite3.PARSE_DECLTYPES)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def get_connection(self) -> SQLiteConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = SQLiteConnection(self._connect())
+        conn._borrowers += 1
+        return conn
@@ -5,17 +5,43 @@ Cron jobs for automated AI Agent cycles
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from ai_agent.service import AIAgentService
-from db import get_db_connection
+from calendar_app.oauth_state import purge_expired_states
+from calendar_app.sync import sync_all_calendars
+from chat.youtube import purge_youtube_cache
+from concurrent.futures import ThreadPoolExecutor
+from db import get_db_connection, shard_for
+import functools
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
-def start_agent_cron_job():
+CALENDAR_SYNC_INTERVAL_MINUTES = int(os.environ.get('CALENDAR_SYNC_INTERVAL_MINUTES', 15))
+
+def start_agent_cron_job(app=None):
     """Run AI agent cycle for all active users daily at 2 AM"""
     scheduler = BackgroundScheduler()
     
+    def in_app_context(job):
+        # Jobs use get_db_connection(), which lives on flask.g
+        if app is None:
+            return job
+        @functools.wraps(job)
+        def wrapper(*args, **kwargs):
+            with app.app_context():
+                return job(*args, **kwargs)
+        return wrapper
+    
+    def run_agent_cycles(user_ids):
+        for user_id in user_ids:
+            try:
+                AIAgentService.run_agent_cycle(user_id)
+                logger.debug("Agent cycle completed for user %s", user_id)
+            except Exception as e:
+                logger.error("Agent cycle failed for user %s: %s", user_id, e)
+    
     def run_daily_agent_cycles():
-        print('\n[⏰ Cron] ========== STARTING DAILY AI AGENT RUN ==========')
+        logger.info('Starting daily AI agent run')
         try:
             conn = get_db_connection()
             cur = conn.cursor(dictionary=True)
@@ -23,21 +49,50 @@ def start_agent_cron_job():
             users = cur.fetchall()
             cur.close()
             
-            print(f"[⏰ Cron] Processing {len(users)} active users...")
+            logger.info("Processing %d active users", len(users))
             
+            # One worker per database (global + each shard) the users live on
+            groups = {}
             for user in users:
-                try:
-                    AIAgentService.run_agent_cycle(user['id'])
-                    print(f"[⏰ Cron] ✅ Completed for user {user['id']}")
-                except Exception as e:
-                    print(f"[⏰ Cron] ❌ Error for user {user['id']}: {str(e)}")
+                groups.setdefault(shard_for(user['id']), []).append(user['id'])
+            with ThreadPoolExecutor(max_workers=max(len(groups), 1), thread_name_prefix="agent-cycle") as pool:
+                list(pool.map(in_app_context(run_agent_cycles), groups.values()))
             
-            print('[⏰ Cron] ========== DAILY RUN COMPLETE ==========\n')
+            logger.info('Daily AI agent run complete')
             
-        except Exception as e:
-            print(f"[⏰ Cron] Fatal error: {str(e)}")
+        except Exception:
+            logger.exception("Daily AI agent run failed")
+    
+    def compact_scheduled_tests():
+        try:
+            AIAgentService.compact_scheduled_tests()
+        except Exception:
+            logger.exception("Scheduled-test compaction failed")
+    
+    def sync_calendars():
+        try:
+            summary = sync_all_calendars()
+            logger.info("Calendar sync: %d users, %d failed", summary['users'], summary['failed'])
+        except Exception:
+            logger.exception("Calendar sync failed")
+    
+    def sweep_oauth_states():
+        try:
+            purge_expired_states()
+        except Exception:
+            logger.exception("OAuth state sweep failed")
+    
+    def purge_search_cache():
+        try:
+            purge_youtube_cache()
+        except Exception:
+            logger.exception("YouTube cache purge failed")
     
-    # Schedule to run at 2 AM daily
-    scheduler.add_job(run_daily_agent_cycles, 'cron', hour=2, minute=0)
+    # Schedule to run at 2 AM daily; compaction follows at 3 AM
+    scheduler.add_job(in_app_context(run_daily_agent_cycles), 'cron', hour=2, minute=0)
+    scheduler.add_job(in_app_context(compact_scheduled_tests), 'cron', hour=3, minute=0)
+    scheduler.add_job(in_app_context(sync_calendars), 'interval', minutes=CALENDAR_SYNC_INTERVAL_MINUTES)
+    scheduler.add_job(sweep_oauth_states, 'interval', hours=1)
+    scheduler.add_job(purge_search_cache, 'cron', hour=3, minute=30)
     scheduler.start()
-    print('[⏰ Cron] Agent cron job scheduled for 2 AM daily')
+    logger.info('Agent cron job scheduled for 2 AM daily')
@@ -0,0 +1,82 @@
+"""
+Latency-injecting stand-ins for the Gemini and Groq SDK clients.
+
+They answer with payloads shaped like the real ones for each caller (MCQ
+JSON for quiz upload, a study plan for the AI agent, free text otherwise)
+after sleeping for a latency drawn around the configured mean, so routes
+spend realistic wall time waiting on "the model" without any network.
+"""
+
+import json
+import random
+import re
+import time
+from types import SimpleNamespace
+
+
+def _sleep(mean_ms: float):
+    if mean_ms > 0:
+        time.sleep(max(0.0, random.gauss(mean_ms, mean_ms * 0.25)) / 1000)
+
+
+class LatencyGroq:
+    """chat.completions.create(...) with injected latency"""
+
+    def __init__(self, latency_ms: float):
+        self.latency_ms = latency_ms
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        _sleep(self.latency_ms)
+        question = kwargs.get("messages", [{}])[-1].get("content", "")[:60]
+        content = f"Here is a step-by-step explanation of: {question}"
+        if kwargs.get("stream"):
+            return iter([SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=w + " "))])
+                         for w in content.split()])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class LatencyGemini:
+    """models.generate_content(...) with injected latency"""
+
+    def __init__(self, latency_ms: float):
+        self.latency_ms = latency_ms
+        self.models = SimpleNamespace(generate_content=self._generate)
+
+    def _generate(self, model=None, contents="", config=None, **kwargs):
+        _sleep(self.latency_ms)
+        config = config or {}
+        prompt = contents if isinstance(contents, str) else str(contents)
+        if "response_schema" in config:
+            match = re.search(r"exactly (\d+)", prompt)
+            text = json.dumps(_mcqs(int(match.group(1)) if match else 5))
+        elif config.get("response_mime_type") == "application/json":
+            text = json.dumps({
+                "priority_topics": [],
+                "reinforcement_topics": [],
+                "overall_feedback": "Keep practising the weakest topics first.",
+            })
+        else:
+            text = "The solution handles the examples; consider edge cases such as empty input."
+        return SimpleNamespace(text=text)
+
+
+def _mcqs(n: int):
+    return [{
+        "question": f"Sample question {i + 1}?",
+        "options": ["Alpha", "Beta", "Gamma", "Delta"],
+        "answer": "ABCD"[i % 4],
+        "explanation": "Because of the definition in the notes.",
+        "difficulty": "medium",
+        "topic": "Databases",
+        "question_type": "conceptual",
+    } for i in range(n)]
+
+
+def install_llm_fakes(latency_ms: float):
+    """Point utils.clients at the fakes (instrumented like the real clients)"""
+    from observability import instrument_client
+    from utils import clients
+
+    clients._gemini_client = instrument_client(LatencyGemini(latency_ms), "gemini")
+    clients._groq_client = instrument_client(LatencyGroq(latency_ms), "groq")
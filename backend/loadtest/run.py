@@ -0,0 +1,242 @@
+"""
+End-to-end load test: boots app.py in-process on a local port, with
+
+  - MySQL from the usual MYSQL_* env vars (use a scratch database; users
+    named loadtest_* are created in it), or with --db sqlite a fresh SQLite
+    file (DB_BACKEND=sqlite) so no database server is needed,
+  - Gemini and Groq replaced by latency-injecting fakes (loadtest.fakes),
+  - Google Calendar and YouTube pointed at a local stub (loadtest.stub_server),
+
+then replays a weighted mix of user journeys from closed-loop workers and
+reports p50/p95/p99 latency and throughput per endpoint.
+
+Usage (from backend/):
+    python -m loadtest.run [--db mysql|sqlite] [--duration 60] [--concurrency 16] [--users 32]
+                           [--mix chat=50,dashboard=50] [--llm-latency-ms 600]
+                           [--stub-latency-ms 40] [--json report.json]
+                           [--baseline baseline.json --max-regression 0.15]
+
+With --baseline the exit status is 1 when any endpoint's p95 or p99 grew by
+more than --max-regression (ignoring changes under --noise-ms), or its error
+rate grew by more than a percentage point: usable as a CI gate.
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from loadtest.scenarios import DEFAULT_MIX, SCENARIOS, parse_mix
+from loadtest.stub_server import start_stub_server
+
+
+def percentile(sorted_values, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, label: str, seconds: float, ok: bool):
+        with self._lock:
+            self.latencies[label].append(seconds)
+            if not ok:
+                self.errors[label] += 1
+
+
+class Client:
+    """Per-worker HTTP client that times every call"""
+
+    def __init__(self, base_url: str, recorder: Recorder, user: dict):
+        import requests
+        self.session = requests.Session()
+        self.base_url = base_url
+        self.recorder = recorder
+        self.user = user
+
+    def call(self, label, method, path, auth=False, **kwargs):
+        headers = kwargs.pop("headers", {})
+        if auth:
+            headers["Authorization"] = f"Bearer {self.user['token']}"
+        start = time.perf_counter()
+        try:
+            resp = self.session.request(method, self.base_url + path, headers=headers, timeout=60, **kwargs)
+        except Exception:
+            self.recorder.record(label, time.perf_counter() - start, False)
+            return None
+        self.recorder.record(label, time.perf_counter() - start, resp.status_code < 500)
+        return resp
+
+
+def boot_app(args):
+    """Start stubs, point the app at them, and serve it on a background thread"""
+    stub = start_stub_server(latency_ms=args.stub_latency_ms)
+    stub_root = f"http://127.0.0.1:{stub.server_port}"
+    os.environ["CALENDAR_API_ROOT"] = stub_root + "/"
+    os.environ["YOUTUBE_API_URL"] = stub_root + "/youtube/v3/search"
+    os.environ.setdefault("YOUTUBE_API_KEY", "loadtest")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("PROFILE_SAMPLE_RATE", "0")
+    # db.py reads the backend at import time
+    os.environ["DB_BACKEND"] = args.db
+    if args.db == "sqlite":
+        os.environ.setdefault("SQLITE_PATH", os.path.join(tempfile.mkdtemp(prefix="loadtest_"), "app.sqlite3"))
+
+    from werkzeug.serving import make_server
+    import app as app_module
+    from loadtest.fakes import install_llm_fakes
+
+    install_llm_fakes(args.llm_latency_ms)
+    # werkzeug would otherwise log every request at INFO
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", args.port, app_module.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="loadtest-app", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server, stub
+
+
+def seed_users(base_url: str, count: int) -> list:
+    import requests
+    run_id = uuid.uuid4().hex[:8]
+    users = []
+    for i in range(count):
+        username = f"loadtest_{run_id}_{i}"
+        password = "loadtest-password"
+        resp = requests.post(f"{base_url}/auth/signup", timeout=30,
+                             json={"username": username, "password": password, "email": f"{username}@example.invalid"})
+        resp.raise_for_status()
+        body = resp.json()
+        users.append({"id": body["user"]["id"], "username": username, "password": password, "token": body["token"]})
+    return users
+
+
+def run_load(base_url: str, users: list, mix: dict, duration: float, concurrency: int) -> tuple:
+    recorder = Recorder()
+    names, weights = list(mix), list(mix.values())
+    deadline = time.perf_counter() + duration
+
+    def worker(index: int):
+        user = users[index % len(users)]
+        client = Client(base_url, recorder, user)
+        rnd = random.Random(index)
+        while time.perf_counter() < deadline:
+            scenario = SCENARIOS[rnd.choices(names, weights)[0]]
+            scenario(client, user)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return recorder, time.perf_counter() - start
+
+
+def build_report(recorder: Recorder, elapsed: float, args) -> dict:
+    endpoints = {}
+    for label, values in sorted(recorder.latencies.items()):
+        values = sorted(values)
+        endpoints[label] = {
+            "count": len(values),
+            "errors": recorder.errors[label],
+            "error_rate": recorder.errors[label] / len(values),
+            "rps": len(values) / elapsed,
+            "p50_ms": percentile(values, 50) * 1000,
+            "p95_ms": percentile(values, 95) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+        }
+    total = sum(e["count"] for e in endpoints.values())
+    return {
+        "config": {
+            "db": args.db, "duration": args.duration, "concurrency": args.concurrency, "users": args.users,
+            "llm_latency_ms": args.llm_latency_ms, "stub_latency_ms": args.stub_latency_ms,
+        },
+        "elapsed_s": elapsed,
+        "total_requests": total,
+        "throughput_rps": total / elapsed if elapsed else 0.0,
+        "endpoints": endpoints,
+    }
+
+
+def print_report(report: dict, out=sys.stdout):
+    print(f"{'endpoint':<32}{'count':>8}{'err':>6}{'rps':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}", file=out)
+    for label, e in report["endpoints"].items():
+        print(f"{label:<32}{e['count']:>8}{e['errors']:>6}{e['rps']:>8.1f}"
+              f"{e['p50_ms']:>9.1f}{e['p95_ms']:>9.1f}{e['p99_ms']:>9.1f}", file=out)
+    print(f"\n{report['total_requests']} requests in {report['elapsed_s']:.1f}s "
+          f"({report['throughput_rps']:.1f} req/s)", file=out)
+
+
+def compare_to_baseline(report: dict, baseline: dict, max_regression: float, noise_ms: float) -> list:
+    """Regressions as human-readable strings; empty when the run is within budget"""
+    problems = []
+    for label, base in baseline.get("endpoints", {}).items():
+        current = report["endpoints"].get(label)
+        if current is None or current["count"] < 20 or base["count"] < 20:
+            continue
+        for key in ("p95_ms", "p99_ms"):
+            limit = base[key] * (1 + max_regression)
+            if current[key] > limit and current[key] - base[key] > noise_ms:
+                problems.append(f"{label} {key}: {base[key]:.1f} -> {current[key]:.1f}")
+        if current["error_rate"] > base["error_rate"] + 0.01:
+            problems.append(f"{label} error rate: {base['error_rate']:.2%} -> {current['error_rate']:.2%}")
+    return problems
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", choices=("mysql", "sqlite"), default="mysql")
+    parser.add_argument("--duration", type=float, default=60)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--users", type=int, default=32)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX)
+    parser.add_argument("--llm-latency-ms", type=float, default=600)
+    parser.add_argument("--stub-latency-ms", type=float, default=40)
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--json", help="write the report as JSON to this path")
+    parser.add_argument("--baseline", help="report JSON from a previous run to gate against")
+    parser.add_argument("--max-regression", type=float, default=0.15)
+    parser.add_argument("--noise-ms", type=float, default=5.0)
+    args = parser.parse_args(argv)
+
+    base_url, server, stub = boot_app(args)
+    try:
+        users = seed_users(base_url, args.users)
+        recorder, elapsed = run_load(base_url, users, args.mix, args.duration, args.concurrency)
+    finally:
+        server.shutdown()
+        stub.shutdown()
+
+    report = build_report(recorder, elapsed, args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare_to_baseline(report, json.load(f), args.max_regression, args.noise_ms)
+        if problems:
+            print("\nRegressions against baseline:")
+            for problem in problems:
+                print(f"  {problem}")
+            return 1
+        print("\nWithin baseline budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
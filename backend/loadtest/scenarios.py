@@ -0,0 +1,116 @@
+"""
+User journeys replayed by the load test.
+
+Each scenario is a function (client, user) -> None that makes one or more
+HTTP calls through `client.call(label, method, path, ...)`, which records the
+latency of each call under its label. DEFAULT_MIX weights the scenarios
+roughly like production traffic: mostly chat and dashboard reads.
+"""
+
+import random
+
+NOTES = (
+    "Normalisation organises relational tables to reduce redundancy. First normal form "
+    "requires atomic values; second normal form removes partial dependencies on a composite "
+    "key; third normal form removes transitive dependencies. BCNF tightens 3NF so every "
+    "determinant is a candidate key. Denormalisation trades redundancy for read speed."
+)
+
+TOPICS = ["Databases", "Operating Systems", "Networks", "Algorithms", "Compilers", "Maths"]
+
+TWO_SUM = """def twoSum(nums, target):
+    seen = {}
+    for i, n in enumerate(nums):
+        if target - n in seen:
+            return [seen[target - n], i]
+        seen[n] = i
+"""
+
+
+def login(client, user):
+    client.call("POST /auth/login", "POST", "/auth/login",
+                json={"username": user["username"], "password": user["password"]})
+
+
+def chat(client, user):
+    body = {"message": random.choice(["Explain 3NF", "What is a deadlock?", "Dijkstra vs BFS?"])}
+    if user.get("session_id"):
+        body["session_id"] = user["session_id"]
+    resp = client.call("POST /chat", "POST", "/chat", json=body, auth=True)
+    if resp is not None and resp.ok:
+        user["session_id"] = resp.json().get("session_id")
+        client.call("GET /chat/history", "GET", "/chat/history",
+                    params={"session_id": user["session_id"]}, auth=True)
+
+
+def youtube(client, user):
+    client.call("POST /chat/youtube/search", "POST", "/chat/youtube/search",
+                json={"query": f"{random.choice(TOPICS)} lecture", "maxResults": 2})
+
+
+def quiz_upload(client, user):
+    client.call("POST /quiz/upload", "POST", "/quiz/upload",
+                files={"file": ("notes.txt", NOTES.encode(), "text/plain")},
+                data={"numq": "5", "difficulty": "mixed"})
+
+
+def quiz_save(client, user):
+    total = 5
+    score = random.randint(0, total)
+    qnas = [{"question": f"Q{i}", "correct_answer": "A", "user_answer": "A" if i < score else "B",
+             "is_correct": i < score, "explanation": ""} for i in range(total)]
+    client.call("POST /quiz/save-result", "POST", "/quiz/save-result", auth=True, json={
+        "score": score, "total_questions": total, "topic": random.choice(TOPICS),
+        "difficulty": "mixed", "time_taken": random.randint(60, 600), "qnas": qnas,
+    })
+
+
+def dashboard(client, user):
+    client.call("GET /study/progress/<id>", "GET", f"/study/progress/{user['id']}")
+    client.call("GET /study/sessions", "GET", "/study/sessions", params={"userId": user["id"]})
+    client.call("GET /quiz/stats", "GET", "/quiz/stats", auth=True)
+    client.call("GET /chat/sessions", "GET", "/chat/sessions", auth=True)
+
+
+def analysis(client, user):
+    client.call("GET /ai-agent/analysis", "GET", "/ai-agent/analysis", auth=True)
+
+
+def coding_run(client, user):
+    client.call("POST /coding-assistant/run", "POST", "/coding-assistant/run", json={
+        "code": TWO_SUM, "language": "python", "problemId": "two-sum", "userId": user["id"],
+    })
+
+
+SCENARIOS = {
+    "login": login,
+    "chat": chat,
+    "youtube": youtube,
+    "quiz_upload": quiz_upload,
+    "quiz_save": quiz_save,
+    "dashboard": dashboard,
+    "analysis": analysis,
+    "coding_run": coding_run,
+}
+
+DEFAULT_MIX = {
+    "login": 5,
+    "chat": 25,
+    "youtube": 5,
+    "quiz_upload": 5,
+    "quiz_save": 15,
+    "dashboard": 30,
+    "analysis": 5,
+    "coding_run": 10,
+}
+
+
+def parse_mix(spec: str) -> dict:
+    """'chat=50,dashboard=50' -> {'chat': 50, 'dashboard': 50}"""
+    mix = {}
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        name, _, weight = item.partition("=")
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario: {name}")
+        mix[name] = float(weight or 1)
+    return mix
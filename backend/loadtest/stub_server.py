@@ -0,0 +1,116 @@
+"""
+Local HTTP stand-in for the Google Calendar and YouTube Data APIs.
+
+The app is pointed at it with CALENDAR_API_ROOT and YOUTUBE_API_URL, so the
+real client code paths (discovery-built Calendar service, batch requests,
+pooled YouTube session) run unchanged against a server that answers after
+an injected delay.
+"""
+
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+
+def _event_from(body: str, event_id: str = None) -> dict:
+    try:
+        event = json.loads(body) if body else {}
+    except ValueError:
+        event = {}
+    event.setdefault("id", event_id or uuid.uuid4().hex)
+    event.setdefault("status", "confirmed")
+    return event
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _body(self) -> str:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length).decode("utf-8") if length else ""
+
+    def _send(self, status: int, payload=None, content_type="application/json"):
+        data = b"" if payload is None else (payload if isinstance(payload, bytes) else json.dumps(payload).encode())
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _delay(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def do_GET(self):
+        self._delay()
+        path = urlparse(self.path).path
+        if path.endswith("/youtube/v3/search"):
+            items = [{
+                "id": {"videoId": uuid.uuid4().hex[:11]},
+                "snippet": {"title": f"Lecture {i + 1}", "description": "", "channelTitle": "EduMate",
+                            "thumbnails": {"high": {"url": "https://example.invalid/t.jpg"}}},
+            } for i in range(2)]
+            return self._send(200, {"items": items})
+        if path.endswith("/events"):
+            return self._send(200, {"items": [], "nextSyncToken": uuid.uuid4().hex})
+        if "/events/" in path:
+            return self._send(200, _event_from("", path.rsplit("/", 1)[-1]))
+        self._send(404, {"error": {"code": 404, "message": "not found"}})
+
+    def do_POST(self):
+        self._delay()
+        body = self._body()
+        path = urlparse(self.path).path
+        if path.startswith("/batch"):
+            return self._batch(body)
+        if path.endswith("/events"):
+            return self._send(200, _event_from(body))
+        self._send(404, {"error": {"code": 404, "message": "not found"}})
+
+    def do_PATCH(self):
+        self._delay()
+        event_id = urlparse(self.path).path.rsplit("/", 1)[-1]
+        self._send(200, _event_from(self._body(), event_id))
+
+    do_PUT = do_PATCH
+
+    def do_DELETE(self):
+        self._delay()
+        self._send(204)
+
+    def _batch(self, body: str):
+        boundary = "stub_batch"
+        parts = []
+        for part in re.split(r"--[^\r\n]+\r?\n", body):
+            content_id = re.search(r"Content-ID: <([^>]+)>", part)
+            if not content_id:
+                continue
+            request_line = re.search(r"^(GET|POST|PATCH|PUT|DELETE) (\S+)", part, re.M)
+            inner_body = part.split("\r\n\r\n", 2)[-1].strip() if "{" in part else ""
+            event_id = None
+            if request_line and request_line.group(1) != "POST":
+                event_id = request_line.group(2).split("?")[0].rsplit("/", 1)[-1]
+            event = json.dumps(_event_from(inner_body[inner_body.find("{"):] if "{" in inner_body else "", event_id))
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id.group(1)}>\r\n\r\n"
+                f"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n{event}\r\n"
+            )
+        payload = ("".join(parts) + f"--{boundary}--\r\n").encode()
+        self._send(200, payload, content_type=f"multipart/mixed; boundary={boundary}")
+
+
+def start_stub_server(port: int = 0, latency_ms: float = 0) -> ThreadingHTTPServer:
+    """Start the stub on a background thread; returns the server (server.server_port)"""
+    handler = type("Handler", (StubHandler,), {"latency": latency_ms / 1000})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="loadtest-stub", daemon=True).start()
+    return server
@@ -0,0 +1,428 @@
+"""
+Versioned schema migrations for the EduMate database (MySQL, or SQLite
+with DB_BACKEND=sqlite; SQLite cursors carry `dialect = "sqlite"` and the
+few steps MySQL and SQLite cannot share branch on `_is_sqlite`).
+
+`db._ensure_tables` creates the baseline tables; every change after that
+baseline is a numbered migration registered here. Applied versions are
+recorded in `schema_migrations` so each step runs exactly once per database.
+
+Usage:
+    python migrations.py migrate  # one-shot schema bootstrap (run once per deploy)
+    python migrations.py status   # show applied / pending migrations
+    python migrations.py check    # EXPLAIN the hot queries, fail if an index is unused
+"""
+
+import logging
+import re
+import sys
+from collections import namedtuple
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+Migration = namedtuple("Migration", ["version", "description", "apply"])
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version: int, description: str):
+    """Register a migration step; steps run in ascending version order"""
+    def decorator(fn: Callable):
+        MIGRATIONS.append(Migration(version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return fn
+    return decorator
+
+
+# ===== INTROSPECTION HELPERS =====
+
+def _is_sqlite(cur) -> bool:
+    return getattr(cur, "dialect", "mysql") == "sqlite"
+
+
+def _column_exists(cur, table: str, column: str) -> bool:
+    if _is_sqlite(cur):
+        cur.execute("SELECT COUNT(*) FROM pragma_table_info(%s) WHERE name = %s", (table, column))
+        return cur.fetchone()[0] > 0
+    cur.execute("""
+    SELECT COUNT(*) FROM information_schema.COLUMNS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s
+    """, (table, column))
+    return cur.fetchone()[0] > 0
+
+
+def _index_exists(cur, table: str, index: str) -> bool:
+    if _is_sqlite(cur):
+        cur.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' AND tbl_name = %s AND name = %s",
+                    (table, index))
+        return cur.fetchone()[0] > 0
+    cur.execute("""
+    SELECT COUNT(*) FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+    """, (table, index))
+    return cur.fetchone()[0] > 0
+
+
+def _create_index(cur, table: str, index: str, columns: str):
+    if not _index_exists(cur, table, index):
+        cur.execute(f"CREATE INDEX {index} ON {table} ({columns})")
+
+
+# ===== MIGRATIONS =====
+
+@migration(1, "Allow NULL user_id on chat sessions for anonymous users")
+def _allow_anonymous_sessions(cur):
+    if _is_sqlite(cur):
+        return  # SQLite schemas start from the current baseline, where user_id is already nullable
+    cur.execute("ALTER TABLE sessions MODIFY COLUMN user_id INT NULL")
+
+
+@migration(2, "Link study sessions to Google Calendar events")
+def _add_study_calendar_event_id(cur):
+    if not _column_exists(cur, "study_sessions", "calendar_event_id"):
+        cur.execute("ALTER TABLE study_sessions ADD COLUMN calendar_event_id VARCHAR(255) DEFAULT NULL")
+
+
+@migration(3, "Composite indexes for hot per-user query paths")
+def _add_hot_path_indexes(cur):
+    _create_index(cur, "quiz_attempts", "idx_quiz_attempts_user_taken", "user_id, taken_at")
+    _create_index(cur, "quiz_attempts", "idx_quiz_attempts_user_topic", "user_id, topic, taken_at")
+    _create_index(cur, "chats", "idx_chats_session_created", "session_id, created_at")
+    _create_index(cur, "chats", "idx_chats_user_created", "user_id, created_at")
+    _create_index(cur, "sessions", "idx_sessions_user_created", "user_id, created_at")
+    _create_index(cur, "study_sessions", "idx_study_sessions_user_date", "user_id, date, time")
+    _create_index(cur, "coding_attempts", "idx_coding_attempts_user_created", "user_id, created_at")
+
+
+@migration(4, "Denormalise message_count and last_message_at onto chat sessions")
+def _add_session_message_counters(cur):
+    if not _column_exists(cur, "sessions", "message_count"):
+        cur.execute("ALTER TABLE sessions ADD COLUMN message_count INT NOT NULL DEFAULT 0")
+    if not _column_exists(cur, "sessions", "last_message_at"):
+        cur.execute("ALTER TABLE sessions ADD COLUMN last_message_at DATETIME NULL")
+    if _is_sqlite(cur):
+        cur.execute("""
+        UPDATE sessions SET message_count = c.n, last_message_at = c.last_at
+        FROM (
+            SELECT session_id, COUNT(*) AS n, MAX(created_at) AS last_at
+            FROM chats WHERE session_id IS NOT NULL GROUP BY session_id
+        ) c WHERE c.session_id = sessions.id
+        """)
+        return
+    cur.execute("""
+    UPDATE sessions s
+    JOIN (
+        SELECT session_id, COUNT(*) AS n, MAX(created_at) AS last_at
+        FROM chats WHERE session_id IS NOT NULL GROUP BY session_id
+    ) c ON c.session_id = s.id
+    SET s.message_count = c.n, s.last_message_at = c.last_at
+    """)
+
+
+@migration(5, "Store Google Calendar event ids on AI-scheduled tests")
+def _add_scheduled_test_event_id(cur):
+    if not _column_exists(cur, "scheduled_tests", "calendar_event_id"):
+        cur.execute("ALTER TABLE scheduled_tests ADD COLUMN calendar_event_id VARCHAR(255) DEFAULT NULL")
+
+
+@migration(6, "At most one pending scheduled test per user and topic")
+def _unique_pending_scheduled_tests(cur):
+    if _is_sqlite(cur):
+        cur.execute("""
+        UPDATE scheduled_tests SET status = 'superseded'
+        FROM (
+            SELECT user_id, topic, MAX(id) AS keep_id FROM scheduled_tests
+            WHERE status = 'pending' GROUP BY user_id, topic HAVING COUNT(*) > 1
+        ) d
+        WHERE scheduled_tests.user_id = d.user_id AND scheduled_tests.topic = d.topic
+          AND scheduled_tests.status = 'pending' AND scheduled_tests.id <> d.keep_id
+        """)
+        # SQLite has partial indexes, so no generated column is needed
+        cur.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_scheduled_tests_pending
+        ON scheduled_tests (user_id, topic) WHERE status = 'pending'
+        """)
+        return
+    # Supersede duplicate pending rows left by earlier agent runs, keeping the newest
+    cur.execute("""
+    UPDATE scheduled_tests t
+    JOIN (
+        SELECT user_id, topic, MAX(id) AS keep_id FROM scheduled_tests
+        WHERE status = 'pending' GROUP BY user_id, topic HAVING COUNT(*) > 1
+    ) d ON t.user_id = d.user_id AND t.topic = d.topic
+    SET t.status = 'superseded'
+    WHERE t.status = 'pending' AND t.id <> d.keep_id
+    """)
+    # MySQL has no partial unique indexes: the generated column is NULL unless
+    # pending, and NULLs never collide
+    if not _column_exists(cur, "scheduled_tests", "pending_topic"):
+        cur.execute("""
+        ALTER TABLE scheduled_tests ADD COLUMN pending_topic VARCHAR(255)
+        GENERATED ALWAYS AS (IF(status = 'pending', topic, NULL)) STORED
+        """)
+    if not _index_exists(cur, "scheduled_tests", "uq_scheduled_tests_pending"):
+        cur.execute("CREATE UNIQUE INDEX uq_scheduled_tests_pending ON scheduled_tests (user_id, pending_topic)")
+
+
+@migration(7, "Per-user Google Calendar incremental sync cursors")
+def _add_calendar_sync_state(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS calendar_sync_state (
+        user_id INT PRIMARY KEY,
+        sync_token VARCHAR(512),
+        last_synced_at DATETIME,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    )
+    """)
+    _create_index(cur, "study_sessions", "idx_study_sessions_user_event", "user_id, calendar_event_id")
+
+
+@migration(8, "Keep the PKCE code verifier with each OAuth state")
+def _add_oauth_code_verifier(cur):
+    if not _column_exists(cur, "oauth_states", "code_verifier"):
+        cur.execute("ALTER TABLE oauth_states ADD COLUMN code_verifier VARCHAR(128) DEFAULT NULL")
+
+
+@migration(9, "Persistent cache tier for YouTube search results")
+def _add_youtube_search_cache(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS youtube_search_cache (
+        cache_key CHAR(64) PRIMARY KEY,
+        query VARCHAR(512) NOT NULL,
+        max_results INT NOT NULL,
+        videos MEDIUMTEXT NOT NULL,
+        fetched_at DATETIME NOT NULL,
+        INDEX idx_youtube_cache_fetched (fetched_at)
+    )
+    """)
+
+
+@migration(10, "User-id shard directory")
+def _add_user_shards(cur):
+    # Read on the global database only; shards get the (empty) table with the rest of the schema
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS user_shards (
+        user_id INT PRIMARY KEY,
+        shard INT NOT NULL,
+        moved_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+        INDEX idx_user_shards_shard (shard)
+    )
+    """)
+
+
+@migration(11, "Per-user, per-topic spaced-repetition review state")
+def _add_review_state(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS review_state (
+        user_id INT NOT NULL,
+        topic VARCHAR(255) NOT NULL,
+        easiness DOUBLE NOT NULL DEFAULT 2.5,
+        repetitions INT NOT NULL DEFAULT 0,
+        interval_days INT NOT NULL DEFAULT 0,
+        due_date DATE NOT NULL,
+        last_grade INT,
+        last_reviewed_at DATETIME,
+        PRIMARY KEY (user_id, topic),
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+        INDEX idx_review_state_user_due (user_id, due_date)
+    )
+    """)
+
+
+@migration(12, "Per-user, per-topic knowledge-tracing mastery state")
+def _add_topic_mastery(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS topic_mastery (
+        user_id INT NOT NULL,
+        topic VARCHAR(255) NOT NULL,
+        attempts INT NOT NULL DEFAULT 0,
+        score_sum DOUBLE NOT NULL DEFAULT 0,
+        decayed_score DOUBLE NOT NULL DEFAULT 0,
+        p_known DOUBLE NOT NULL DEFAULT 0.3,
+        recent_scores VARCHAR(32) NOT NULL DEFAULT '',
+        last_attempted DATETIME,
+        PRIMARY KEY (user_id, topic),
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+    )
+    """)
+
+
+def _rebuild_by_user_range(cur, rebuild, users_per_batch: int = 2000):
+    """Run rebuild(cur, first_user, last_user) over every user id with quiz attempts"""
+    cur.execute("SELECT MIN(user_id), MAX(user_id) FROM quiz_attempts")
+    low, high = cur.fetchone()
+    if low is None:
+        return
+    for first in range(low, high + 1, users_per_batch):
+        rebuild(cur, first, first + users_per_batch - 1)
+
+
+@migration(13, "Backfill topic_mastery from the quiz history")
+def _backfill_topic_mastery(cur):
+    # Same fold as the live update (ai_agent.mastery.replay_history)
+    from ai_agent.mastery import rebuild_mastery
+
+    _rebuild_by_user_range(cur, rebuild_mastery)
+
+
+@migration(14, "Backfill review_state from the quiz history")
+def _backfill_review_state(cur):
+    # Same SM-2 steps as the live update (quiz.spaced_repetition.replay)
+    from quiz.spaced_repetition import rebuild_reviews
+
+    _rebuild_by_user_range(cur, rebuild_reviews)
+
+
+# ===== RUNNER =====
+
+def _ensure_migrations_table(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT PRIMARY KEY,
+        description VARCHAR(255) NOT NULL,
+        applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+
+
+def applied_versions(conn) -> List[int]:
+    """Return the migration versions already recorded in this database"""
+    cur = conn.cursor()
+    _ensure_migrations_table(cur)
+    cur.execute("SELECT version FROM schema_migrations ORDER BY version")
+    versions = [row[0] for row in cur.fetchall()]
+    cur.close()
+    return versions
+
+
+def current_version(conn) -> int:
+    """Highest applied migration version (0 for a fresh database)"""
+    versions = applied_versions(conn)
+    return versions[-1] if versions else 0
+
+
+def apply_migrations(conn) -> List[int]:
+    """Apply every pending migration in order and return the versions applied"""
+    done = set(applied_versions(conn))
+    applied = []
+    cur = conn.cursor()
+    try:
+        for step in MIGRATIONS:
+            if step.version in done:
+                continue
+            logger.info("Applying migration %d: %s", step.version, step.description)
+            step.apply(cur)
+            cur.execute(
+                "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                (step.version, step.description)
+            )
+            conn.commit()
+            applied.append(step.version)
+    finally:
+        cur.close()
+    return applied
+
+
+# ===== HOT QUERY PLAN CHECK =====
+
+# (name, table the index belongs to, expected index, query with sample params)
+HOT_QUERIES = [
+    ("quiz history", "quiz_attempts", "idx_quiz_attempts_user_taken",
+     "SELECT id, topic, percentage, taken_at FROM quiz_attempts WHERE user_id = %s ORDER BY taken_at DESC LIMIT 20",
+     (1,)),
+    ("topic trend", "quiz_attempts", "idx_quiz_attempts_user_topic",
+     "SELECT percentage FROM quiz_attempts WHERE user_id = %s AND topic = %s ORDER BY taken_at DESC LIMIT 5",
+     (1, "General")),
+    ("session transcript", "chats", "idx_chats_session_created",
+     "SELECT id, role, message, created_at FROM chats WHERE session_id = %s ORDER BY created_at ASC LIMIT 50",
+     (1,)),
+    ("user chat history", "chats", "idx_chats_user_created",
+     "SELECT id, role, message, created_at FROM chats WHERE user_id = %s ORDER BY created_at DESC LIMIT 50",
+     (1,)),
+    ("chat session listing", "sessions", "idx_sessions_user_created",
+     "SELECT id, title, created_at FROM sessions WHERE user_id = %s ORDER BY created_at DESC",
+     (1,)),
+    ("study planner", "study_sessions", "idx_study_sessions_user_date",
+     "SELECT id, title, date, time FROM study_sessions WHERE user_id = %s ORDER BY date, time",
+     (1,)),
+    ("coding history", "coding_attempts", "idx_coding_attempts_user_created",
+     "SELECT id, problem_id, created_at FROM coding_attempts WHERE user_id = %s ORDER BY created_at DESC LIMIT 5",
+     (1,)),
+    ("due reviews", "review_state", "idx_review_state_user_due",
+     "SELECT topic, due_date FROM review_state WHERE user_id = %s AND due_date <= %s ORDER BY due_date LIMIT 20",
+     (1, "2025-01-01")),
+]
+
+
+def check_hot_query_plans(conn) -> List[Dict]:
+    """
+    EXPLAIN each hot query and report which index the database picks.
+    Raises AssertionError listing every query that does not use its index.
+    """
+    cur = conn.cursor(dictionary=True)
+    report = []
+    try:
+        for name, table, expected, sql, params in HOT_QUERIES:
+            if _is_sqlite(cur):
+                cur.execute("EXPLAIN QUERY PLAN " + sql, params)
+                details = " ".join(row["detail"] for row in cur.fetchall())
+                match = re.search(rf"\b{table} USING (?:COVERING )?INDEX (\w+)", details)
+                used = match.group(1) if match else None
+            else:
+                cur.execute("EXPLAIN " + sql, params)
+                plan = [row for row in cur.fetchall() if row.get("table") == table]
+                used = plan[0].get("key") if plan else None
+            report.append({
+                "query": name,
+                "table": table,
+                "expected": expected,
+                "used": used,
+                "ok": used == expected,
+            })
+    finally:
+        cur.close()
+
+    failures = [r for r in report if not r["ok"]]
+    if failures:
+        details = ", ".join(f"{r['query']} used {r['used'] or 'no index'} (expected {r['expected']})" for r in failures)
+        raise AssertionError(f"Hot queries not using their indexes: {details}")
+    return report
+
+
+def _main(argv: List[str]) -> int:
+    import db
+
+    command = argv[1] if len(argv) > 1 else "status"
+    if command == "migrate":
+        db.init_db()
+        print("✅ Schema up to date")
+    if db.DB_POOL is None:
+        db.init_db_pool(bootstrap=False)
+    conn = db.DB_POOL.get_connection()
+    try:
+        if command in ("status", "migrate"):
+            done = set(applied_versions(conn))
+            for step in MIGRATIONS:
+                mark = "x" if step.version in done else " "
+                print(f"[{mark}] {step.version:04d} {step.description}")
+            return 0
+        if command == "check":
+            try:
+                report = check_hot_query_plans(conn)
+            except AssertionError as e:
+                print(f"❌ {e}")
+                return 1
+            for r in report:
+                print(f"✅ {r['query']:<22} {r['used']}")
+            return 0
+        print(f"Unknown command: {command} (expected migrate|status|check)")
+        return 2
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="[migrations] %(message)s")
+    sys.exit(_main(sys.argv))
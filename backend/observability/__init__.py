@@ -0,0 +1,12 @@
+from observability.instrument import instrument_client, instrument_connection
+from observability.log import NOISY, configure_logging, init_request_ids
+from observability.middleware import init_observability
+
+__all__ = [
+    "NOISY",
+    "configure_logging",
+    "init_observability",
+    "init_request_ids",
+    "instrument_client",
+    "instrument_connection",
+]
@@ -0,0 +1,159 @@
+"""
+Wrappers that attribute DB and LLM time to the current request.
+
+`instrument_connection` wraps a pooled MySQL connection so every cursor it
+hands out times `execute`/`executemany`; `instrument_client` wraps an LLM
+SDK client so every API call is timed. Both add to the per-request stats on
+`flask.g` (when called inside a request) that the middleware reports.
+"""
+
+import os
+import time
+
+from flask import g, has_request_context
+
+from observability.metrics import LLM_CALLS
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+
+
+class RequestStats:
+    __slots__ = ("start", "db_queries", "db_time", "llm_calls", "llm_time")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.llm_calls = 0
+        self.llm_time = 0.0
+
+
+def current_stats():
+    if has_request_context():
+        return g.get("request_stats")
+    return None
+
+
+class InstrumentedCursor:
+    """Cursor proxy counting statements and DB time for the current request"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def _timed(self, method, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            stats = current_stats()
+            if stats is not None:
+                stats.db_queries += 1
+                stats.db_time += time.perf_counter() - start
+
+    def execute(self, *args, **kwargs):
+        return self._timed(self._cursor.execute, *args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        return self._timed(self._cursor.executemany, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+
+
+class InstrumentedConnection:
+    """Connection proxy whose cursors are InstrumentedCursors"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return InstrumentedCursor(self._conn.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def instrument_connection(conn):
+    return InstrumentedConnection(conn) if METRICS_ENABLED else conn
+
+
+class _TimedStream:
+    """
+    Streamed completion: time spent producing chunks counts as LLM time.
+    Streams usually drain after the response headers are sent, so their time
+    lands in the provider histogram rather than the per-request totals.
+    """
+
+    def __init__(self, stream, provider: str, elapsed: float):
+        self._stream = stream
+        self._provider = provider
+        self._elapsed = elapsed
+
+    def __iter__(self):
+        iterator = iter(self._stream)
+        while True:
+            start = time.perf_counter()
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                self._elapsed += time.perf_counter() - start
+                _record_llm(self._provider, self._elapsed)
+                LLM_CALLS.observe(self._elapsed, self._provider)
+                return
+            self._elapsed += time.perf_counter() - start
+            yield chunk
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def _record_llm(provider: str, elapsed: float):
+    stats = current_stats()
+    if stats is not None:
+        stats.llm_calls += 1
+        stats.llm_time += elapsed
+
+
+class _InstrumentedNamespace:
+    """Proxy over an SDK client; calls anywhere below it are timed"""
+
+    def __init__(self, target, provider: str):
+        self._target = target
+        self._provider = provider
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if callable(attr) and not isinstance(attr, type):
+            return self._wrap(attr)
+        if isinstance(attr, (str, bytes, int, float, bool, type(None))):
+            return attr
+        return _InstrumentedNamespace(attr, self._provider)
+
+    def _wrap(self, method):
+        provider = self._provider
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            result = method(*args, **kwargs)
+            elapsed = time.perf_counter() - start
+            if kwargs.get("stream"):
+                # Recorded once the stream is drained
+                return _TimedStream(result, provider, elapsed)
+            _record_llm(provider, elapsed)
+            LLM_CALLS.observe(elapsed, provider)
+            return result
+
+        return timed
+
+
+def instrument_client(client, provider: str):
+    return _InstrumentedNamespace(client, provider) if METRICS_ENABLED else client
@@ -0,0 +1,141 @@
+"""
+Structured, non-blocking logging.
+
+`configure_logging()` routes every logger through a QueueHandler: the
+calling (request) thread only tags the record and puts it on an in-memory
+queue, and a QueueListener thread formats and writes it to stdout. Records
+carry the request's correlation id (X-Request-ID, or a generated one) and,
+with LOG_FORMAT=json (the default), are emitted one JSON object per line.
+
+Messages logged with `extra=NOISY` are per-request chatter; only a
+LOG_NOISY_SAMPLE_RATE fraction of them (default 1%) is kept.
+
+    LOG_LEVEL              DEBUG/INFO/WARNING/... (default INFO)
+    LOG_FORMAT             json | text (default json)
+    LOG_NOISY_SAMPLE_RATE  0..1 (default 0.01)
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+
+NOISY = {"noisy": True}
+
+# LogRecord attributes that are not user-supplied `extra` fields
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "noisy"}
+
+_listener = None
+_configure_lock = threading.Lock()
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the current request's correlation id (runs on the calling thread)"""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get("request_id", "-")
+        else:
+            record.request_id = "-"
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of records marked NOISY; everything else passes"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if getattr(record, "noisy", False) and record.levelno < logging.WARNING:
+            return random.random() < self.rate
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class _PreformattedQueueHandler(logging.handlers.QueueHandler):
+    """
+    Keep args unformatted on the queue; `prepare` would otherwise format the
+    message on the request thread, which is the work we are moving off it.
+    Records are not shared across processes, so this is safe.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def configure_logging():
+    """Install the queue-based handler on the root logger (idempotent)"""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+
+        if os.environ.get("LOG_FORMAT", "json") == "text":
+            formatter = logging.Formatter("%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s")
+        else:
+            formatter = JSONFormatter()
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(formatter)
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = _PreformattedQueueHandler(log_queue)
+        queue_handler.addFilter(RequestIdFilter())
+        queue_handler.addFilter(SamplingFilter(float(os.environ.get("LOG_NOISY_SAMPLE_RATE", 0.01))))
+
+        root = logging.getLogger()
+        root.handlers = [queue_handler]
+        root.setLevel(os.environ.get("LOG_LEVEL", "INFO").upper())
+
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def init_request_ids(app):
+    """Assign each request a correlation id and echo it as X-Request-ID"""
+
+    @app.before_request
+    def assign_request_id():
+        g.request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+
+    @app.after_request
+    def echo_request_id(response):
+        request_id = g.get("request_id")
+        if request_id:
+            response.headers["X-Request-ID"] = request_id
+        return response
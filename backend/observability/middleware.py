@@ -0,0 +1,72 @@
+"""
+Request profiling middleware and the Prometheus /metrics route.
+
+Per request it records latency, DB statement count and DB time (via the
+instrumented connection from `get_db_connection`), LLM time and response
+bytes, labelled by the matched route rule so label cardinality stays bounded.
+"""
+
+import time
+import logging
+
+from flask import Response, g, request
+
+from observability.instrument import METRICS_ENABLED, RequestStats
+from observability.metrics import (
+    DB_QUERIES,
+    DB_TIME,
+    LLM_TIME,
+    REGISTRY,
+    REQUEST_LATENCY,
+    RESPONSE_BYTES,
+)
+from observability.profiler import should_profile, start_profiler, write_collapsed
+
+logger = logging.getLogger(__name__)
+
+
+def _endpoint() -> str:
+    rule = request.url_rule
+    return rule.rule if rule is not None else "unmatched"
+
+
+def init_observability(app):
+    """Install the middleware and /metrics on the app; call before other before_request hooks"""
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
+    if not METRICS_ENABLED:
+        return
+
+    @app.before_request
+    def start_request_stats():
+        g.request_stats = RequestStats()
+        if should_profile():
+            g.request_profiler = start_profiler()
+
+    @app.after_request
+    def record_request_stats(response):
+        stats = g.get("request_stats")
+        if stats is None or request.path == "/metrics":
+            return response
+        endpoint = _endpoint()
+        REQUEST_LATENCY.observe(time.perf_counter() - stats.start, endpoint, request.method, response.status_code)
+        DB_QUERIES.observe(stats.db_queries, endpoint)
+        DB_TIME.observe(stats.db_time, endpoint)
+        if stats.llm_calls:
+            LLM_TIME.observe(stats.llm_time, endpoint)
+        size = response.calculate_content_length()
+        if size is not None:
+            RESPONSE_BYTES.inc(endpoint, amount=size)
+        return response
+
+    @app.teardown_request
+    def stop_request_profiler(exception):
+        profiler = g.pop("request_profiler", None)
+        if profiler is not None:
+            try:
+                write_collapsed(profiler.stop(), f"{request.method} {_endpoint()}")
+            except OSError as e:
+                logger.warning("Could not write request profile: %s", e)
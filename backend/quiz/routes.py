@@ -1,22 +1,20 @@
 import io
-import os
 import json
 from flask import Blueprint, request, jsonify
-from google import genai
 from utils.pdf import read_pdf
 from utils.text import read_txt, clamp
 from mcq.prompt import MCQ_SCHEMA, build_mcq_prompt
 from mcq.parser import normalize_mcqs
 from dotenv import load_dotenv
-from db import get_db_connection
+from db import fan_out_query, get_db_connection, invalidate_progress, reads, writes
 from auth.routes import decode_auth_token
+from quiz.spaced_repetition import get_due_reviews, record_quiz_review
+from ai_agent.mastery import outcomes_from_score, record_attempt_mastery
+from utils.clients import get_gemini_client
+import logging
 
 load_dotenv()
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise RuntimeError("GEMINI_API_KEY is not set in environment variables")
-
-client = genai.Client(api_key=GEMINI_API_KEY)
+logger = logging.getLogger(__name__)
 quiz_bp = Blueprint("quiz", __name__)
 
 def get_user_from_token():
@@ -33,15 +31,6 @@ def get_user_from_token():
         return dict(user) if user else None
     return None
 
-def schedule_quiz_retake_if_needed(user_id, topic, taken_at, score, total_questions):
-    # Placeholder for a more advanced scheduling logic
-    try:
-        percentage = (score / total_questions) * 100 if total_questions else 0
-        if percentage < 60:
-            print(f"📚 User {user_id} needs retake for {topic} (scored {percentage:.1f}%)")
-    except Exception as e:
-        print(f"Error in retake scheduling: {e}")
-
 @quiz_bp.route("/upload", methods=["POST", "OPTIONS"])
 def upload_and_generate():
     if request.method == "OPTIONS":
@@ -74,7 +63,7 @@ def upload_and_generate():
         difficulty = request.form.get("difficulty", "mixed")
 
         prompt = build_mcq_prompt(text, num_q=num_q, difficulty=difficulty)
-        response = client.models.generate_content(
+        response = get_gemini_client().models.generate_content(
             model="gemini-2.5-flash",
             contents=prompt,
             config={
@@ -89,8 +78,7 @@ def upload_and_generate():
 
         return jsonify({"success": True, "quiz": quiz})
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Quiz generation failed")
         return jsonify({"success": False, "error": str(e)}), 500
 
 @quiz_bp.route("/check", methods=["POST"])
@@ -115,6 +103,7 @@ def check_answer():
         return jsonify({"success": False, "error": str(e)}), 500
 
 @quiz_bp.route("/save-result", methods=["POST"])
+@writes
 def save_quiz_result():
     try:
         user = get_user_from_token()
@@ -139,7 +128,7 @@ def save_quiz_result():
             return jsonify({"success": False, "error": "Missing required quiz result fields"}), 400
 
         percentage = int(round((score / total_questions) * 100))
-        conn = get_db_connection()
+        conn = get_db_connection(user_id)
 
         # Save attempt with authenticated user_id
         cur = conn.cursor()
@@ -151,11 +140,13 @@ def save_quiz_result():
         attempt_id = cur.lastrowid
 
         # Save each quiz answer linked to this attempt
+        outcomes = []
         for qa in qnas:
             question = qa.get('question', '')
             correct_answer = qa.get('correct_answer', '')
             user_answer = qa.get('user_answer', '')
             is_correct = 1 if qa.get('is_correct') else 0
+            outcomes.append(bool(is_correct))
             explanation = qa.get('explanation', '')
             cur.execute("""
                 INSERT INTO quiz_answers
@@ -163,6 +154,7 @@ def save_quiz_result():
                 VALUES (%s, %s, %s, %s, %s, %s, %s)
             """, (attempt_id, username, question, correct_answer, user_answer, is_correct, explanation))
         conn.commit()
+        invalidate_progress(user_id)
 
         # Retrieve taken_at for scheduling quiz retake
         time_cur = conn.cursor(dictionary=True)
@@ -173,17 +165,43 @@ def save_quiz_result():
 
         cur.close()
 
-        if taken_at is not None and user_id:
-            # You may replace this with your actual retake scheduling logic
-            schedule_quiz_retake_if_needed(user_id, topic, taken_at, score, total_questions)
-
-        return jsonify({"success": True, "message": "Quiz result and answers saved successfully", "percentage": percentage})
+        review = None
+        if taken_at is not None:
+            # Spaced-repetition state update (O(1)); a failed topic gets a planner retake.
+            # The attempt is already committed: a failure here must not turn into a
+            # 500 that makes the client save the attempt again.
+            try:
+                review = record_quiz_review(user_id, topic, percentage, taken_at)
+            except Exception:
+                logger.exception("Review update failed for attempt %s", attempt_id)
+            # Knowledge-tracing update (O(answers)) read by the performance analyzer
+            try:
+                record_attempt_mastery(user_id, topic, percentage,
+                                       outcomes or outcomes_from_score(score, total_questions), taken_at)
+            except Exception:
+                logger.exception("Mastery update failed for attempt %s", attempt_id)
+
+        return jsonify({"success": True, "message": "Quiz result and answers saved successfully",
+                        "percentage": percentage, "review": review})
 
     except Exception as e:
-        print(f"Error in save_quiz_result: {str(e)}")
+        logger.exception("Error in save_quiz_result")
         return jsonify({"success": False, "error": str(e)}), 500
 
 
+@quiz_bp.route("/reviews/due", methods=["GET"])
+def due_reviews():
+    user = get_user_from_token()
+    if not user:
+        return jsonify({"success": False, "error": "Authentication required"}), 401
+    try:
+        limit = min(int(request.args.get("limit", 20)), 100)
+        return jsonify({"success": True, "data": get_due_reviews(user["id"], limit=limit)})
+    except Exception as e:
+        logger.exception("Due reviews error")
+        return jsonify({"success": False, "error": "Failed to get due reviews"}), 500
+
+
 @quiz_bp.route("/performance", methods=["GET"])
 def quiz_performance():
     # Accept userId as query param for programmatic fetch; or use JWT for current user
@@ -203,7 +221,7 @@ def quiz_performance():
         username = None
 
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(user_id)
         cur = conn.cursor(dictionary=True)
         # Stats
         cur.execute(
@@ -244,7 +262,7 @@ def quiz_performance():
             "history": history
         })
     except Exception as e:
-        print(f"Quiz performance error: {e}")
+        logger.exception("Quiz performance error")
         return jsonify({"success": False, "error": "Failed to get performance"}), 500
 
 ####################################
@@ -259,7 +277,7 @@ def quiz_history():
 
     try:
         limit = int(request.args.get("limit", 50))
-        conn = get_db_connection()
+        conn = get_db_connection(user["id"])
         cur = conn.cursor(dictionary=True)
         cur.execute("""
             SELECT id, score, total_questions, percentage, topic, difficulty, time_taken, taken_at
@@ -279,7 +297,7 @@ def quiz_history():
             "data": mapped
         })
     except Exception as e:
-        print(f"Quiz history error: {e}")
+        logger.exception("Quiz history error")
         return jsonify({"error": "Failed to get quiz history"}), 500
 
 @quiz_bp.route("/stats", methods=["GET"])
@@ -289,7 +307,7 @@ def quiz_stats():
         return jsonify({"error": "Authentication required"}), 401
 
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(user["id"])
         cur = conn.cursor(dictionary=True)
         cur.execute("""
             SELECT
@@ -321,30 +339,40 @@ def quiz_stats():
             "data": result
         })
     except Exception as e:
-        print(f"Quiz stats error: {e}")
+        logger.exception("Quiz stats error")
         return jsonify({"error": "Failed to get quiz stats"}), 500
 
 @quiz_bp.route("/leaderboard", methods=["GET"])
+@reads
 def get_leaderboard():
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(dictionary=True)
-        cur.execute("""
+        # Each user's attempts live on one database, so every database's top 10
+        # is exact for its users and the global top 10 is among them
+        per_database = fan_out_query("""
             SELECT
                 username,
                 COUNT(*) as total_attempts,
-                ROUND(AVG(percentage), 2) as avg_percentage,
+                SUM(percentage) as total_percentage,
                 MAX(percentage) as best_score
             FROM quiz_attempts
             GROUP BY username
-            ORDER BY avg_percentage DESC, best_score DESC
+            ORDER BY SUM(percentage) / COUNT(*) DESC, best_score DESC
             LIMIT 10
         """)
-        leaderboard = cur.fetchall()
-        cur.close()
-        return jsonify({"success": True, "leaderboard": [dict(user) for user in leaderboard]})
+        merged = {}
+        for row in (r for rows in per_database for r in rows):
+            entry = merged.setdefault(row["username"], {"username": row["username"], "total_attempts": 0,
+                                                         "total_percentage": 0, "best_score": 0})
+            entry["total_attempts"] += int(row["total_attempts"])
+            entry["total_percentage"] += float(row["total_percentage"] or 0)
+            entry["best_score"] = max(entry["best_score"], int(row["best_score"] or 0))
+        for entry in merged.values():
+            entry["avg_percentage"] = round(entry.pop("total_percentage") / entry["total_attempts"], 2)
+        leaderboard = sorted(merged.values(), key=lambda e: (e["avg_percentage"], e["best_score"]),
+                             reverse=True)[:10]
+        return jsonify({"success": True, "leaderboard": leaderboard})
     except Exception as e:
-        print(f"Error in get_leaderboard: {str(e)}")
+        logger.exception("Error in get_leaderboard")
         return jsonify({"success": False, "error": str(e)}), 500
 
 @quiz_bp.route("/test", methods=["GET"])
@@ -358,6 +386,7 @@ def test_route():
             "/quiz/save-result",
             "/quiz/history",
             "/quiz/stats",
-            "/quiz/performance"
+            "/quiz/performance",
+            "/quiz/reviews/due"
         ]
     })
\ No newline at end of file
@@ -0,0 +1,221 @@
+"""
+SM-2 spaced repetition for quiz topics.
+
+Every (user, topic) pair keeps its SM-2 state in `review_state`: easiness
+factor, consecutive passed reviews, current interval and the next due date.
+A saved quiz attempt is one review, graded 0-5 from its percentage.
+`record_quiz_review` advances the state with one primary-key read and one
+upsert, so the cost of scheduling does not grow with attempt history. A
+failed review (below 60%) also moves the topic's pending "Retake Quiz" entry
+in the study planner to the new due date, or adds one.
+
+`replay` recomputes many pairs' states from their full attempt history in a
+single vectorised pass. `rebuild_reviews` applies it to a user-id range:
+migration 14 uses it to backfill existing attempts, and
+tools/recompute_reviews.py to re-derive every state after a parameter change.
+"""
+
+import logging
+from datetime import date, datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional
+
+from db import _now_ist_iso, get_db_connection, invalidate_progress, reads, writes
+
+logger = logging.getLogger(__name__)
+
+INITIAL_EASINESS = 2.5
+MIN_EASINESS = 1.3
+PASSING_GRADE = 3           # lower grades are lapses: the topic starts over at a 1-day interval
+MAX_INTERVAL_DAYS = 365     # coursework topics come back at least once a year
+RETAKE_DURATION_MINUTES = 60
+
+
+class ReviewState(NamedTuple):
+    easiness: float
+    repetitions: int
+    interval_days: int
+
+
+NEW_TOPIC = ReviewState(INITIAL_EASINESS, 0, 0)
+
+
+def grade(percentage) -> int:
+    """Quiz percentage -> SM-2 grade: 0-19% is 0 ... 60-79% is 3 ... 100% is 5"""
+    return max(0, min(5, int(percentage) // 20))
+
+
+def review(state: ReviewState, quality: int) -> ReviewState:
+    """One SM-2 step"""
+    if quality < PASSING_GRADE:
+        # SM-2 restarts the repetitions of a lapsed item and keeps its easiness
+        return ReviewState(state.easiness, 0, 1)
+    repetitions = state.repetitions + 1
+    if repetitions == 1:
+        interval = 1
+    elif repetitions == 2:
+        interval = 6
+    else:
+        interval = min(MAX_INTERVAL_DAYS, round(state.interval_days * state.easiness))
+    easiness = max(MIN_EASINESS, state.easiness + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+    return ReviewState(easiness, repetitions, interval)
+
+
+def replay(group_starts, grades):
+    """
+    Run `review` over many histories at once.
+
+    `grades` holds every review, each (user, topic) history a contiguous run in
+    chronological order; `group_starts` is the index of each run's first review.
+    Returns (easiness, repetitions, interval_days) arrays with one entry per run.
+    Runs are processed longest first so step k only touches a prefix of the
+    state arrays: one NumPy operation per step over the runs still active.
+    """
+    import numpy as np
+
+    grades = np.asarray(grades, dtype=np.int64)
+    starts = np.asarray(group_starts, dtype=np.int64)
+    lengths = np.diff(np.append(starts, len(grades)))
+    order = np.argsort(-lengths, kind="stable")
+    starts, lengths = starts[order], lengths[order]
+
+    easiness = np.full(len(starts), INITIAL_EASINESS)
+    repetitions = np.zeros(len(starts), dtype=np.int64)
+    interval = np.zeros(len(starts), dtype=np.int64)
+    # active[k] = number of runs longer than k (lengths are sorted descending)
+    active = np.searchsorted(-lengths, -np.arange(lengths[0] if len(lengths) else 0), side="left")
+
+    for step, n in enumerate(active):
+        quality = grades[starts[:n] + step]
+        ef, reps, ivl = easiness[:n], repetitions[:n], interval[:n]
+        passed = quality >= PASSING_GRADE
+        new_reps = np.where(passed, reps + 1, 0)
+        grown = np.minimum(MAX_INTERVAL_DAYS, np.rint(ivl * ef).astype(np.int64))
+        interval[:n] = np.where(~passed | (new_reps == 1), 1, np.where(new_reps == 2, 6, grown))
+        easiness[:n] = np.where(
+            passed, np.maximum(MIN_EASINESS, ef + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)), ef
+        )
+        repetitions[:n] = new_reps
+
+    unsort = np.empty_like(order)
+    unsort[order] = np.arange(len(order))
+    return easiness[unsort], repetitions[unsort], interval[unsort]
+
+
+def _as_datetime(value) -> datetime:
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+
+
+UPSERT_SQL = """
+INSERT INTO review_state
+(user_id, topic, easiness, repetitions, interval_days, due_date, last_grade, last_reviewed_at)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+    easiness = VALUES(easiness),
+    repetitions = VALUES(repetitions),
+    interval_days = VALUES(interval_days),
+    due_date = VALUES(due_date),
+    last_grade = VALUES(last_grade),
+    last_reviewed_at = VALUES(last_reviewed_at)
+"""
+
+
+def rebuild_reviews(cur, first_user: int, last_user: int) -> int:
+    """
+    Replay the quiz history of every user in [first_user, last_user] and
+    store one review state per (user, topic); returns the number of topics.
+    `cur` must be a plain (tuple) cursor. Study-planner retakes are left
+    alone: they follow live quiz results only.
+    """
+    import numpy as np
+
+    cur.execute("""
+    SELECT user_id, topic, percentage, taken_at FROM quiz_attempts
+    WHERE user_id BETWEEN %s AND %s AND topic IS NOT NULL
+    ORDER BY user_id, topic, taken_at, id
+    """, (first_user, last_user))
+    rows = cur.fetchall()
+    if not rows:
+        return 0
+
+    user_ids = np.array([r[0] for r in rows], dtype=np.int64)
+    # Topics compare case-insensitively in the schema, so group on the folded name
+    topics = np.array([r[1].lower() for r in rows])
+    percentages = np.array([r[2] or 0 for r in rows], dtype=np.int64)
+    starts = np.flatnonzero(np.concatenate(([True], (user_ids[1:] != user_ids[:-1]) | (topics[1:] != topics[:-1]))))
+    grades = np.clip(percentages // 20, 0, 5)      # grade(), vectorised
+    easiness, repetitions, interval = replay(starts, grades)
+
+    ends = np.append(starts[1:], len(rows)) - 1
+    states = []
+    for i, last in enumerate(ends.tolist()):
+        user_id, topic, _pct, taken_at = rows[last]
+        reviewed_at = _as_datetime(taken_at)
+        states.append((user_id, topic, float(easiness[i]), int(repetitions[i]), int(interval[i]),
+                       reviewed_at.date() + timedelta(days=int(interval[i])), int(grades[last]), reviewed_at))
+    cur.executemany(UPSERT_SQL, states)
+    return len(states)
+
+
+@writes
+def record_quiz_review(user_id: int, topic: str, percentage: int, taken_at) -> Dict:
+    """Advance the user's review state for `topic` with one quiz attempt"""
+    reviewed_at = _as_datetime(taken_at)
+    quality = grade(percentage)
+    conn = get_db_connection(user_id)
+    cur = conn.cursor(dictionary=True)
+    try:
+        cur.execute("""
+        SELECT easiness, repetitions, interval_days FROM review_state
+        WHERE user_id = %s AND topic = %s FOR UPDATE
+        """, (user_id, topic))
+        row = cur.fetchone()
+        previous = ReviewState(float(row["easiness"]), row["repetitions"], row["interval_days"]) if row else NEW_TOPIC
+        state = review(previous, quality)
+        due = reviewed_at.date() + timedelta(days=state.interval_days)
+
+        cur.execute(UPSERT_SQL, (user_id, topic, state.easiness, state.repetitions, state.interval_days,
+                                 due, quality, reviewed_at))
+
+        if quality < PASSING_GRADE:
+            _plan_retake(cur, user_id, topic, due)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    if quality < PASSING_GRADE:
+        invalidate_progress(user_id)
+    logger.debug("Review for user %s on %s: grade %d, next in %d days", user_id, topic, quality, state.interval_days)
+    return {"topic": topic, "grade": quality, "interval_days": state.interval_days, "due_date": due.isoformat()}
+
+
+def _plan_retake(cur, user_id: int, topic: str, due: date):
+    """Keep one open 'Retake Quiz' planner entry per topic, dated at the review's due date"""
+    cur.execute("""
+    UPDATE study_sessions SET date = %s
+    WHERE user_id = %s AND subject = %s AND type = 'quiz_retake' AND completed = 0
+    """, (due, user_id, topic))
+    if cur.rowcount:
+        return
+    cur.execute("""
+    INSERT INTO study_sessions (user_id, title, subject, duration, date, type, priority, completed, notes, created_at)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, (user_id, f"Retake Quiz: {topic}", topic, RETAKE_DURATION_MINUTES, due, 'quiz_retake', 'high', 0,
+          'You scored below 60%. Review this topic before the retake.', _now_ist_iso()))
+
+
+@reads
+def get_due_reviews(user_id: int, on: Optional[date] = None, limit: int = 20) -> List[Dict]:
+    """Topics due for review on or before `on` (default today), most overdue first"""
+    conn = get_db_connection(user_id)
+    cur = conn.cursor(dictionary=True)
+    cur.execute("""
+    SELECT topic, due_date, interval_days, repetitions, easiness, last_grade, last_reviewed_at
+    FROM review_state WHERE user_id = %s AND due_date <= %s
+    ORDER BY due_date LIMIT %s
+    """, (user_id, on or date.today(), limit))
+    rows = cur.fetchall()
+    cur.close()
+    return rows
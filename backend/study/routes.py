@@ -6,27 +6,11 @@ from db import (
     toggle_study_completion,
     compute_progress,
 )
-from decimal import Decimal
-from datetime import datetime, timedelta
 
 study_bp = Blueprint("study", __name__, url_prefix="/study")
 
-# Robustly cleans dicts for JSON serialization
-def clean_json(obj):
-    if isinstance(obj, dict):
-        for k, v in obj.items():
-            obj[k] = clean_json(v)
-        return obj
-    elif isinstance(obj, list):
-        return [clean_json(x) for x in obj]
-    elif isinstance(obj, Decimal):
-        return float(obj)
-    elif isinstance(obj, (datetime,)):
-        return obj.isoformat()
-    elif isinstance(obj, (timedelta,)):
-        return obj.total_seconds()
-    else:
-        return obj
+# Rows are returned as-is: the app-wide JSON provider (utils/json_provider.py)
+# serializes Decimal / datetime / timedelta values.
 
 @study_bp.route("/sessions", methods=["GET"])
 def list_sessions():
@@ -34,13 +18,11 @@ def list_sessions():
     if not user_id:
         return jsonify({"success": False, "error": "missing_userId"}), 400
     sessions = get_study_sessions(int(user_id))
-    sessions = clean_json([dict(s) for s in sessions])
     return jsonify({"success": True, "sessions": sessions})
 
 @study_bp.route("/sessions/<int:user_id>", methods=["GET"])
 def get_sessions_by_user(user_id):
     sessions = get_study_sessions(user_id)
-    sessions = clean_json([dict(s) for s in sessions])
     return jsonify({"success": True, "sessions": sessions})
 
 @study_bp.route("/sessions", methods=["POST", "OPTIONS"])
@@ -62,7 +44,7 @@ def add_session():
     session = add_study_session(
         int(user_id), title, subject, duration, date, time, type_, priority, notes
     )
-    session = clean_json(dict(session) if session else {})
+    session = session or {}
     return jsonify({"success": True, "session": session})
 
 @study_bp.route("/sessions/<int:session_id>", methods=["DELETE"])
@@ -84,7 +66,6 @@ def toggle_session(session_id):
     updated = toggle_study_completion(session_id, int(user_id))
     if not updated:
         return jsonify({"success": False, "error": "not_found"}), 404
-    updated = clean_json(dict(updated))
     return jsonify({"success": True, "session": updated})
 
 # NEW: Mark session as completed (used by bin in UI)
@@ -100,11 +81,9 @@ def complete_session(session_id):
     updated = toggle_study_completion(session_id, int(user_id), force_completed=True)
     if not updated:
         return jsonify({"success": False, "error": "not_found"}), 404
-    updated = clean_json(dict(updated))
     return jsonify({"success": True, "session": updated})
 
 @study_bp.route("/progress/<int:user_id>", methods=["GET"])
 def get_progress(user_id):
     prog = compute_progress(user_id)
-    prog = clean_json(prog)
     return jsonify({"success": True, "progress": prog})
@@ -0,0 +1,310 @@
+"""
+Stream the legacy SQLite database (data/edumate.sqlite3) into the current schema.
+
+The legacy schema differs from db._ensure_tables:
+
+    sessions        login sessions          -> login_sessions
+    chats.timestamp                         -> chats.created_at
+    chats.session_id  pointed at login sessions, so messages import without
+                      a chat session (they show in the per-user history)
+    quiz_attempts   subject / num_questions / user_name
+                                            -> topic / total_questions / username
+    timestamps      ISO-8601 with mixed offsets -> IST wall clock DATETIME
+
+Each source table is read in id order, `--batch-size` rows at a time, and
+written as one multi-row INSERT. The chunk and its checkpoint (last source id,
+in `legacy_import_state`) commit in the same transaction, so an interrupted
+run resumes where it stopped without duplicating rows. Users and quiz attempts
+keep their legacy ids shifted by the target's MAX(id) at the first run; a
+legacy user whose username already exists is merged into that account.
+
+Writes go through db.pooled_connection(), so the target is MySQL or, with
+DB_BACKEND=sqlite, the SQLite backend.
+
+Usage (from backend/):
+    python -m tools.migrate_legacy_sqlite [--source data/edumate.sqlite3] [--batch-size 5000]
+    python -m tools.migrate_legacy_sqlite --status
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+DEFAULT_SOURCE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "edumate.sqlite3")
+IST = timezone(timedelta(hours=5, minutes=30))
+
+# source: legacy table, reads: legacy columns used; target: table written,
+# columns: target columns filled by map_row(row, ctx); where: keeps rows whose
+# parents exist, since the legacy file never enforced FKs; ignore: INSERT IGNORE
+# (username / per-user uniqueness against rows already in the target)
+Step = namedtuple("Step", ["source", "reads", "target", "columns", "map_row", "where", "ignore"])
+
+
+def _dt(value):
+    """Legacy ISO text -> 'YYYY-MM-DD HH:MM:SS' in IST (the app's wall clock)"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(IST).replace(tzinfo=None)
+    return parsed.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _percentage(row):
+    if row["percentage"] is not None:
+        return int(row["percentage"])
+    total = row["num_questions"] or 0
+    return int(round((row["score"] or 0) / total * 100)) if total else 0
+
+
+USERS_EXIST = "user_id IN (SELECT id FROM users)"
+
+STEPS = [
+    Step("users", ("username", "name", "email", "password_hash", "created_at"),
+         "users", ("id", "username", "name", "email", "password_hash", "created_at"),
+         lambda r, ctx: (r["id"] + ctx.offsets["users"], r["username"], r["name"], r["email"], r["password_hash"],
+                         _dt(r["created_at"]) or datetime.now(IST).strftime("%Y-%m-%d %H:%M:%S")),
+         None, True),
+    Step("progress", ("user_id", "tasks_completed", "sessions_completed", "tests_taken", "total_hours"),
+         "progress", ("user_id", "tasks_completed", "sessions_completed", "tests_taken", "total_hours"),
+         lambda r, ctx: (ctx.user(r["user_id"]), r["tasks_completed"] or 0, r["sessions_completed"] or 0,
+                         r["tests_taken"] or 0, r["total_hours"] or 0),
+         USERS_EXIST, True),
+    Step("sessions", ("user_id", "login_at", "logout_at", "active_seconds"),
+         "login_sessions", ("user_id", "login_at", "logout_at", "active_seconds"),
+         lambda r, ctx: (ctx.user(r["user_id"]), _dt(r["login_at"]), _dt(r["logout_at"]), r["active_seconds"]),
+         USERS_EXIST + " AND login_at IS NOT NULL", False),
+    Step("login_sessions", ("user_id", "login_at", "logout_at", "active_seconds"),
+         "login_sessions", ("user_id", "login_at", "logout_at", "active_seconds"),
+         lambda r, ctx: (ctx.user(r["user_id"]), _dt(r["login_at"]), _dt(r["logout_at"]), r["active_seconds"]),
+         USERS_EXIST + " AND login_at IS NOT NULL", False),
+    Step("tests", ("user_id", "subject", "score", "taken_at"),
+         "tests", ("user_id", "subject", "score", "taken_at"),
+         lambda r, ctx: (ctx.user(r["user_id"]), r["subject"], r["score"], _dt(r["taken_at"])),
+         USERS_EXIST, False),
+    Step("study_sessions", ("user_id", "title", "subject", "duration", "date", "time", "type", "priority",
+                           "completed", "notes", "created_at"),
+         "study_sessions",
+         ("user_id", "title", "subject", "duration", "date", "time", "type", "priority", "completed", "notes",
+          "created_at"),
+         lambda r, ctx: (ctx.user(r["user_id"]), r["title"], r["subject"], r["duration"] or 60, r["date"] or None,
+                         r["time"] or None, r["type"], r["priority"], r["completed"] or 0, r["notes"],
+                         _dt(r["created_at"])),
+         USERS_EXIST, False),
+    Step("chats", ("user_id", "role", "message", "timestamp"),
+         "chats", ("user_id", "role", "message", "session_id", "created_at"),
+         lambda r, ctx: (ctx.user(r["user_id"]) if r["user_id"] is not None else None, r["role"], r["message"],
+                         None, _dt(r["timestamp"])),
+         "(user_id IS NULL OR " + USERS_EXIST + ")", False),
+    Step("quiz_attempts", ("user_id", "username", "user_name", "topic", "subject", "difficulty", "score",
+                          "num_questions", "percentage", "time_taken", "taken_at"),
+         "quiz_attempts",
+         ("id", "user_id", "username", "topic", "difficulty", "score", "total_questions", "percentage",
+          "time_taken", "taken_at"),
+         lambda r, ctx: (r["id"] + ctx.offsets["quiz_attempts"], ctx.user(r["user_id"]),
+                         r["username"] or r["user_name"], r["topic"] or r["subject"] or "General", r["difficulty"],
+                         int(round(r["score"] or 0)), r["num_questions"] or 0, _percentage(r),
+                         r["time_taken"] or 0, _dt(r["taken_at"])),
+         USERS_EXIST, False),
+    Step("quiz_answers", ("attempt_id", "user_name", "question", "correct_answer", "user_answer", "is_correct",
+                         "explanation"),
+         "quiz_answers",
+         ("attempt_id", "user_name", "question", "correct_answer", "user_answer", "is_correct", "explanation"),
+         lambda r, ctx: (r["attempt_id"] + ctx.offsets["quiz_attempts"], r["user_name"], r["question"],
+                         r["correct_answer"], r["user_answer"], 1 if r["is_correct"] else 0, r["explanation"]),
+         "attempt_id IN (SELECT id FROM quiz_attempts WHERE " + USERS_EXIST + ")", False),
+]
+
+# Tables whose legacy ids are kept (shifted) because other rows reference them
+ID_TABLES = ("users", "quiz_attempts")
+
+
+class Context:
+    """Id translation shared by the steps"""
+
+    def __init__(self, offsets: dict):
+        self.offsets = offsets
+        self.merged_users = {}  # legacy id -> existing target id, for username collisions
+
+    def user(self, legacy_id: int) -> int:
+        return self.merged_users.get(legacy_id, legacy_id + self.offsets["users"])
+
+
+def _ensure_state_table(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS legacy_import_state (
+        source_table VARCHAR(64) PRIMARY KEY,
+        last_id BIGINT NOT NULL DEFAULT 0,
+        id_offset BIGINT NOT NULL DEFAULT 0,
+        rows_copied BIGINT NOT NULL DEFAULT 0,
+        updated_at DATETIME
+    )
+    """)
+
+
+def _load_state(cur) -> dict:
+    cur.execute("SELECT source_table, last_id, id_offset, rows_copied FROM legacy_import_state")
+    return {row[0]: {"last_id": row[1], "id_offset": row[2], "rows_copied": row[3]} for row in cur.fetchall()}
+
+
+def _save_state(cur, table: str, last_id: int, id_offset: int, rows_copied: int):
+    cur.execute("""
+    INSERT INTO legacy_import_state (source_table, last_id, id_offset, rows_copied, updated_at)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE last_id = VALUES(last_id), rows_copied = VALUES(rows_copied),
+        updated_at = VALUES(updated_at)
+    """, (table, last_id, id_offset, rows_copied, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+
+
+def _resolve_offsets(conn, cur, state: dict) -> dict:
+    """Id shift per ID_TABLES entry, fixed at the first run and reused on resume"""
+    offsets = {}
+    for table in ID_TABLES:
+        if table not in state:
+            cur.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+            state[table] = {"last_id": 0, "id_offset": cur.fetchone()[0], "rows_copied": 0}
+            _save_state(cur, table, 0, state[table]["id_offset"], 0)
+        offsets[table] = state[table]["id_offset"]
+    conn.commit()
+    return offsets
+
+
+def _merged_users(src, cur, ctx: Context, batch_size: int):
+    """Legacy users whose username belongs to a different target id (pre-existing accounts)"""
+    last_id = 0
+    while True:
+        rows = src.execute("SELECT id, username FROM users WHERE id > ? ORDER BY id LIMIT ?",
+                           (last_id, batch_size)).fetchall()
+        if not rows:
+            return
+        placeholders = ", ".join(["%s"] * len(rows))
+        cur.execute(f"SELECT id, username FROM users WHERE username IN ({placeholders})",
+                    [r["username"] for r in rows])
+        target = {username.lower(): user_id for user_id, username in cur.fetchall()}
+        for r in rows:
+            existing = target.get(r["username"].lower())
+            if existing is not None and existing != r["id"] + ctx.offsets["users"]:
+                ctx.merged_users[r["id"]] = existing
+        last_id = rows[-1]["id"]
+
+
+def _source_columns(src, table: str) -> list:
+    return [row[1] for row in src.execute(f"PRAGMA table_info({table})")]
+
+
+def _copy(src, conn, cur, step: Step, ctx: Context, state: dict, batch_size: int) -> int:
+    """Copy one legacy table from its checkpoint onwards; returns rows copied in this run"""
+    present = set(_source_columns(src, step.source))
+    if not present:
+        print(f"  {step.source:<16} not in source, skipped")
+        return 0
+
+    progress = state.get(step.source, {"last_id": 0, "id_offset": 0, "rows_copied": 0})
+    last_id, copied = progress["last_id"], progress["rows_copied"]
+    # Older legacy files lack some later-added columns; read those as NULL
+    select = ", ".join(c if c in present else f"NULL AS {c}" for c in ("id",) + step.reads)
+    where = "id > ?" + (f" AND {step.where}" if step.where else "")
+    insert = (f"{'INSERT IGNORE' if step.ignore else 'INSERT'} INTO {step.target} "
+              f"({', '.join(step.columns)}) VALUES ")
+    row_sql = "(" + ", ".join(["%s"] * len(step.columns)) + ")"
+
+    start, copied_now = time.perf_counter(), 0
+    while True:
+        rows = src.execute(f"SELECT {select} FROM {step.source} WHERE {where} ORDER BY id LIMIT ?",
+                           (last_id, batch_size)).fetchall()
+        if not rows:
+            break
+        params = []
+        for row in rows:
+            params.extend(step.map_row(row, ctx))
+        cur.execute(insert + ", ".join([row_sql] * len(rows)), params)
+        last_id = rows[-1]["id"]
+        copied += len(rows)
+        copied_now += len(rows)
+        # Checkpoint commits with the chunk, so a resumed run never re-inserts it
+        _save_state(cur, step.source, last_id, progress["id_offset"], copied)
+        conn.commit()
+        elapsed = time.perf_counter() - start
+        print(f"  {step.source:<16}{copied:>10} rows  last id {last_id:<10}"
+              f"{copied_now / elapsed if elapsed else 0:>10.0f} rows/s", flush=True)
+
+    state[step.source] = {"last_id": last_id, "id_offset": progress["id_offset"], "rows_copied": copied}
+    return copied_now
+
+
+def migrate(source: str, batch_size: int) -> dict:
+    """Run (or resume) the import; returns rows copied per legacy table in this run"""
+    import db
+
+    src = sqlite3.connect(f"file:{source}?mode=ro", uri=True)
+    src.row_factory = sqlite3.Row
+    db.ensure_schema()
+    copied = {}
+    with db.pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            _ensure_state_table(cur)
+            state = _load_state(cur)
+            ctx = Context(_resolve_offsets(conn, cur, state))
+            for step in STEPS:
+                copied[step.source] = _copy(src, conn, cur, step, ctx, state, batch_size)
+                if step.source == "users":
+                    _merged_users(src, cur, ctx, batch_size)
+                    if ctx.merged_users:
+                        print(f"  {len(ctx.merged_users)} legacy users merged into existing accounts")
+        finally:
+            cur.close()
+            src.close()
+    return copied
+
+
+def print_status():
+    import db
+
+    db.ensure_schema()
+    with db.pooled_connection() as conn:
+        cur = conn.cursor()
+        try:
+            _ensure_state_table(cur)
+            state = _load_state(cur)
+        finally:
+            cur.close()
+    for step in STEPS:
+        progress = state.get(step.source)
+        if progress:
+            print(f"  {step.source:<16}{progress['rows_copied']:>10} rows  last id {progress['last_id']}")
+        else:
+            print(f"  {step.source:<16}{'not started':>10}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="legacy SQLite file")
+    parser.add_argument("--batch-size", type=int, default=5000, help="rows per INSERT and checkpoint")
+    parser.add_argument("--status", action="store_true", help="show checkpoints and exit")
+    args = parser.parse_args(argv)
+
+    if args.status:
+        print_status()
+        return 0
+    if not os.path.exists(args.source):
+        print(f"Source not found: {args.source}")
+        return 2
+
+    start = time.perf_counter()
+    copied = migrate(args.source, args.batch_size)
+    elapsed = time.perf_counter() - start
+    total = sum(copied.values())
+    print(f"\nCopied {total} rows in {elapsed:.1f}s ({total / elapsed if elapsed else 0:.0f} rows/s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,260 @@
+"""
+Move users between the global database and the user-id shards (DB_SHARDS).
+
+A move copies every per-user table (db_shards.USER_TABLES) from the user's
+current database to the target shard, flips the user's `user_shards`
+directory row, then deletes the rows from the source. Auto-increment ids are
+re-issued on the target, so chat sessions, quiz attempts and study sessions
+are inserted one by one and their children's foreign keys are remapped.
+Target rows are cleared before copying, so a move interrupted before the
+directory flip can simply be run again.
+
+Writes the user makes while being moved are lost: run it in a maintenance
+window or for idle users. Other workers follow the flip once their
+directory cache expires (SHARD_DIRECTORY_TTL).
+
+Usage (from backend/):
+    python -m tools.rebalance_shards --status
+    python -m tools.rebalance_shards --user 42 --to 1
+    python -m tools.rebalance_shards --from-global [--limit 1000]   # initial split
+    python -m tools.rebalance_shards --balance [--dry-run]
+"""
+
+import argparse
+import sys
+import time
+
+from db_shards import USER_TABLES
+
+# Generated columns are recomputed on the target
+SKIP_COLUMNS = {"scheduled_tests": {"pending_topic"}}
+# Tables whose new ids are referenced by later tables
+REMAPPED = {parent for _table, _where, parents in USER_TABLES for parent in parents.values()}
+
+
+def _connect(shard):
+    import db
+
+    return db.DB_POOL.get_connection() if shard is None else db.SHARDS.connection(shard)
+
+
+def _directory_shard(global_conn, user_id: int):
+    cur = global_conn.cursor()
+    try:
+        cur.execute("SELECT shard FROM user_shards WHERE user_id = %s", (user_id,))
+        row = cur.fetchone()
+    finally:
+        cur.close()
+    return row[0] if row else None
+
+
+def _delete_user_rows(conn, user_id: int):
+    cur = conn.cursor()
+    try:
+        for table, where, _parents in reversed(USER_TABLES):
+            cur.execute(f"DELETE FROM {table} WHERE {where}", (user_id,))
+    finally:
+        cur.close()
+
+
+def _copy_user_rows(source, target, user_id: int) -> int:
+    remapped = {}   # parent table -> {source id: target id}
+    copied = 0
+    read_cur = source.cursor(dictionary=True)
+    write_cur = target.cursor()
+    try:
+        for table, where, parents in USER_TABLES:
+            read_cur.execute(f"SELECT * FROM {table} WHERE {where}", (user_id,))
+            rows = read_cur.fetchall()
+            if not rows:
+                continue
+            skip = SKIP_COLUMNS.get(table, set()) | {"id"}
+            columns = [c for c in rows[0] if c not in skip]
+            sql = (f"INSERT INTO {table} ({', '.join(columns)}) "
+                   f"VALUES ({', '.join(['%s'] * len(columns))})")
+
+            def values(row):
+                return tuple(remapped[parents[c]][row[c]] if c in parents and row[c] is not None else row[c]
+                             for c in columns)
+
+            if table in REMAPPED:
+                ids = remapped.setdefault(table, {})
+                for row in rows:
+                    write_cur.execute(sql, values(row))
+                    ids[row["id"]] = write_cur.lastrowid
+            else:
+                write_cur.executemany(sql, [values(row) for row in rows])
+            copied += len(rows)
+    finally:
+        read_cur.close()
+        write_cur.close()
+    return copied
+
+
+def move_user(user_id: int, to_shard: int) -> int:
+    """Move one user's rows to `to_shard`; returns the number of rows copied"""
+    import db
+
+    global_conn = _connect(None)
+    try:
+        from_shard = _directory_shard(global_conn, user_id)
+        if from_shard == to_shard:
+            return 0
+        cur = global_conn.cursor()
+        cur.execute("SELECT username, email, name, created_at FROM users WHERE id = %s", (user_id,))
+        user = cur.fetchone()
+        cur.close()
+        if user is None:
+            raise ValueError(f"No user {user_id}")
+
+        source = _connect(from_shard)
+        target = _connect(to_shard)
+        try:
+            db.mirror_user_row(target, user_id, *user)
+            _delete_user_rows(target, user_id)
+            copied = _copy_user_rows(source, target, user_id)
+            target.commit()
+
+            cur = global_conn.cursor()
+            cur.execute("""
+            INSERT INTO user_shards (user_id, shard, moved_at) VALUES (%s, %s, NOW())
+            ON DUPLICATE KEY UPDATE shard = VALUES(shard), moved_at = VALUES(moved_at)
+            """, (user_id, to_shard))
+            cur.close()
+            global_conn.commit()
+            db.SHARDS.forget(user_id)
+
+            _delete_user_rows(source, user_id)
+            if from_shard is not None:
+                # The users row itself stays on the global database
+                cur = source.cursor()
+                cur.execute("DELETE FROM users WHERE id = %s", (user_id,))
+                cur.close()
+            source.commit()
+        finally:
+            source.close()
+            target.close()
+    finally:
+        global_conn.close()
+    return copied
+
+
+def shard_counts() -> dict:
+    """Users per database; key None is the global database"""
+    conn = _connect(None)
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT COUNT(*) FROM users WHERE id NOT IN (SELECT user_id FROM user_shards)")
+        counts = {None: cur.fetchone()[0]}
+        cur.execute("SELECT shard, COUNT(*) FROM user_shards GROUP BY shard")
+        counts.update(dict(cur.fetchall()))
+    finally:
+        cur.close()
+        conn.close()
+    return counts
+
+
+def plan_balance(tolerance: int) -> list:
+    """(user_id, from_shard, to_shard) moves that even out users per shard"""
+    import db
+
+    counts = {k: 0 for k in range(len(db.SHARDS))}
+    counts.update({k: v for k, v in shard_counts().items() if k is not None})
+    mean = sum(counts.values()) // len(counts)
+
+    # Movable users per over-full shard, most recently placed first (least data to copy)
+    conn = _connect(None)
+    cur = conn.cursor()
+    movable = {}
+    try:
+        for shard, count in counts.items():
+            if count > mean:
+                cur.execute("SELECT user_id FROM user_shards WHERE shard = %s ORDER BY user_id DESC LIMIT %s",
+                            (shard, count - mean))
+                movable[shard] = [r[0] for r in cur.fetchall()]
+    finally:
+        cur.close()
+        conn.close()
+
+    moves = []
+    while True:
+        fullest = max(counts, key=counts.get)
+        emptiest = min(counts, key=counts.get)
+        if counts[fullest] - counts[emptiest] <= tolerance or not movable.get(fullest):
+            return moves
+        moves.append((movable[fullest].pop(0), fullest, emptiest))
+        counts[fullest] -= 1
+        counts[emptiest] += 1
+
+
+def _unsharded_users(limit: int) -> list:
+    conn = _connect(None)
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT id FROM users WHERE id NOT IN (SELECT user_id FROM user_shards) ORDER BY id LIMIT %s",
+                    (limit,))
+        return [r[0] for r in cur.fetchall()]
+    finally:
+        cur.close()
+        conn.close()
+
+
+def _run_moves(moves: list) -> int:
+    start = time.perf_counter()
+    rows = 0
+    for n, (user_id, from_shard, to_shard) in enumerate(moves, 1):
+        rows += move_user(user_id, to_shard)
+        print(f"  [{n}/{len(moves)}] user {user_id}: {'global' if from_shard is None else from_shard} -> {to_shard}")
+    elapsed = time.perf_counter() - start
+    print(f"\nMoved {len(moves)} users ({rows} rows) in {elapsed:.1f}s")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--status", action="store_true", help="users per database")
+    mode.add_argument("--user", type=int, help="move this user (with --to)")
+    mode.add_argument("--from-global", action="store_true", help="move unsharded users to their home shard")
+    mode.add_argument("--balance", action="store_true", help="even out users per shard")
+    parser.add_argument("--to", type=int, help="target shard for --user")
+    parser.add_argument("--limit", type=int, default=1000, help="users per --from-global run")
+    parser.add_argument("--tolerance", type=int, default=1, help="allowed user-count spread for --balance")
+    parser.add_argument("--dry-run", action="store_true", help="print the moves without running them")
+    args = parser.parse_args(argv)
+
+    import db
+
+    db.init_db_pool(bootstrap=False)
+    if db.SHARDS is None:
+        print("DB_SHARDS is not set: nothing to rebalance")
+        return 2
+    db.ensure_schema()
+
+    if args.status:
+        for shard, count in sorted(shard_counts().items(), key=lambda kv: -1 if kv[0] is None else kv[0]):
+            print(f"  {'global' if shard is None else f'shard {shard}':<10}{count:>10} users")
+        return 0
+
+    if args.user is not None:
+        if args.to is None or not 0 <= args.to < len(db.SHARDS):
+            parser.error(f"--to must be a shard index in 0..{len(db.SHARDS) - 1}")
+        conn = _connect(None)
+        try:
+            moves = [(args.user, _directory_shard(conn, args.user), args.to)]
+        finally:
+            conn.close()
+    elif args.from_global:
+        moves = [(user_id, None, db.SHARDS.home_shard(user_id)) for user_id in _unsharded_users(args.limit)]
+    else:
+        moves = plan_balance(args.tolerance)
+
+    if args.dry_run:
+        for user_id, from_shard, to_shard in moves:
+            print(f"  user {user_id}: {'global' if from_shard is None else from_shard} -> {to_shard}")
+        return 0
+    return _run_moves(moves)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
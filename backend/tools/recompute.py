@@ -0,0 +1,55 @@
+"""
+Shared runner for the tools that rebuild per-(user, topic) state from the
+quiz history (recompute_reviews, recompute_mastery).
+
+Each tool supplies a range function, rebuild(cur, first_user, last_user),
+that replays and upserts the states of one user-id range and returns how
+many it stored. The runner walks every database's user ids in ranges of
+--users-per-batch, committing after each range, with the global database
+and every shard processed in parallel.
+"""
+
+import argparse
+import time
+from typing import Callable, Dict, Optional, Sequence
+
+RangeRebuild = Callable[[object, int, int], int]
+
+
+def recompute_database(conn, rebuild: RangeRebuild, users_per_batch: int) -> Dict:
+    """Run `rebuild` over every user-id range on one database; returns counts"""
+    cur = conn.cursor()
+    counts = {"users": 0, "topics": 0}
+    try:
+        cur.execute("SELECT MIN(user_id), MAX(user_id), COUNT(DISTINCT user_id) FROM quiz_attempts")
+        low, high, users = cur.fetchone()
+        if low is None:
+            return counts
+        counts["users"] = users
+        for first in range(low, high + 1, users_per_batch):
+            counts["topics"] += rebuild(cur, first, first + users_per_batch - 1)
+            conn.commit()
+    finally:
+        cur.close()
+    return counts
+
+
+def main(rebuild: RangeRebuild, what: str, description: str, argv: Optional[Sequence[str]] = None) -> int:
+    """Command-line entry point: `what` names the rebuilt states in the summary"""
+    parser = argparse.ArgumentParser(description=description, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users-per-batch", type=int, default=2000, help="user-id range replayed per batch")
+    args = parser.parse_args(argv)
+
+    import db
+
+    db.ensure_schema()
+    start = time.perf_counter()
+    results = db.for_each_database(lambda conn: recompute_database(conn, rebuild, args.users_per_batch))
+    elapsed = time.perf_counter() - start
+
+    for i, counts in enumerate(results):
+        name = "global" if i == 0 else f"shard {i - 1}"
+        print(f"  {name:<10}{counts['users']:>10} users{counts['topics']:>10} topics")
+    total = sum(c["topics"] for c in results)
+    print(f"\nRecomputed {total} {what} in {elapsed:.1f}s")
+    return 0
@@ -0,0 +1,27 @@
+"""
+Rebuild knowledge-tracing mastery state (topic_mastery) from the quiz history.
+
+Migration 13 backfills the table once; run this again after changing the
+model parameters in ai_agent/mastery.py. Users are processed in id ranges:
+each range's attempts are read in (user, topic, taken_at) order through
+idx_quiz_attempts_user_topic together with their answers, every
+(user, topic) history is folded with mastery.observe (the same step the live
+path runs, see mastery.replay_history), and the states are upserted in one
+batch. See tools/recompute.py for the range-batched runner.
+
+Usage (from backend/):
+    python -m tools.recompute_mastery [--users-per-batch 2000]
+"""
+
+import sys
+
+
+def main(argv=None) -> int:
+    from ai_agent.mastery import rebuild_mastery
+    from tools.recompute import main as run
+
+    return run(rebuild_mastery, "mastery states", __doc__, argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
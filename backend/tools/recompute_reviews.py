@@ -0,0 +1,29 @@
+"""
+Rebuild spaced-repetition state (review_state) from the full quiz history.
+
+Migration 14 backfills the table once; run this again after changing the
+SM-2 parameters in quiz/spaced_repetition.py. Users are processed in id
+ranges: each range's attempts are read in (user, topic, taken_at) order
+through idx_quiz_attempts_user_topic, every (user, topic) history in the
+range is replayed at once with NumPy (spaced_repetition.rebuild_reviews),
+and the states are upserted in one batch. See tools/recompute.py for the
+range-batched runner.
+
+Study-planner retakes are left alone: they follow live quiz results only.
+
+Usage (from backend/):
+    python -m tools.recompute_reviews [--users-per-batch 2000]
+"""
+
+import sys
+
+
+def main(argv=None) -> int:
+    from quiz.spaced_repetition import rebuild_reviews
+    from tools.recompute import main as run
+
+    return run(rebuild_reviews, "review states", __doc__, argv)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
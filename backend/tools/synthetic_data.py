@@ -0,0 +1,278 @@
+"""
+Synthetic dataset generator for scale-testing the schema.
+
+Bulk-loads users with quiz attempts (+ answers), chat sessions (+ messages)
+and study sessions into the database named by MYSQL_*, using the tables
+exactly as db._ensure_tables + migrations create them. Topics follow a Zipf
+distribution so a few topics dominate, like real coursework; per-user
+volumes and chat lengths vary around the configured means.
+
+Rows get explicit ids (continuing from the current MAX(id)) so children can
+reference parents without round trips; run it as the only writer.
+
+    --method insert     executemany multi-row INSERTs (default)
+    --method load-data  LOAD DATA LOCAL INFILE from temp TSV files (fastest;
+                        needs local_infile enabled on the server)
+    --fast              disable FK/unique checks for the load session
+
+Usage (from backend/):
+    python -m tools.synthetic_data --users 100000 --attempts-per-user 40 \\
+        --messages-per-session 12 --zipf 1.1 --method load-data --fast --yes
+"""
+
+import argparse
+import bisect
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Child tables after their parents, so flushes never violate FKs
+TABLES = {
+    "users": ("id", "username", "name", "email", "password_hash", "created_at"),
+    "sessions": ("id", "user_id", "title", "created_at", "message_count", "last_message_at"),
+    "chats": ("id", "user_id", "role", "message", "session_id", "created_at"),
+    "quiz_attempts": ("id", "user_id", "username", "topic", "difficulty", "score",
+                      "total_questions", "percentage", "time_taken", "taken_at"),
+    "quiz_answers": ("id", "attempt_id", "user_name", "question", "correct_answer",
+                     "user_answer", "is_correct", "explanation"),
+    "study_sessions": ("id", "user_id", "title", "subject", "duration", "date", "time",
+                       "type", "priority", "completed", "notes", "created_at"),
+}
+
+SUBJECTS = ["Databases", "Operating Systems", "Networks", "Algorithms", "Compilers",
+            "Discrete Maths", "Linear Algebra", "Probability", "Physics", "Chemistry"]
+DIFFICULTIES = ["easy", "medium", "hard", "mixed"]
+CHAT_LINES = [
+    "Can you explain {t} with an example?",
+    "What are the most common exam questions on {t}?",
+    "Summarise the key formulas in {t}.",
+    "Why does my answer for this {t} problem differ from the solution?",
+]
+
+
+class ZipfTopics:
+    """Topic sampler with P(rank k) proportional to 1 / k^s"""
+
+    def __init__(self, count: int, s: float, rnd: random.Random):
+        base = SUBJECTS * (count // len(SUBJECTS) + 1)
+        self.topics = [f"{base[i]} {i // len(SUBJECTS) + 1}" if i >= len(SUBJECTS) else base[i]
+                       for i in range(count)]
+        self.cum = list(itertools.accumulate(1 / (k ** s) for k in range(1, count + 1)))
+        self.rnd = rnd
+
+    def sample(self) -> str:
+        return self.topics[bisect.bisect_left(self.cum, self.rnd.random() * self.cum[-1])]
+
+
+def _around(rnd: random.Random, mean: float) -> int:
+    """Non-negative integer with the given mean and a long tail"""
+    return int(rnd.expovariate(1 / mean)) if mean > 0 else 0
+
+
+def _fmt(value):
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return value
+
+
+class BulkWriter:
+    """Buffers rows per table and writes them in batches via INSERT or LOAD DATA"""
+
+    def __init__(self, conn, method: str, batch_size: int):
+        self.conn = conn
+        self.method = method
+        self.batch_size = batch_size
+        self.buffers = {table: [] for table in TABLES}
+        self.counts = {table: 0 for table in TABLES}
+        self.tmpdir = tempfile.mkdtemp(prefix="edumate_synth_") if method == "load-data" else None
+
+    def add(self, table: str, row: tuple):
+        buffer = self.buffers[table]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        cur = self.conn.cursor()
+        try:
+            for table, columns in TABLES.items():
+                rows = self.buffers[table]
+                if not rows:
+                    continue
+                if self.method == "load-data":
+                    self._load_data(cur, table, columns, rows)
+                else:
+                    placeholders = ", ".join(["%s"] * len(columns))
+                    # mysql-connector rewrites executemany INSERTs into one multi-row statement
+                    cur.executemany(f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+                                    [tuple(_fmt(v) for v in row) for row in rows])
+                self.counts[table] += len(rows)
+                self.buffers[table] = []
+            self.conn.commit()
+        finally:
+            cur.close()
+
+    def _load_data(self, cur, table, columns, rows):
+        path = os.path.join(self.tmpdir, f"{table}.tsv")
+        with open(path, "w", encoding="utf-8", newline="\n") as f:
+            for row in rows:
+                f.write("\t".join(_tsv(v) for v in row) + "\n")
+        cur.execute(
+            f"LOAD DATA LOCAL INFILE %s INTO TABLE {table} CHARACTER SET utf8mb4 "
+            f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' ({', '.join(columns)})",
+            (path,),
+        )
+
+
+def _tsv(value) -> str:
+    if value is None:
+        return "\\N"
+    text = str(_fmt(value))
+    return text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+
+def _next_ids(conn) -> dict:
+    cur = conn.cursor()
+    ids = {}
+    try:
+        for table in TABLES:
+            cur.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+            ids[table] = itertools.count(cur.fetchone()[0] + 1)
+    finally:
+        cur.close()
+    return ids
+
+
+def generate(writer: BulkWriter, conn, args):
+    from werkzeug.security import generate_password_hash
+
+    rnd = random.Random(args.seed)
+    topics = ZipfTopics(args.topics, args.zipf, rnd)
+    ids = _next_ids(conn)
+    password_hash = generate_password_hash("synthetic-password")
+    now = datetime.now()
+    window = timedelta(days=args.days)
+    run_tag = f"{args.prefix}{rnd.getrandbits(24):06x}"
+
+    for n in range(args.users):
+        user_id = next(ids["users"])
+        username = f"{run_tag}_{n}"
+        joined = now - window * rnd.random()
+        writer.add("users", (user_id, username, f"Student {n}", f"{username}@example.invalid", password_hash, joined))
+
+        # Quiz attempts with per-question answers
+        for _ in range(_around(rnd, args.attempts_per_user)):
+            attempt_id = next(ids["quiz_attempts"])
+            total = rnd.choice((5, 10, 15, 20))
+            score = min(total, max(0, int(rnd.gauss(0.65, 0.2) * total)))
+            taken = joined + (now - joined) * rnd.random()
+            topic = topics.sample()
+            writer.add("quiz_attempts", (attempt_id, user_id, username, topic, rnd.choice(DIFFICULTIES), score,
+                                         total, int(round(score / total * 100)), rnd.randint(60, 1800), taken))
+            for q in range(min(total, args.answers_per_attempt)):
+                correct = q < score
+                writer.add("quiz_answers", (next(ids["quiz_answers"]), attempt_id, username,
+                                            f"{topic}: question {q + 1}?", "A", "A" if correct else "C",
+                                            1 if correct else 0, f"Explanation for {topic} question {q + 1}."))
+
+        # Chat sessions with denormalised message counters (migration 4)
+        for _ in range(_around(rnd, args.sessions_per_user)):
+            session_id = next(ids["sessions"])
+            started = joined + (now - joined) * rnd.random()
+            count = max(1, _around(rnd, args.messages_per_session))
+            topic = topics.sample()
+            at = started
+            messages = []
+            for m in range(count):
+                at += timedelta(seconds=rnd.randint(5, 240))
+                role = "user" if m % 2 == 0 else "bot"
+                text = rnd.choice(CHAT_LINES).format(t=topic) if role == "user" else \
+                    f"Here is an explanation of {topic}. " * rnd.randint(1, 12)
+                messages.append((next(ids["chats"]), user_id, role, text, session_id, at))
+            writer.add("sessions", (session_id, user_id, f"{topic} doubts", started, count, at))
+            for message in messages:
+                writer.add("chats", message)
+
+        # Study planner entries
+        for _ in range(_around(rnd, args.study_sessions_per_user)):
+            day = (joined + (now + timedelta(days=14) - joined) * rnd.random()).replace(microsecond=0)
+            subject = topics.sample()
+            writer.add("study_sessions", (next(ids["study_sessions"]), user_id, f"Revise {subject}", subject,
+                                          rnd.choice((30, 45, 60, 90)), day.date(),
+                                          f"{rnd.randint(6, 22):02d}:{rnd.choice((0, 30)):02d}:00", "study",
+                                          rnd.choice(("low", "medium", "high")), 1 if day < now else 0, "", day))
+
+        if args.progress and (n + 1) % args.progress == 0:
+            print(f"  {n + 1}/{args.users} users generated", flush=True)
+
+    writer.flush()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--attempts-per-user", type=float, default=20, help="mean quiz attempts per user")
+    parser.add_argument("--answers-per-attempt", type=int, default=10, help="max stored answers per attempt")
+    parser.add_argument("--sessions-per-user", type=float, default=5, help="mean chat sessions per user")
+    parser.add_argument("--messages-per-session", type=float, default=10, help="mean messages per chat session")
+    parser.add_argument("--study-sessions-per-user", type=float, default=15)
+    parser.add_argument("--topics", type=int, default=60)
+    parser.add_argument("--zipf", type=float, default=1.1, help="topic skew exponent (0 = uniform)")
+    parser.add_argument("--days", type=int, default=365, help="history window")
+    parser.add_argument("--method", choices=("insert", "load-data"), default="insert")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--fast", action="store_true", help="disable FK/unique checks while loading")
+    parser.add_argument("--prefix", default="synth", help="username prefix for generated users")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--progress", type=int, default=1000, help="report every N users (0 = quiet)")
+    parser.add_argument("--yes", action="store_true", help="do not ask for confirmation")
+    args = parser.parse_args(argv)
+
+    database = os.environ.get("MYSQL_DB", "edumate")
+    if not args.yes:
+        answer = input(f"Load synthetic data for {args.users} users into '{database}'? [y/N] ")
+        if answer.strip().lower() != "y":
+            return 1
+
+    import mysql.connector
+    from db import ensure_schema
+
+    ensure_schema()
+    conn = mysql.connector.connect(
+        host=os.environ.get("MYSQL_HOST", "localhost"),
+        user=os.environ.get("MYSQL_USER", "root"),
+        password=os.environ.get("MYSQL_PASSWORD", ""),
+        database=database,
+        auth_plugin="mysql_native_password",
+        allow_local_infile=args.method == "load-data",
+    )
+    cur = conn.cursor()
+    if args.fast:
+        cur.execute("SET SESSION foreign_key_checks = 0, unique_checks = 0")
+    cur.close()
+
+    writer = BulkWriter(conn, args.method, args.batch_size)
+    start = time.perf_counter()
+    try:
+        generate(writer, conn, args)
+    finally:
+        if args.fast:
+            cur = conn.cursor()
+            cur.execute("SET SESSION foreign_key_checks = 1, unique_checks = 1")
+            cur.close()
+        conn.close()
+
+    elapsed = time.perf_counter() - start
+    total = sum(writer.counts.values())
+    print(f"\nLoaded {total} rows in {elapsed:.1f}s ({total / elapsed:.0f} rows/s)")
+    for table, count in writer.counts.items():
+        print(f"  {table:<16}{count:>12}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
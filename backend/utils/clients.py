@@ -0,0 +1,36 @@
+import os
+import threading
+
+from observability import instrument_client
+
+# SDK clients are built on first use instead of at import time, so worker
+# boot does not pay for them and a missing API key only fails the routes
+# that actually need it.
+_LOCK = threading.Lock()
+_gemini_client = None
+_groq_client = None
+
+
+def get_gemini_client():
+    """Return the shared Gemini client, constructing it on first call"""
+    global _gemini_client
+    if _gemini_client is None:
+        with _LOCK:
+            if _gemini_client is None:
+                api_key = os.getenv("GEMINI_API_KEY")
+                if not api_key:
+                    raise RuntimeError("GEMINI_API_KEY is not set in environment variables")
+                from google import genai
+                _gemini_client = instrument_client(genai.Client(api_key=api_key), "gemini")
+    return _gemini_client
+
+
+def get_groq_client():
+    """Return the shared Groq client, constructing it on first call"""
+    global _groq_client
+    if _groq_client is None:
+        with _LOCK:
+            if _groq_client is None:
+                from groq import Groq
+                _groq_client = instrument_client(Groq(api_key=os.getenv("GROQ_API_KEY")), "groq")
+    return _groq_client
@@ -0,0 +1,21 @@
+import gzip
+from flask import jsonify, request
+
+# Payloads smaller than this are not worth the CPU to compress
+COMPRESS_MIN_BYTES = 4096
+
+
+def compressed_jsonify(payload, min_bytes: int = COMPRESS_MIN_BYTES):
+    """jsonify `payload`, gzip-encoding it when the client accepts gzip and it is large"""
+    response = jsonify(payload)
+    response.vary.add("Accept-Encoding")
+    if "gzip" not in request.headers.get("Accept-Encoding", "").lower():
+        return response
+
+    data = response.get_data()
+    if len(data) < min_bytes:
+        return response
+
+    response.set_data(gzip.compress(data, compresslevel=5))
+    response.headers["Content-Encoding"] = "gzip"
+    return response
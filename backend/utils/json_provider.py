@@ -0,0 +1,27 @@
+from flask.json.provider import DefaultJSONProvider
+
+from utils.serialization import dumps, json_default, loads
+
+
+class EdumateJSONProvider(DefaultJSONProvider):
+    """
+    App-wide JSON provider: encodes DB row types (Decimal, datetime, date,
+    TIME/timedelta) natively in one pass, backed by orjson when installed.
+    Install with `app.json = EdumateJSONProvider(app)`.
+    """
+
+    default = staticmethod(json_default)
+    ensure_ascii = False
+
+    def dumps(self, obj, **kwargs) -> str:
+        return dumps(
+            obj,
+            indent=kwargs.get("indent"),
+            sort_keys=kwargs.get("sort_keys", self.sort_keys),
+            ensure_ascii=kwargs.get("ensure_ascii", self.ensure_ascii),
+        )
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
@@ -0,0 +1,47 @@
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+try:
+    import orjson  # optional: faster encoder, falls back to the stdlib json module
+except ImportError:
+    orjson = None
+
+
+def json_default(obj):
+    """Encode the value types MySQL rows carry (DECIMAL, DATETIME, DATE, TIME)"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, timedelta):
+        # MySQL TIME columns come back as timedelta
+        return obj.total_seconds()
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.decode("utf-8", errors="replace")
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj, indent: int = None, sort_keys: bool = False, ensure_ascii: bool = False) -> str:
+    """Serialize DB rows to JSON in a single pass, using orjson when it is available"""
+    if orjson is not None and indent in (None, 2) and not ensure_ascii:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=json_default, option=option).decode("utf-8")
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits; the stdlib encoder handles them
+    separators = None if indent else (",", ":")
+    return json.dumps(obj, default=json_default, indent=indent, sort_keys=sort_keys,
+                      ensure_ascii=ensure_ascii, separators=separators)
+
+
+def loads(s):
+    if orjson is not None:
+        return orjson.loads(s)
+    return json.loads(s)
@@ -63,6 +63,7 @@ export default function ChatInterface() {
         if (res && res.success) {
           const list = (res.sessions || []).map((s: any) => ({ ...s, id: Number(s.id), saved: true }));
           chatContext.setSessions(list);
+          chatContext.setSessionsCursor(res.next_cursor || null);
           if (list.length > 0) {
             chatContext.setCurrentSessionId(Number(list[0].id));
             chatContext.setChatLoaded(true);
@@ -90,6 +91,28 @@ export default function ChatInterface() {
     loadSessions();
   }, [user, chatContext]);
 
+  // Older sessions are fetched a page at a time, when the sidebar is scrolled to the end
+  const [loadingMoreSessions, setLoadingMoreSessions] = useState(false);
+  const loadMoreSessions = async () => {
+    if (!chatContext.sessionsCursor || loadingMoreSessions) return;
+    setLoadingMoreSessions(true);
+    try {
+      const res = await apiGetChatSessions(chatContext.sessionsCursor);
+      if (res && res.success) {
+        const older = (res.sessions || []).map((s: any) => ({ ...s, id: Number(s.id), saved: true }));
+        chatContext.setSessions((prev) => {
+          const seen = new Set(prev.map((p) => String(p.id)));
+          return [...prev, ...older.filter((s) => !seen.has(String(s.id)))];
+        });
+        chatContext.setSessionsCursor(res.next_cursor || null);
+      }
+    } catch (err) {
+      console.error("Error loading more sessions:", err);
+    } finally {
+      setLoadingMoreSessions(false);
+    }
+  };
+
   // Load history whenever the current session changes using the centralized helper
   useEffect(() => {
     if (!chatContext.currentSessionId) return;
@@ -329,9 +352,12 @@ export default function ChatInterface() {
         try {
           const list = await apiGetChatSessions();
           if (list && list.success) chatContext.setSessions((prev) => {
+            // Only the newest page is refetched: keep the older pages already loaded
             const server = (list.sessions || []).map((s: any) => ({ ...s, id: Number(s.id), saved: true }));
+            const fresh = new Set(server.map((s) => String(s.id)));
+            const older = prev.filter((p) => typeof p.id === 'number' && !fresh.has(String(p.id)));
             const temps = prev.filter((p) => typeof p.id === 'string' && String(p.id).startsWith('temp-'));
-            return [...server, ...temps];
+            return [...server, ...older, ...temps];
           });
         } catch (err) {
           console.error('Failed to refresh sessions after send:', err);
@@ -472,7 +498,13 @@ export default function ChatInterface() {
                 New
               </button>
             </div>
-            <div className="space-y-2 overflow-y-auto">
+            <div
+              className="space-y-2 overflow-y-auto"
+              onScroll={(e) => {
+                const el = e.currentTarget;
+                if (el.scrollHeight - el.scrollTop - el.clientHeight < 80) loadMoreSessions();
+              }}
+            >
               {chatContext.sessions.map((s) => (
                 <div
                   key={String(s.id)}
@@ -580,6 +612,15 @@ export default function ChatInterface() {
                   </button>
                 </div>
               ))}
+              {chatContext.sessionsCursor && (
+                <button
+                  onClick={loadMoreSessions}
+                  disabled={loadingMoreSessions}
+                  className="w-full text-xs text-slate-400 py-1 rounded hover:bg-slate-800 disabled:opacity-50"
+                >
+                  {loadingMoreSessions ? "Loading..." : "Load more"}
+                </button>
+              )}
             </div>
           </aside>
 
@@ -27,6 +27,8 @@ interface ChatContextType {
     setTypingContent: (content: string) => void;
     sessions: LocalSession[];
     setSessions: React.Dispatch<React.SetStateAction<LocalSession[]>>;
+    sessionsCursor: string | null; // next_cursor of the last sessions page loaded (null: no more)
+    setSessionsCursor: (cursor: string | null) => void;
     currentSessionId: number | string | null;
     setCurrentSessionId: (id: number | string | null) => void;
     resetChat: () => void;
@@ -101,6 +103,8 @@ export const ChatProvider: React.FC<{ children: ReactNode }> = ({ children }) =>
         return [];
     });
 
+    const [sessionsCursor, setSessionsCursor] = useState<string | null>(null);
+
     const [currentSessionId, setCurrentSessionId] = useState<number | string | null>(() => {
         try {
             const stored = sessionStorage.getItem(SESSION_STORAGE_KEY);
@@ -131,6 +135,7 @@ export const ChatProvider: React.FC<{ children: ReactNode }> = ({ children }) =>
         setIsTyping(false);
         setTypingContent("");
         setSessions([]);
+        setSessionsCursor(null);
         setCurrentSessionId(null);
         setChatLoaded(false);
         sessionStorage.removeItem(SESSION_STORAGE_KEY);
@@ -149,6 +154,8 @@ export const ChatProvider: React.FC<{ children: ReactNode }> = ({ children }) =>
                 setTypingContent,
                 sessions,
                 setSessions,
+                sessionsCursor,
+                setSessionsCursor,
                 currentSessionId,
                 setCurrentSessionId,
                 resetChat,
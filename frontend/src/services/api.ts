@@ -737,13 +737,17 @@ export const getChatHistory = async (
   }
 };
 
-export const getChatSessions = async (): Promise<{
+export const getChatSessions = async (cursor?: string | null): Promise<{
   success: boolean;
   sessions: ChatSession[];
+  next_cursor?: string | null;
   error?: string;
 }> => {
   try {
-    const response = await fetch(`${API_BASE}/chat/sessions`, {
+    // One keyset page (newest first); pass next_cursor back for the next one
+    const params = new URLSearchParams();
+    if (cursor) params.append('cursor', cursor);
+    const response = await fetch(`${API_BASE}/chat/sessions?${params}`, {
       method: 'GET',
       headers: {
         'Authorization': `Bearer ${getAuthToken()}`,
@@ -753,7 +757,9 @@ export const getChatSessions = async (): Promise<{
       throw new Error('Failed to get chat sessions');
     }
 
-    return await response.json();
+    const page = await response.json();
+    if (!page.success) return page;
+    return { success: true, sessions: page.sessions || [], next_cursor: page.next_cursor || null };
   } catch (error) {
     console.error('Chat sessions error:', error);
     return {